@@ -1,6 +1,21 @@
+import logging
+import requests
 import feedparser
+from utilities.feed_sniffer import FeedSniffer, SNIFF_BYTES, NEWS, VIDEO, PODCAST
 
-def get_feed_type(feed_url):
+def sniff_feed_type(feed_url):
+    # Only the root element, namespaces and first item are needed, so stop after the first few KB
+    with requests.get(feed_url, stream=True, timeout=(5, 10)) as response:
+        response.raise_for_status()
+        head = b''
+        for chunk in response.iter_content(chunk_size=SNIFF_BYTES):
+            head += chunk
+            if len(head) >= SNIFF_BYTES:
+                break
+    return FeedSniffer.sniff(head, feed_url)
+
+def parse_feed_type(feed_url):
+    # The full-document detection, for when the partial download fails
     feed = feedparser.parse(feed_url)
 
     is_youtube = False
@@ -12,11 +27,27 @@ def get_feed_type(feed_url):
     if 'itunes' in namespaces: is_podcast = True
 
     # Check entries for YouTube or podcast-specific elements
+    audio_entries = 0
     for entry in feed.entries:
         if 'yt_videoid' in entry:
             is_youtube = True
-        if 'enclosures' in entry or 'enclosure' in entry:
-            is_podcast = True
+        if any(enclosure.get('type', '').startswith('audio/') for enclosure in entry.get('enclosures', [])):
+            audio_entries += 1
+
+    # Audio on most entries; a video clip on a news item is not a podcast
+    if feed.entries and audio_entries * 2 > len(feed.entries):
+        is_podcast = True
+
+    return VIDEO if is_youtube else PODCAST if is_podcast else NEWS
+
+def get_feed_type(feed_url):
+    try:
+        feed_type = sniff_feed_type(feed_url)
+    except requests.RequestException as e:
+        logging.warning(f"Sniffing {feed_url} failed ({e}), parsing the whole feed instead")
+        feed_type = parse_feed_type(feed_url)
+    is_youtube = feed_type == "video"
+    is_podcast = feed_type == "podcast"
 
     # Determine feed type
     if is_youtube:
@@ -37,8 +68,3 @@ def process_podcast_feed(feed_url, feed_type):
 
 def process_news_feed(feed_url, feed_type):
     print(f"Fetching video from: {feed_url} (type: {feed_type})")
-
-# Example usage:
-feed_url = 'https://feeds.bbci.co.uk/news/rss.xml'
-feed_type = get_feed_type(feed_url)
-print(feed_type)
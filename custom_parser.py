@@ -6,6 +6,9 @@ from urllib.parse import urlparse
 import aiohttp
 from lxml import etree
 from lxml.etree import XMLSyntaxError
+from utilities.date_parser import DateParser
+from utilities.feed_sniffer import FeedSniffer
+from utilities.resources import Resources
 
 class RSSParserUtils:
     """Utility methods for RSS parsing"""
@@ -30,27 +33,8 @@ class RSSParserUtils:
     
     @staticmethod
     def parse_date(date_str: Optional[str]) -> Optional[datetime]:
-        """Parse various date formats from RSS feeds"""
-        if not date_str:
-            return None
-        try:
-            # Try ISO 8601 format
-            return datetime.fromisoformat(date_str.replace("Z", "+00:00"))
-        except ValueError:
-            pass
-        # Add more date formats as needed
-        formats = [
-            "%a, %d %b %Y %H:%M:%S %z",  # RFC 2822
-            "%a, %d %b %Y %H:%M:%S %Z",  # RFC 2822 with timezone name
-            "%Y-%m-%dT%H:%M:%S%z",       # ISO 8601
-            "%Y-%m-%d %H:%M:%S",          # Simple format
-        ]
-        for fmt in formats:
-            try:
-                return datetime.strptime(date_str, fmt)
-            except ValueError:
-                continue
-        return None
+        """Parse various date formats from RSS feeds into aware UTC datetimes"""
+        return DateParser.parse(date_str)
 
 class BaseFeedParser:
     """Base class for all feed parsers"""
@@ -425,53 +409,53 @@ class RSSParser:
         'podcast': PodcastFeedParser,
         'youtube': YouTubeFeedParser,
     }
+
+    # Sniffer result (the feeds document `type`) -> parser key
+    FEED_TYPES = {
+        'news': 'text',
+        'podcast': 'podcast',
+        'video': 'youtube',
+    }
     
     def __init__(self, max_concurrent: int = 10, timeout: int = 30):
         self.semaphore = asyncio.Semaphore(max_concurrent)
         self.timeout = timeout
+        self.feed_types: Dict[str, str] = {}
     
     async def parse_feed(self, url: str) -> Tuple[Dict, List[Dict]]:
         """Parse a single feed with automatic type detection"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with self.semaphore:
-                    content = await BaseFeedParser.fetch_feed(url, session, self.timeout)
-                    if not content:
-                        print(f"Failed to fetch content from {url}")
-                        return {}, []
-                    
-                    root = BaseFeedParser.parse_xml(content)
-                    if root is None:
-                        print(f"Failed to parse XML from {url}")
-                        return {}, []
-                    
-                    # Detect feed type
-                    parser = self._detect_feed_type(root, url)
-                    
-                    # Parse feed
-                    metadata = parser.parse_feed_metadata(root)
-                    items = parser.parse_feed_items(root)
-                    
-                    return metadata, items
+            session = await Resources.session()
+            async with self.semaphore:
+                content = await BaseFeedParser.fetch_feed(url, session, self.timeout)
+                if not content:
+                    print(f"Failed to fetch content from {url}")
+                    return {}, []
+                
+                root = BaseFeedParser.parse_xml(content)
+                if root is None:
+                    print(f"Failed to parse XML from {url}")
+                    return {}, []
+                
+                # Detect feed type
+                parser = self._detect_feed_type(content, url)
+                
+                # Parse feed
+                metadata = parser.parse_feed_metadata(root)
+                items = parser.parse_feed_items(root)
+                
+                return metadata, items
         except Exception as e:
             print(f"Error parsing feed {url}: {str(e)}")
             return {}, []
     
-    def _detect_feed_type(self, root: etree._Element, url: str) -> BaseFeedParser:
-        """Detect feed type and return appropriate parser"""
-        # Check for YouTube first
-        if ('youtube.com' in url or 
-            root.find('.//media:group', namespaces=BaseFeedParser.NAMESPACES) is not None or
-            root.find('.//yt:videoId', namespaces={'yt': 'http://www.youtube.com/xml/schemas/2015'}) is not None):
-            return self.PARSERS['youtube']
-        
-        # Then check for Podcast
-        if (root.find('.//itunes:author', namespaces=BaseFeedParser.NAMESPACES) is not None or 
-            root.find('.//itunes:category', namespaces=BaseFeedParser.NAMESPACES) is not None):
-            return self.PARSERS['podcast']
-        
-        # Default to text feed
-        return self.PARSERS['text']
+    def _detect_feed_type(self, content: str, url: str) -> BaseFeedParser:
+        """Detect feed type from the first few KB of the document, once per feed URL"""
+        feed_type = self.feed_types.get(url)
+        if feed_type is None:
+            feed_type = FeedSniffer.sniff(content, url)
+            self.feed_types[url] = feed_type
+        return self.PARSERS[self.FEED_TYPES[feed_type]]
 
     async def parse_feeds(self, urls: List[str]) -> List[Tuple[Dict, List[Dict]]]:
         """Parse multiple feeds concurrently"""
@@ -572,6 +556,7 @@ async def main():
                 print(f"\n  ... and {len(items) - 3} more items")
     
     print("\nFeed parsing completed!")
+    await Resources.close()
 
 if __name__ == '__main__':
     try:
@@ -0,0 +1,106 @@
+import os
+import re
+import logging
+from typing import Optional
+from aiohttp import web
+from utilities.helpers import setup_logging
+from utilities.thumbnails import ThumbnailProxy, THUMBNAIL_PROXY_SECRET, THUMBNAIL_WIDTHS
+
+
+# --------------------------
+# Configuration and Constants
+# --------------------------
+
+THUMBNAIL_PROXY_HOST = os.getenv('THUMBNAIL_PROXY_HOST', '127.0.0.1')
+THUMBNAIL_PROXY_PORT = int(os.getenv('THUMBNAIL_PROXY_PORT', '8080'))
+
+# Rendered files never change under their content hash
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# A source URL may start pointing at a different image
+URL_MAX_AGE = 'public, max-age=86400'
+MISSING_MAX_AGE = 'public, max-age=3600'
+
+DIGEST = re.compile(r'^[0-9a-f]{64}$')
+
+
+# --------------------------
+# Handlers
+# --------------------------
+
+class ImageProxyHandlers:
+    """
+    GET /thumbnail?url=&w=&sig=   redirect to the rendered WebP for a source image
+    GET /placeholder?url=&sig=    placeholder data URI and original dimensions
+    GET /t/<digest>/<width>.webp  the rendered file, cacheable forever
+
+    Source URLs must be signed (ThumbnailProxy.proxy_url), so the proxy only
+    fetches images the article API handed out.
+    """
+
+    proxy = ThumbnailProxy()
+
+    @staticmethod
+    async def resolve(request: web.Request) -> Optional[dict]:
+        url = request.query.get('url', '')
+        if not url.startswith(('http://', 'https://')):
+            raise web.HTTPBadRequest(text='url must be an absolute http(s) URL')
+        if not ThumbnailProxy.verify(url, request.query.get('sig', '')):
+            raise web.HTTPForbidden(text='bad signature')
+        proxy = ImageProxyHandlers.proxy
+        return await proxy.thumbnail(url, proxy.session())
+
+    @staticmethod
+    async def thumbnail(request: web.Request) -> web.StreamResponse:
+        try:
+            requested = int(request.query.get('w', '0'))
+        except ValueError:
+            raise web.HTTPBadRequest(text='w must be an integer')
+
+        meta = await ImageProxyHandlers.resolve(request)
+        if meta is None:
+            raise web.HTTPNotFound(headers={'Cache-Control': MISSING_MAX_AGE})
+        width = ThumbnailProxy.width_for(requested)
+        raise web.HTTPFound(f"/t/{meta['digest']}/{width}.webp", headers={'Cache-Control': URL_MAX_AGE})
+
+    @staticmethod
+    async def placeholder(request: web.Request) -> web.Response:
+        meta = await ImageProxyHandlers.resolve(request)
+        if meta is None:
+            raise web.HTTPNotFound(headers={'Cache-Control': MISSING_MAX_AGE})
+        return web.json_response(meta, headers={'Cache-Control': URL_MAX_AGE})
+
+    @staticmethod
+    async def rendered(request: web.Request) -> web.StreamResponse:
+        digest = request.match_info['digest']
+        width = int(request.match_info['width'])
+        if not DIGEST.match(digest) or width not in THUMBNAIL_WIDTHS:
+            raise web.HTTPNotFound()
+        path = ImageProxyHandlers.proxy.store.variant_path(digest, width)
+        if not os.path.exists(path):
+            raise web.HTTPNotFound()
+        return web.FileResponse(path, headers={'Cache-Control': IMMUTABLE, 'Content-Type': 'image/webp', 'ETag': f'"{digest}-{width}"'})
+
+
+# --------------------------
+# Application
+# --------------------------
+
+async def on_cleanup(app: web.Application) -> None:
+    await ImageProxyHandlers.proxy.close()
+
+
+def create_app() -> web.Application:
+    if not THUMBNAIL_PROXY_SECRET:
+        raise RuntimeError('THUMBNAIL_PROXY_SECRET must be set; without it any URL could be fetched through the proxy')
+    app = web.Application()
+    app.router.add_get('/thumbnail', ImageProxyHandlers.thumbnail)
+    app.router.add_get('/placeholder', ImageProxyHandlers.placeholder)
+    app.router.add_get(r'/t/{digest}/{width:\d+}.webp', ImageProxyHandlers.rendered)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+if __name__ == '__main__':
+    setup_logging()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    web.run_app(create_app(), host=THUMBNAIL_PROXY_HOST, port=THUMBNAIL_PROXY_PORT)
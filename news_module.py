@@ -1,32 +1,23 @@
 import os
-import re
-import html
-import json
 import time
 import aiohttp
 import asyncio
 import logging
 import random
-import feedparser
-from dateutil import parser
 from datetime import datetime, UTC 
-from selectolax.parser import HTMLParser
-from typing import Optional, Dict, Any, List
-from langdetect import detect, LangDetectException
-from motor.motor_asyncio import AsyncIOMotorClient
-from utilities.helpers import setup_logging, proxy, retry
+from typing import Dict, Any
+from utilities.helpers import setup_logging
+from utilities.feed_sniffer import FeedSniffer
+from utilities.fetch_metrics import FetchMetrics
+from utilities.news_pipeline import ArticlePipeline, Database, Enrichment
+from utilities.resources import Resources
 
 
 # --------------------------
 # Configuration and Constants
 # --------------------------
-setup_logging()  #
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
 TYPE = 'news'
 
-MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/?maxPoolSize=10')
-
 USER_AGENTS = [ua.strip() for ua in os.getenv('USER_AGENTS', '').split(',') if ua.strip()] or [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 13_5) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -54,157 +45,72 @@ def get_random_headers() -> dict:
     return headers
 
 
-# --------------------------
-# Database Operations
-# --------------------------
-
-class Database:
-    client = AsyncIOMotorClient(MONGO_URI)
-    db = client['news']
-    feeds = db['feeds']
-    articles = db['articles']
-    feed_stats = db['feed_stats']  # Add this new collection
-
-    @staticmethod
-    async def feed_exists(url: str) -> Optional[Dict[str, Any]]:
-        return await Database.feeds.find_one({'feed': url})
-
-    @staticmethod
-    async def article_exists(links: List[str]) -> List[str]:
-        """Check if articles exist in bulk."""
-        existing = await Database.articles.find({"link": {"$in": links}}).to_list(length=None)
-        existing_links = {doc['link'] for doc in existing}
-        return existing_links
-
-    @staticmethod
-    async def insert_articles(docs: List[Dict[str, Any]]) -> List[Any]:
-        if docs:
-            res = await Database.articles.insert_many(docs)
-            logging.info(f"Inserted {len(res.inserted_ids)} articles.")
-            return res.inserted_ids
-        return []
-
-    @staticmethod
-    async def update_feed_last_checked(feed_id: Any, last_checked: datetime) -> None:
-        await Database.feeds.update_one(
-            {'_id': feed_id}, 
-            {'$set': {'last_checked': last_checked}}
-        )
-
-    @staticmethod
-    async def update_feed_language(feed_id: Any, language: str) -> None:
-        await Database.feeds.update_one(
-            {'_id': feed_id}, 
-            {'$set': {'language': language}}
-        )
-
-    @staticmethod
-    async def update_feed_last_updated(feed_id: Any, last_updated: datetime) -> None:
-        await Database.feeds.update_one(
-            {'_id': feed_id}, 
-            {'$set': {'last_updated': last_updated}}
-        )
-
-    @staticmethod
-    async def create_feed(feed_data: Dict[str, Any]) -> Any:
-        result = await Database.feeds.insert_one(feed_data)
-        logging.info(f"New feed inserted: {feed_data.get('title')} ({feed_data.get('feed')})")
-        return result.inserted_id
-
-    @staticmethod
-    async def update_feed_stats(feed_id: Any, articles_added: int) -> None:
-        """Update or create feed statistics."""
-        await Database.feed_stats.update_one(
-            {'feed_id': feed_id},
-            {'$inc': {'total_items': articles_added}, '$set': {'last_updated': datetime.now(UTC)}},
-            upsert=True
-        )
-
 # --------------------------
 # RSS Parser
 # --------------------------
 
 class RSSParser:
-    @staticmethod
-    def detect_language(text: str) -> str:
-        try:
-            return detect(text)
-        except LangDetectException:
-            return "unknown"
+    """Adds the feeds in `rss_urls`, creating their documents on first sight; articles go through ArticlePipeline."""
 
     @staticmethod
-    @retry(retries=3, delay=1, backoff=2, jitter=True)
-    @proxy 
-    async def fetch_feed(url: str, session: aiohttp.ClientSession) -> Dict[str, Any]:
-        try:
-            async with session.get(url, headers=get_random_headers()) as response:
-                if response.status != 200:
-                    return {"error": f"HTTP {response.status}"}
-                data = feedparser.parse(await response.text())
-
-                if data.bozo:
-                    return {"error": str(data.bozo_exception)}
-                                
-                return {"feed": data.feed, "entries": data.entries}
-        except Exception as e:
-            return {"error": str(e)}
+    async def fetch_feed(url: str, session: aiohttp.ClientSession, sample: Dict[str, Any]) -> Dict[str, Any]:
+        return await ArticlePipeline.fetch_feed(url, session, sample, headers=get_random_headers())
 
     @staticmethod
     async def process_feed(url: str, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore):
         async with semaphore: 
-            result = await RSSParser.fetch_feed(url, session)
-            if "error" in result:
-                logging.error(f"Feed error {url}: {result['error']}")
-                return
-
-            feed_data = result["feed"]
-            entries = result["entries"]
-
-            if not entries:  # Check if entries is empty
-                logging.warning(f"No entries found in feed: {url}")
-                return
-
-            first_article_language = RSSParser.detect_language(entries[0].get('description', ''))
+            sample = FetchMetrics.sample(url)
+            feed_id = None
+            try:
+                result = await RSSParser.fetch_feed(url, session, sample)
+                if "error" in result:
+                    logging.error(f"Feed error {url}: {result['error']}")
+                    return
 
-            feed_id = await RSSParser.get_feed_data(url, feed_data, first_article_language)
-            
-            if feed_id:
-                new_articles_added = await RSSParser.process_articles(entries, feed_id, session)
+                feed_data = result["feed"]
+                entries = result["entries"]
 
-                if new_articles_added:
-                    await RSSParser.update_feed_and_stats(feed_id, new_articles_added)
+                if not entries:  # Check if entries is empty
+                    logging.warning(f"No entries found in feed: {url}")
+                    return
 
+                first_article_language = ArticlePipeline.detect_language(entries[0].get('description', ''))
 
-    @staticmethod
-    async def update_feed_and_stats(feed_id: Any, new_articles_added: int) -> None:
-        await Database.update_feed_last_updated(feed_id, datetime.now(UTC))
-        await Database.update_feed_stats(feed_id, new_articles_added)
+                feed = await RSSParser.get_feed_data(url, feed_data, first_article_language, result["head"])
+                
+                if feed:
+                    feed_id = feed['_id']
+                    new_articles_added = await ArticlePipeline.process_articles(entries, feed_id, sample=sample)
+                    await Database.bookkeep(feed_id, datetime.now(UTC), new_articles_added, feed.get('last_checked'))
+            finally:
+                await Database.record_fetch(feed_id, sample)
 
     @staticmethod
-    async def get_feed_data(url: str, feed_data: dict, feed_language: str):
+    async def get_feed_data(url: str, feed_data: dict, feed_language: str, head: bytes = b'') -> Dict[str, Any]:
         existing = await Database.feed_exists(url)
         now = datetime.now(UTC)        
         if existing:
             logging.info(f"Feed {url} already exists. Skipping feed save.")
             
-            await RSSParser.update_existing_feed(existing, feed_language, now)
-            return existing.get('_id')
+            await RSSParser.update_existing_feed(existing, feed_language, head)
+            return existing
        
-        return await RSSParser.create_new_feed(url, feed_data, feed_language, now)
+        return {'_id': await RSSParser.create_new_feed(url, feed_data, feed_language, now, head), 'last_checked': now}
 
     @staticmethod
-    async def update_existing_feed(existing: dict, feed_language: str, now: datetime) -> None:
-        await Database.update_feed_last_checked(existing['_id'], now)
+    async def update_existing_feed(existing: dict, feed_language: str, head: bytes = b'') -> None:
         if existing.get('language') != feed_language:
             await Database.update_feed_language(existing['_id'], feed_language)
+        if not existing.get('type') and head:
+            await Database.update_feed_type(existing['_id'], FeedSniffer.sniff(head, existing.get('feed')))
 
     @staticmethod
-    async def create_new_feed(url: str, feed_data: dict, feed_language: str, now: datetime) -> Any:
+    async def create_new_feed(url: str, feed_data: dict, feed_language: str, now: datetime, head: bytes = b'') -> Any:
         new_feed = {
             'title': feed_data.get('title', 'Untitled'),
             'description': feed_data.get('description', ''),
             'language': feed_language,
-            'type': TYPE,
+            'type': FeedSniffer.sniff(head, url) if head else TYPE,
             'last_updated': now,
             'last_checked': now,
             'link': feed_data.get('link', ''),
@@ -224,194 +130,7 @@ class RSSParser:
             return image.get('url', '')
         return ''
 
-    @staticmethod
-    async def process_articles(entries: List[dict], feed_id: str, session: aiohttp.ClientSession) -> bool:
-        all_links = [entry.get('link') for entry in entries if entry.get('link')]
-        existing_links = await RSSParser.get_existing_articles(all_links)
-        articles, no_thumbnail = await RSSParser.process_entries(entries, feed_id, existing_links)
-        
-        await RSSParser.process_thumbnails(articles, no_thumbnail, session)
-        inserted_ids = await Database.insert_articles(articles)
-        return len(inserted_ids) if inserted_ids else 0
-
-    @staticmethod
-    async def get_existing_articles(links: List[str]) -> List[str]:
-        """Fetch and return existing articles based on links."""
-        return await Database.article_exists(links)
-
-    @staticmethod
-    async def process_entries(entries: List[dict], feed_id: str, existing_links: List[str]) -> tuple[List[dict], List[str]]:
-        """Process each entry and return valid articles and links with no thumbnail."""
-        articles = []
-        no_thumbnail = []
-
-        for entry in entries:
-            if not await RSSParser.is_valid_entry(entry, existing_links):
-                continue
-            try:
-                article = await RSSParser.process_entry(entry, feed_id, no_thumbnail)
-                if article:
-                    articles.append(article)
-            except Exception as e:
-                logging.error(f"Error processing entry from {entry.get('link', 'unknown')}: {e}")
-        
-        return articles, no_thumbnail
-
-    @staticmethod
-    async def is_valid_entry(entry: dict, existing_links: List[str]) -> bool:
-        """Check if an entry is valid (has a link and is not already in the existing links)."""
-        link = entry.get('link')
-        if not link or link in existing_links:
-            return False
-        return True
-
-    @staticmethod
-    async def process_entry(entry: dict, feed_id: int, no_thumbnail: List[str]) -> Optional[dict]:
-        """Process a single entry from the feed and return article data."""
-        link = entry.get('link')
-        if not link:
-            return None
-            
-        description = entry.get('description', '')
-        published = RSSParser.get_published_date(entry)
-        article_language = RSSParser.detect_language(description)
-        thumbnail = RSSParser.get_thumbnail(entry, description, no_thumbnail)
-
-        return RSSParser.format_article_data(feed_id, entry, description, article_language, published, link, thumbnail)
-
-    @staticmethod
-    def format_article_data(feed_id: int, entry: dict, description: str, article_language: str, published: datetime, link: str, thumbnail: str) -> dict:
-        """Format the article data into a dictionary."""
-        return {
-            'feed_id': feed_id,
-            'title': entry.get('title', ''),
-            'description': RSSParser.clean_html(description),
-            'content': '',
-            'summarize': '',
-            'language': article_language,
-            'published': published,
-            'link': link,
-            'thumbnail': thumbnail,
-        }
 
-    '''
-    @staticmethod
-    def get_published_date(entry: dict) -> str:
-        date_fields = ['published', 'updated', 'dc_date', 'pubDate']
-        
-        for field in date_fields:
-            date_value = entry.get(field)
-            if date_value:
-                try:
-                    # Parse with timezone awareness
-                    dt = parser.parse(date_value)
-                    # Return ISO format with timezone (will include +00:00 for +0000)
-                    return dt.isoformat()
-                except (ValueError, TypeError) as e:
-                    print(f"Error parsing {field} '{date_value}': {e}")
-                    continue
-        
-        return 'N/A'
-    '''
-
-    @staticmethod
-    def get_published_date(entry: dict) -> datetime:
-        published_parsed = entry.get("published_parsed")
-        return datetime(*published_parsed[:6]) if published_parsed else 'datetime.now(UTC)'
- 
-
-    @staticmethod
-    async def process_thumbnails(articles: List[dict], no_thumbnail: List[str], session: aiohttp.ClientSession) -> None:
-        """Process and fetch thumbnails for articles."""
-        if no_thumbnail:
-            ogs = await RSSParser.fetch_og_images(no_thumbnail, session)
-            for article in articles:
-                if not article['thumbnail']:
-                    article['thumbnail'] = ogs.get(article['link'])
-
-    @staticmethod
-    def get_thumbnail(entry: dict, description: str, no_thumbnail: List[str]) -> str:
-        thumbnail = RSSParser.extract_thumbnail(entry)
-        if not thumbnail:
-            thumbnail = RSSParser.extract_image_from_description(description)
-            if not thumbnail:
-                no_thumbnail.append(entry.get('link'))
-        return thumbnail
-
-    @staticmethod
-    def extract_thumbnail(entry: dict) -> str:
-        # Try media_thumbnail
-        if "media_thumbnail" in entry and entry["media_thumbnail"]:
-            return entry["media_thumbnail"][0].get("url", "")
-
-        # Try media_content
-        if "media_content" in entry:
-            for media in entry["media_content"]:
-                if "url" in media:
-                    return media["url"]
-
-        # Try enclosure
-        if "enclosures" in entry:
-            for enclosure in entry["enclosures"]:
-                if enclosure.get("type", "").startswith("image/"):
-                    return enclosure.get("href", "")
-
-        # Try extracting image from content:encoded
-        content = entry.get("content", [{}])[0].get("value", "")
-        img_match = re.search(r'<img[^>]+src="([^"]+)"', content)
-        if img_match:
-            return img_match.group(1)
-
-        return ""
-
-    @staticmethod
-    def extract_image_from_description(description: str) -> str:
-        """Extract image URL from HTML description content."""
-        if not description:
-            return ""
-        
-        img_matches = re.findall(r'<img[^>]+src=["\']([^"\']+)["\']', description, re.IGNORECASE)
-        if img_matches:
-            return img_matches[0]
-        
-        srcset_matches = re.findall(r'srcset=["\']([^"\']+)["\']', description, re.IGNORECASE)
-        if srcset_matches:
-            urls = re.split(r',\s*', srcset_matches[0])
-            if urls:
-                return urls[0].split()[0] 
-        
-        return ""
-        
-    @staticmethod
-    async def fetch_og_images(urls: List[str], session: aiohttp.ClientSession) -> Dict[str, Optional[str]]:
-        results = await asyncio.gather(*(RSSParser.get_og(url, session) for url in urls))
-        return dict(results)
-
-    @staticmethod
-    async def get_og(url: str, session: aiohttp.ClientSession) -> tuple[str, Optional[str]]:
-        try:
-            timeout = aiohttp.ClientTimeout(total=1)  # Set total timeout to 1 second
-            logging.info(f'Fetching OG image for {url}')
-            async with session.get(url, headers=get_random_headers(), timeout=10) as response:
-                if response.status != 200:
-                    return url, None
-
-                html = await response.text()
-                tree = HTMLParser(html)
-                meta_tag = tree.css_first('meta[property="og:image"]')
-                return url, meta_tag.attributes.get('content') if meta_tag else None
-
-        except Exception:
-            return url, None
-
-    @staticmethod
-    def clean_html(html_text: str) -> str:
-        text = re.sub(r'</?p[^>]*>', '\n', html_text)
-        text = re.sub(r'<[^>]+>', '', text)
-        text = re.sub(r'&(#?\w+);', lambda m: html.unescape(m.group(0)), text)
-        text = re.sub(r'\s+', ' ', text).strip()
-        return text
-        
 # Entry point
 async def main():
     start_time = time.time()
@@ -424,12 +143,20 @@ async def main():
 
     semaphore = asyncio.Semaphore(10)  # Limit concurrency to 5 requests at a time
 
-    async with aiohttp.ClientSession() as session:
-        await asyncio.gather(*(RSSParser.process_feed(url, session, semaphore) for url in rss_urls))
+    await ArticlePipeline.start()
+
+    session = await Resources.session()
+    # Every feed starts the pass with its full enrichment budget
+    Enrichment.new_cycle()
+    await asyncio.gather(*(RSSParser.process_feed(url, session, semaphore) for url in rss_urls))
+
+    await ArticlePipeline.stop()
 
     end_time = time.time()
     elapsed_time = end_time - start_time
     print(f"Total execution time: {elapsed_time:.2f} seconds")  # Print the total time
 
 if __name__ == '__main__':
+    setup_logging()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     asyncio.run(main())
\ No newline at end of file
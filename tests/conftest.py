@@ -0,0 +1,25 @@
+import os
+import sys
+
+# The modules import each other as `utilities.x`, from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture
+def mongo_client(monkeypatch):
+    """An in-memory stand-in for the shared Mongo client, for tests of the Mongo storage code."""
+    mongomock = pytest.importorskip('mongomock')
+    mongomock_motor = pytest.importorskip('mongomock_motor')
+    from utilities.resources import Resources
+
+    # pymongo 4.9+ hands bulk updates a `sort` argument that mongomock does not take yet
+    builder = mongomock.collection.BulkOperationBuilder
+    for name in ('add_update', 'add_replace'):
+        original = getattr(builder, name)
+        monkeypatch.setattr(builder, name, lambda self, *args, sort=None, _original=original, **kwargs: _original(self, *args, **kwargs))
+
+    client = mongomock_motor.AsyncMongoMockClient()
+    monkeypatch.setattr(Resources, 'mongo', staticmethod(lambda: client))
+    return client
@@ -0,0 +1,80 @@
+import asyncio
+
+from utilities.article_extract import ArticleExtractor, extract_main_text
+
+SENTENCE = 'The council approved the budget on Tuesday, after a long debate, and work starts in spring. '
+PAGE = (
+    '<html><head><meta property="og:image" content="/lead.jpg"></head><body>'
+    '<nav><a href="/">Home</a><a href="/world">World</a></nav>'
+    f'<div class="sidebar related"><p>{SENTENCE}</p><p>{SENTENCE}</p></div>'
+    f'<article class="story-body"><h2>Budget passes</h2><p>{SENTENCE * 2}</p><p>{SENTENCE * 2}</p></article>'
+    '<div class="share-tools"><p>Share this story on every network you can think of, please.</p></div>'
+    '</body></html>'
+).encode()
+
+
+class FakeContent:
+    def __init__(self, data):
+        self.data = data
+
+    async def iter_chunked(self, size):
+        for start in range(0, len(self.data), size):
+            yield self.data[start:start + size]
+
+
+class FakeResponse:
+    def __init__(self, data, status=200, content_type='text/html'):
+        self.status = status
+        self.content_type = content_type
+        self.url = 'https://example.com/news/budget'
+        self.content = FakeContent(data)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    def __init__(self, response):
+        self.response = response
+
+    def get(self, url, **kwargs):
+        return self.response
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def inline_extraction(monkeypatch):
+    async def extract_text(html):
+        return extract_main_text(html)
+    monkeypatch.setattr(ArticleExtractor, 'extract_text', staticmethod(extract_text))
+
+
+def test_main_text_skips_navigation_and_sidebars():
+    text = extract_main_text(PAGE)
+    assert text.startswith('Budget passes\n\nThe council approved')
+    assert text.count('The council approved') == 4
+    assert 'Home' not in text and 'Share this story' not in text
+
+
+def test_short_pages_have_no_main_text():
+    assert extract_main_text(f'<html><body><article><p>{SENTENCE}</p></article></body></html>'.encode()) == ''
+    assert extract_main_text(b'') == ''
+
+
+def test_fetch_reads_og_and_text_from_one_download(monkeypatch):
+    inline_extraction(monkeypatch)
+    page = run(ArticleExtractor.fetch('https://example.com/news/budget', FakeSession(FakeResponse(PAGE))))
+    assert page['og']['image'] == 'https://example.com/lead.jpg'
+    assert page['text'].startswith('Budget passes')
+
+
+def test_fetch_outcomes_without_a_page(monkeypatch):
+    inline_extraction(monkeypatch)
+    assert run(ArticleExtractor.fetch('https://example.com/gone', FakeSession(FakeResponse(b'', status=404)))) is None
+    pdf = run(ArticleExtractor.fetch('https://example.com/a.pdf', FakeSession(FakeResponse(b'%PDF', content_type='application/pdf'))))
+    assert pdf['text'] == '' and pdf['og']['image'] is None
@@ -0,0 +1,32 @@
+from utilities.article_key import ArticleKey
+
+
+def test_canonical_url_drops_tracking_and_normalizes():
+    url = 'http://WWW.Example.com:80/news/story/?utm_source=rss&b=2&fbclid=x&a=1'
+    assert ArticleKey.canonical_url(url) == 'https://example.com/news/story?a=1&b=2'
+
+
+def test_canonical_url_keeps_rss_parameter():
+    assert ArticleKey.canonical_url('https://example.com/view?rss=12') == 'https://example.com/view?rss=12'
+
+
+def test_canonical_url_keeps_non_default_port():
+    assert ArticleKey.canonical_url('https://example.com:8443/a') == 'https://example.com:8443/a'
+
+
+def test_tracking_variants_share_a_key():
+    plain = ArticleKey.for_entry({'link': 'https://example.com/a'})
+    tracked = ArticleKey.for_entry({'link': 'http://www.example.com/a/?utm_medium=feed'})
+    assert plain == tracked
+    assert ArticleKey.for_entry({'link': 'https://example.com/b'}) != plain
+
+
+def test_proxy_links_fall_back_to_guid():
+    entry = {'link': 'https://feeds.feedburner.com/~r/site/~3/abc/', 'id': 'https://example.com/a'}
+    assert ArticleKey.for_entry(entry) == ArticleKey.for_entry({'link': 'https://example.com/a'})
+    assert ArticleKey.for_entry(dict(entry, feedburner_origlink='https://example.com/c')) == ArticleKey.for_entry({'link': 'https://example.com/c'})
+
+
+def test_entry_without_link_or_guid_has_no_key():
+    assert ArticleKey.for_entry({'title': 'No link'}) is None
+    assert ArticleKey.for_entry({'id': 'tag:example.com,2024:1'}) is not None
@@ -0,0 +1,78 @@
+import asyncio
+import random
+
+import bson
+import zstandard as zstd
+
+from utilities.content_store import ContentStore, NO_DICTIONARY
+
+WORDS = 'the of and news story report city council minister market weather police school health sport'.split()
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def page(n):
+    rng = random.Random(n)
+    paragraphs = ''.join(f'<p class="story-body__text">{" ".join(rng.choice(WORDS) for _ in range(40))}</p>' for _ in range(6))
+    return f'<html><head><title>Story {n}</title><meta property="og:image" content="/img/{n}.jpg"></head><body><article>{paragraphs}</article></body></html>'
+
+
+def store(client):
+    return ContentStore(client['news']['article_content'], client['news']['content_dicts'])
+
+
+def test_fields_round_trip(mongo_client):
+    async def scenario():
+        content = store(mongo_client)
+        await content.put('a', {'raw': '<p>héllo</p>', 'text': '', 'other': None})
+        await content.writes.flush()
+        return await content.get('a'), await content.get('a', ['raw']), await content.get('missing')
+    full, projected, missing = run(scenario())
+    assert full == {'raw': '<p>héllo</p>'} == projected
+    assert missing is None
+
+
+def test_fields_written_before_and_after_a_new_dictionary_stay_readable(mongo_client):
+    async def scenario():
+        content = store(mongo_client)
+        for n in range(300):
+            await content.put(f'k{n}', {'raw': page(n)})
+        await content.writes.flush()
+        dict_id = await content.train(samples=300, dict_size=8 * 1024)
+        # Text added to an article whose raw HTML predates the dictionary
+        await content.put('k0', {'text': 'The main text of story zero.'})
+        await content.writes.flush()
+        stored = await mongo_client['news']['article_content'].find_one({'_id': 'k0'})
+        return dict_id, stored, await content.get('k0')
+    dict_id, stored, content = run(scenario())
+    assert dict_id == 1
+    assert (stored['raw']['d'], stored['text']['d']) == (NO_DICTIONARY, 1)
+    assert stored['text']['n'] == len('The main text of story zero.')
+    assert content == {'raw': page(0), 'text': 'The main text of story zero.'}
+
+
+def test_first_dictionary_is_trained_at_startup_once_there_is_enough_content(mongo_client, monkeypatch):
+    monkeypatch.setattr('utilities.content_store.CONTENT_DICT_SAMPLES', 300)
+
+    async def scenario():
+        content = store(mongo_client)
+        await content.load_dictionary()
+        untrained = content.dict_id
+        for n in range(300):
+            await content.put(f'k{n}', {'raw': page(n)})
+        await content.writes.flush()
+        await content.load_dictionary()
+        return untrained, content.dict_id
+    assert run(scenario()) == (NO_DICTIONARY, 1)
+
+
+def test_legacy_documents_use_their_document_dictionary(mongo_client):
+    async def scenario():
+        collection = mongo_client['news']['article_content']
+        compressed = zstd.ZstdCompressor().compress('old text'.encode('utf-8'))
+        await collection.insert_one({'_id': 'old', 'text': bson.Binary(compressed), 'dict_id': NO_DICTIONARY, 'size': 8})
+        content = store(mongo_client)
+        return await content.get('old'), await content.having(['old', 'none'], 'text')
+    assert run(scenario()) == ({'text': 'old text'}, {'old'})
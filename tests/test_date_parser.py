@@ -0,0 +1,57 @@
+import time
+from datetime import datetime, timedelta, UTC
+
+import feedparser
+
+from utilities.date_parser import DateParser
+
+
+def test_rfc822_is_utc():
+    assert DateParser.parse('Mon, 06 Jan 2025 10:30:00 +0200') == datetime(2025, 1, 6, 8, 30, tzinfo=UTC)
+    assert DateParser.parse('Mon, 06 Jan 2025 10:30:00 GMT').tzinfo == UTC
+
+
+def test_rfc822_tolerates_wrong_weekday_and_named_zone():
+    assert DateParser.parse('Fri, 06 Jan 2025 10:30:00 EST') == datetime(2025, 1, 6, 15, 30, tzinfo=UTC)
+
+
+def test_rfc3339_is_converted_to_utc():
+    parsed = DateParser.parse('2025-01-06T10:30:00+02:00')
+    assert parsed.tzinfo is UTC
+    assert parsed == datetime(2025, 1, 6, 8, 30, tzinfo=UTC)
+    assert DateParser.parse('2025-01-06T10:30:00-05:00').utcoffset() == timedelta(0)
+
+
+def test_naive_and_broken_iso_are_read_as_utc():
+    expected = datetime(2025, 1, 6, 10, 30, tzinfo=UTC)
+    assert DateParser.parse('2025-01-06T10:30:00') == expected
+    assert DateParser.parse('2025-01-06 10:30:00') == expected
+    assert DateParser.parse('2025-01-06T10:30:00Z') == expected
+
+
+def test_garbage_and_empty():
+    assert DateParser.parse('') is None
+    assert DateParser.parse(None) is None
+    assert DateParser.parse('not a date') is None
+
+
+def test_feed_format_is_remembered():
+    DateParser.parse('Mon, 06 Jan 2025 10:30:00 +0000', feed_key='feed-a')
+    assert 'feed-a' in DateParser.feed_formats
+
+
+def test_parse_entry_reads_the_raw_string_with_the_feed_key():
+    entry = {'published_parsed': time.struct_time((2024, 1, 1, 0, 0, 0, 0, 1, 0)), 'published': 'Mon, 06 Jan 2025 10:30:00 +0200'}
+    assert DateParser.parse_entry(entry, feed_key='feed-b') == datetime(2025, 1, 6, 8, 30, tzinfo=UTC)
+    assert DateParser.feed_formats['feed-b'] == 'rfc822'
+    assert DateParser.parse_entry({'updated': '2025-01-06T08:30:00Z'}) == datetime(2025, 1, 6, 8, 30, tzinfo=UTC)
+    assert DateParser.parse_entry({}) is None
+
+
+def test_parse_entry_falls_back_to_feedparser_fields():
+    entry = {'published_parsed': time.struct_time((2025, 1, 6, 8, 30, 0, 0, 6, 0)), 'published': 'garbage'}
+    assert DateParser.parse_entry(entry) == datetime(2025, 1, 6, 8, 30, tzinfo=UTC)
+
+
+def test_no_global_feedparser_handler():
+    assert not any(getattr(handler, '__qualname__', '').startswith('DateParser.') for handler in feedparser.datetimes._date_handlers)
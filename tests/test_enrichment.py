@@ -0,0 +1,90 @@
+import asyncio
+
+from utilities.enrichment import EnrichmentFetcher
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_per_host_limit():
+    async def scenario():
+        fetcher = EnrichmentFetcher(concurrency=10, per_host=2, feed_budget=100)
+        running, peak = {}, {}
+
+        async def fetch(url):
+            host = EnrichmentFetcher.host(url)
+            running[host] = running.get(host, 0) + 1
+            peak[host] = max(peak.get(host, 0), running[host])
+            await asyncio.sleep(0.01)
+            running[host] -= 1
+            return url
+
+        urls = [f'https://{host}.example.com/{n}' for host in ('a', 'b') for n in range(6)]
+        results = await fetcher.fetch('feed', urls, fetch)
+        await fetcher.close()
+        return results, peak, urls
+    results, peak, urls = run(scenario())
+    assert sorted(results) == sorted(urls)
+    assert peak == {'a.example.com': 2, 'b.example.com': 2}
+
+
+def test_feeds_are_served_round_robin():
+    async def scenario():
+        fetcher = EnrichmentFetcher(concurrency=1, per_host=1, feed_budget=100)
+        order = []
+
+        async def fetch(url):
+            order.append(url)
+            await asyncio.sleep(0)
+
+        await asyncio.gather(
+            fetcher.fetch('big', [f'https://big.example.com/{n}' for n in range(4)], fetch),
+            fetcher.fetch('small', ['https://small.example.com/0'], fetch),
+        )
+        await fetcher.close()
+        return order
+    order = run(scenario())
+    # The small feed does not wait for the whole backlog of the big one
+    assert order.index('https://small.example.com/0') <= 2
+
+
+def test_budget_limits_and_new_cycle():
+    async def scenario():
+        fetcher = EnrichmentFetcher(concurrency=2, per_host=2, feed_budget=2)
+
+        async def fetch(url):
+            return url
+
+        urls = [f'https://example.com/{n}' for n in range(3)]
+        first = await fetcher.fetch('feed', urls, fetch)
+        spent = await fetcher.fetch('feed', urls[2:], fetch)
+        other = await fetcher.fetch('other', urls[2:], fetch)
+        unbudgeted = await fetcher.fetch('feed', urls[2:], fetch, budgeted=False)
+        fetcher.new_cycle()
+        renewed = await fetcher.fetch('feed', urls[2:], fetch)
+        await fetcher.close()
+        return first, spent, other, unbudgeted, renewed, fetcher.stats
+    first, spent, other, unbudgeted, renewed, stats = run(scenario())
+    assert list(first) == ['https://example.com/0', 'https://example.com/1']
+    assert spent == {}
+    # Budgets are per feed, and new_cycle hands them out again
+    assert list(other) == list(unbudgeted) == list(renewed) == ['https://example.com/2']
+    assert stats['over_budget'] == 2
+
+
+def test_failed_fetches_are_left_out():
+    async def scenario():
+        fetcher = EnrichmentFetcher(concurrency=2, per_host=2, feed_budget=10)
+
+        async def fetch(url):
+            if url.endswith('bad'):
+                raise ValueError('boom')
+            return url
+
+        results = await fetcher.fetch('feed', ['https://example.com/ok', 'https://example.com/bad'], fetch)
+        await fetcher.close()
+        return results, fetcher.stats
+    results, stats = run(scenario())
+    assert list(results) == ['https://example.com/ok']
+    assert stats['failed'] == 1
@@ -0,0 +1,87 @@
+import asyncio
+
+from utilities.enrichment_queue import EnrichmentQueue, EnrichmentWorkers
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def job(key):
+    return {'_id': key, 'feed_id': 'feed', 'link': f'https://example.com/{key}'}
+
+
+def test_persisted_queue_survives_a_restart(mongo_client):
+    async def scenario():
+        collection = mongo_client['news']['enrichment_queue']
+        queue = EnrichmentQueue(collection)
+        await queue.put_many([job('a'), job('b')])
+        await queue.close()
+
+        # A new process: the jobs are still there, and a second put keeps the first job
+        restarted = EnrichmentQueue(collection)
+        await restarted.put_many([dict(job('a'), link='https://example.com/other')])
+        claimed = await restarted.claim(10)
+        again = await restarted.claim(10)
+        await restarted.complete([doc['_id'] for doc in claimed])
+        left = await collection.count_documents({})
+        await restarted.close()
+        return claimed, again, left
+    claimed, again, left = run(scenario())
+    assert sorted(doc['_id'] for doc in claimed) == ['a', 'b']
+    assert {doc['link'] for doc in claimed} == {'https://example.com/a', 'https://example.com/b'}
+    # Leased jobs are not handed out twice
+    assert again == []
+    assert left == 0
+
+
+def test_expired_lease_hands_the_job_out_again(mongo_client):
+    async def scenario():
+        queue = EnrichmentQueue(mongo_client['news']['enrichment_queue'], lease=-1)
+        await queue.put_many([job('a')])
+        first = await queue.claim(10)
+        second = await queue.claim(10)
+        await queue.close()
+        return first, second
+    first, second = run(scenario())
+    assert [doc['_id'] for doc in first] == [doc['_id'] for doc in second] == ['a']
+
+
+def test_deferred_jobs_wait_for_their_retry():
+    async def scenario():
+        queue = EnrichmentQueue()
+        await queue.put_many([job('a'), job('b')])
+        claimed = await queue.claim(10)
+        await queue.defer(['a'], delay=3600)
+        await queue.defer(['b'], delay=-1)
+        return claimed, await queue.claim(10)
+    claimed, retried = run(scenario())
+    assert len(claimed) == 2
+    assert [doc['_id'] for doc in retried] == ['b']
+
+
+def test_workers_complete_or_defer_each_job(monkeypatch):
+    import utilities.enrichment_queue as enrichment_queue
+    monkeypatch.setattr(enrichment_queue, 'ENRICH_POLL_INTERVAL', 0.01)
+
+    async def scenario(handle):
+        queue = EnrichmentQueue()
+        await queue.put_many([job('done'), job('later')])
+        workers = EnrichmentWorkers(queue, handle, workers=2, batch_size=10)
+        workers.start()
+        await workers.stop(1)
+        return queue.jobs, workers.stats
+
+    async def defer_one(jobs):
+        return ['later']
+
+    async def fail(jobs):
+        raise RuntimeError('boom')
+
+    jobs, stats = run(scenario(defer_one))
+    assert set(jobs) == {'later'}
+    assert stats['completed'] == 1 and stats['deferred'] == 1
+    # A failed batch is retried as a whole later on
+    jobs, stats = run(scenario(fail))
+    assert set(jobs) == {'done', 'later'}
+    assert stats['failed_batches'] == 1 and stats['completed'] == 0
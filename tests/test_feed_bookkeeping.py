@@ -0,0 +1,66 @@
+import asyncio
+from datetime import datetime, timedelta, UTC
+
+from utilities.feed_bookkeeping import FeedBookkeeper
+
+NOW = datetime(2025, 1, 6, 10, 30, tzinfo=UTC)
+
+
+class FakeCollection:
+    """Records bulk_write batches."""
+
+    def __init__(self, name):
+        self.name = name
+        self.batches = []
+
+    async def bulk_write(self, operations, ordered=True):
+        self.batches.append(list(operations))
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def updates(collection):
+    return [(operation._filter, operation._doc) for batch in collection.batches for operation in batch]
+
+
+def test_changes_to_a_feed_are_merged_into_one_update():
+    async def scenario():
+        feeds, feed_stats = FakeCollection('feeds'), FakeCollection('feed_stats')
+        bookkeeper = FeedBookkeeper(feeds, feed_stats)
+        await bookkeeper.checked('f1', NOW)
+        await bookkeeper.set('f1', {'language': 'en'})
+        await bookkeeper.add_items('f1', 2, NOW)
+        await bookkeeper.add_items('f1', 3, NOW)
+        await bookkeeper.close()
+        return feeds, feed_stats
+    feeds, feed_stats = run(scenario())
+    assert updates(feeds) == [({'_id': 'f1'}, {'$set': {'last_checked': NOW, 'language': 'en'}})]
+    assert updates(feed_stats) == [({'feed_id': 'f1'}, {'$set': {'last_updated': NOW}, '$inc': {'total_items': 5}})]
+
+
+def test_last_checked_is_written_only_after_the_granularity():
+    async def scenario():
+        feeds = FakeCollection('feeds')
+        bookkeeper = FeedBookkeeper(feeds, FakeCollection('feed_stats'), granularity=900)
+        # Mongo hands back naive datetimes
+        await bookkeeper.checked('recent', NOW, previous=(NOW - timedelta(minutes=5)).replace(tzinfo=None))
+        await bookkeeper.checked('stale', NOW, previous=NOW - timedelta(hours=1))
+        await bookkeeper.checked('stale', NOW + timedelta(minutes=5))
+        await bookkeeper.close()
+        return feeds
+    assert updates(run(scenario())) == [({'_id': 'stale'}, {'$set': {'last_checked': NOW}})]
+
+
+def test_flushes_when_enough_feeds_are_pending():
+    async def scenario():
+        feeds = FakeCollection('feeds')
+        bookkeeper = FeedBookkeeper(feeds, FakeCollection('feed_stats'), max_pending=2)
+        await bookkeeper.set('f1', {'type': 'news'})
+        flushed_early = bool(feeds.batches)
+        await bookkeeper.set('f2', {'type': 'news'})
+        flushed = len(updates(feeds))
+        await bookkeeper.close()
+        return flushed_early, flushed
+    assert run(scenario()) == (False, 2)
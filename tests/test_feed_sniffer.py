@@ -0,0 +1,46 @@
+from utilities.feed_sniffer import FeedSniffer, NEWS, VIDEO, PODCAST
+
+RSS = '<?xml version="1.0"?><rss version="2.0"{ns}><channel><title>t</title>{channel}{items}</channel></rss>'
+
+
+def rss(items, ns='', channel=''):
+    return RSS.format(ns=ns, channel=channel, items=''.join(f'<item><title>i</title>{item}</item>' for item in items))
+
+
+def test_plain_news_feed():
+    assert FeedSniffer.sniff(rss(['<link>https://example.com/a</link>'] * 3)) == NEWS
+
+
+def test_youtube_by_url_namespace_video_id_or_media_group():
+    assert FeedSniffer.sniff(rss([]), 'https://www.youtube.com/feeds/videos.xml?channel_id=x') == VIDEO
+    atom = '<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015" xmlns="http://www.w3.org/2005/Atom"><entry></entry></feed>'
+    assert FeedSniffer.sniff(atom) == VIDEO
+    assert FeedSniffer.sniff(rss(['<yt:videoId>abc</yt:videoId>'])) == VIDEO
+    assert FeedSniffer.sniff(rss(['<media:group><media:title>v</media:title></media:group>'])) == VIDEO
+
+
+def test_any_youtube_url_is_video():
+    assert FeedSniffer.sniff(rss([]), 'https://www.youtube.com/playlist?list=PL1') == VIDEO
+
+
+def test_video_enclosure_on_news_items_is_not_a_podcast():
+    assert FeedSniffer.sniff(rss(['<enclosure url="https://example.com/clip.mp4" type="video/mp4"/>'] * 3)) == NEWS
+
+
+def test_podcast_needs_audio_on_most_items():
+    audio = '<enclosure url="https://example.com/e.mp3" type="audio/mpeg" length="1"/>'
+    assert FeedSniffer.sniff(rss([audio, audio, ''])) == PODCAST
+    assert FeedSniffer.sniff(rss([audio, '', ''])) == NEWS
+
+
+def test_itunes_namespace_needs_podcast_metadata():
+    ns = ' xmlns:itunes="http://www.itunes.com/dtds/podcast-1.0.dtd"'
+    assert FeedSniffer.sniff(rss([''], ns=ns)) == NEWS
+    assert FeedSniffer.sniff(rss([''], ns=ns, channel='<itunes:author>Someone</itunes:author>')) == PODCAST
+    assert FeedSniffer.sniff(rss(['<itunes:duration>12:00</itunes:duration>'], ns=ns)) == PODCAST
+
+
+def test_only_the_head_is_read():
+    padding = '<item><title>i</title></item>' * 1000
+    late = '<item><yt:videoId>abc</yt:videoId></item>'
+    assert FeedSniffer.sniff(f'<rss><channel>{padding}{late}</channel></rss>'.encode()) == NEWS
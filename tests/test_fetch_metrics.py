@@ -0,0 +1,64 @@
+import asyncio
+
+from utilities.fetch_metrics import FetchMetrics
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        return self.docs
+
+
+class FakeCollection:
+    """Records bulk_write batches and aggregate pipelines; aggregate() returns `rows`."""
+
+    name = 'fetch_metrics'
+
+    def __init__(self, rows=()):
+        self.batches = []
+        self.pipelines = []
+        self.rows = list(rows)
+
+    async def bulk_write(self, operations, ordered=True):
+        self.batches.append(list(operations))
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        return FakeCursor(self.rows)
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_record_writes_one_sample_per_fetch():
+    async def scenario():
+        collection = FakeCollection()
+        metrics = FetchMetrics(collection)
+        sample = FetchMetrics.sample('https://Example.com/rss')
+        sample.update(status=200, items=3)
+        await metrics.record('f1', sample)
+        await metrics.close()
+        return collection, sample
+    collection, sample = run(scenario())
+    [[operation]] = collection.batches
+    document = operation._doc
+    assert document['meta'] == {'feed_id': 'f1', 'host': 'example.com'}
+    assert (document['status'], document['items'], document['new_items']) == (200, 3, 0)
+    assert 'url' not in document
+    # The caller's sample keeps its url
+    assert sample['url'] == 'https://Example.com/rss'
+
+
+def test_percentiles_are_keyed_by_name():
+    async def scenario():
+        collection = FakeCollection(rows=[{'_id': 'example.com', 'fetches': 2, 'errors': 0, 'latency_ms': [10.0, 20.0, 30.0]}])
+        rows = await FetchMetrics(collection).per_host(host='example.com', fields=['latency_ms'])
+        return collection, rows
+    collection, rows = run(scenario())
+    assert rows[0]['latency_ms'] == {'p50': 10.0, 'p95': 20.0, 'p99': 30.0}
+    match, group, _ = collection.pipelines[0]
+    assert match['$match']['meta.host'] == 'example.com'
+    assert group['$group']['_id'] == '$meta.host'
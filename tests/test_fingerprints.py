@@ -0,0 +1,130 @@
+import asyncio
+
+import numpy as np
+from pymongo.errors import BulkWriteError
+
+from utilities.fingerprints import FingerprintStore, BloomFilter, fingerprints
+from utilities.write_buffer import BulkWriteBuffer
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def batch_size(self, size):
+        return self
+
+    def __aiter__(self):
+        return self.iterate()
+
+    async def iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeCollection:
+    """The slice of an async collection warm() and the write buffer use."""
+
+    def __init__(self, name, docs=(), failures=0, error=None):
+        self.name = name
+        self.docs = list(docs)
+        self.failures = failures
+        self.error = error
+
+    def find(self, query, projection=None):
+        return FakeCursor(self.docs)
+
+    async def count_documents(self, query):
+        field = next(iter(query))
+        return sum(1 for doc in self.docs if isinstance(doc.get(field), str))
+
+    async def bulk_write(self, operations, ordered=True):
+        if self.failures:
+            self.failures -= 1
+            raise self.error
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter.create(1000)
+    fps = fingerprints(f"https://example.com/{n}" for n in range(1000))
+    bloom.add(fps)
+    assert bloom.contains(fps).all()
+    others = fingerprints(f"https://example.org/{n}" for n in range(1000))
+    assert bloom.contains(others).mean() < 0.05
+
+
+def test_bloom_false_positive_falls_back_to_the_sorted_file(tmp_path):
+    store = FingerprintStore(str(tmp_path / 'seen.u64'))
+    store.add_many(['https://example.com/a'])
+    store.compact()
+    # Every bit set: the filter lets everything through, the binary search has to answer
+    store.bloom.bits[:] = 0xFF
+    assert store.seen(['https://example.com/a', 'https://example.com/b']) == {'https://example.com/a'}
+
+
+def test_compact_round_trips_through_the_file(tmp_path):
+    path = str(tmp_path / 'seen.u64')
+    store = FingerprintStore(path)
+    store.add_many(['a', 'b'])
+    assert store.seen(['a', 'b', 'c']) == {'a', 'b'}
+    store.compact()
+    assert not store.pending
+    store.add_many(['c'])
+    store.compact()
+
+    reloaded = FingerprintStore(path)
+    assert reloaded.seen(['a', 'b', 'c', 'd']) == {'a', 'b', 'c'}
+    assert np.all(np.diff(reloaded.base.astype(np.float64)) > 0)
+    assert FingerprintStore(path, readonly=True).seen(['a', 'd']) == {'a'}
+
+
+def test_compact_keeps_what_another_process_compacted(tmp_path):
+    path = str(tmp_path / 'seen.u64')
+    first, second = FingerprintStore(path), FingerprintStore(path)
+    first.add_many(['a'])
+    second.add_many(['b'])
+    first.compact()
+    second.compact()
+    assert FingerprintStore(path).seen(['a', 'b', 'c']) == {'a', 'b'}
+
+
+def test_warm_reads_hot_and_cold_collections(tmp_path):
+    hot = FakeCollection('articles', [{'key': 'a'}, {'key': 'b'}, {'title': 'no key'}])
+    cold = FakeCollection('articles_archive', [{'key': 'c'}])
+    store = FingerprintStore(str(tmp_path / 'seen.u64'))
+    run(store.warm(hot, cold, fields=['key']))
+    assert store.seen(['a', 'b', 'c', 'd']) == {'a', 'b', 'c'}
+    assert len(store.base) == 3
+
+    # Up to date: a second warm-up only counts, it does not rescan
+    def find(query, projection=None):
+        raise AssertionError('rescanned an up-to-date store')
+    hot.find = cold.find = find
+    run(FingerprintStore(str(tmp_path / 'seen.u64')).warm(hot, cold, fields=['key']))
+
+
+def test_failed_article_write_is_not_marked_seen(tmp_path):
+    from utilities.news_pipeline import MongoDatabase
+
+    error = BulkWriteError({'writeErrors': [{'index': 0, 'code': 121, 'errmsg': 'validation'}]})
+
+    async def scenario():
+        database = MongoDatabase()
+        database.seen_keys = FingerprintStore(str(tmp_path / 'seen.u64'))
+        database.article_writes = BulkWriteBuffer(FakeCollection('articles', failures=1, error=error), max_age=0.01,
+                                                  dead_letter_dir=str(tmp_path))
+        docs = [{'key': 'rejected', 'title': 'a'}, {'key': 'written', 'title': 'b'}]
+        inserted = await database.insert_articles(docs)
+        await database.article_writes.close()
+        database.seen_keys.compact()
+        return inserted, database
+
+    inserted, database = run(scenario())
+    assert [doc['key'] for doc in inserted] == ['written']
+    assert not database.queued_keys
+    assert FingerprintStore(str(tmp_path / 'seen.u64')).seen(['rejected', 'written']) == {'written'}
+    assert (tmp_path / 'articles.jsonl').exists()
@@ -0,0 +1,43 @@
+from utilities.html_extract import HTMLExtractor
+
+DESCRIPTION = ('<p>First <b>bold</b> line</p><p>Second&nbsp;line<br>third</p>'
+               '<img src="https://example.com/small.jpg" srcset="https://example.com/a.jpg 320w, https://example.com/b.jpg 1024w">'
+               '<p><a href="https://example.com/x">x</a> <a href="/relative">r</a> <a href="https://example.com/x">again</a></p>')
+
+
+def test_text_image_and_links_in_one_pass():
+    result = HTMLExtractor.extract(DESCRIPTION)
+    # Block tags separate words; entities are decoded and whitespace collapsed
+    assert result['text'] == 'First bold line Second line third x r again'
+    assert result['image'] == 'https://example.com/small.jpg'
+    assert result['srcset'] == 'https://example.com/b.jpg'
+    # Only absolute links, once each
+    assert result['links'] == ['https://example.com/x']
+
+
+def test_empty_input():
+    assert HTMLExtractor.extract(None) == HTMLExtractor.empty()
+    assert HTMLExtractor.extract('') == HTMLExtractor.empty()
+    assert HTMLExtractor.extract('plain text')['text'] == 'plain text'
+
+
+def test_best_srcset_candidate():
+    assert HTMLExtractor.best_srcset_candidate('a.jpg 1x, b.jpg 2x') == 'b.jpg'
+    assert HTMLExtractor.best_srcset_candidate('a.jpg 800w, b.jpg 400w') == 'a.jpg'
+    assert HTMLExtractor.best_srcset_candidate('only.jpg') == 'only.jpg'
+    assert HTMLExtractor.best_srcset_candidate('a.jpg bogus, b.jpg 10w') == 'b.jpg'
+    assert HTMLExtractor.best_srcset_candidate('') == ''
+
+
+def test_entry_content_image_wins():
+    entry = {
+        'description': '<p>Summary</p><img src="https://example.com/d.jpg"> <a href="https://example.com/1">1</a>',
+        'content': [{'value': '<p>Body</p><picture><source srcset="https://example.com/c.webp 2x"></picture>'
+                              '<img src="https://example.com/c.jpg"><a href="https://example.com/2">2</a>'}],
+    }
+    result = HTMLExtractor.extract_entry(entry)
+    assert result['text'] == 'Summary 1'
+    assert result['image'] == 'https://example.com/c.jpg'
+    assert result['srcset'] == 'https://example.com/c.webp'
+    assert result['links'] == ['https://example.com/1', 'https://example.com/2']
+    assert HTMLExtractor.extract_batch([entry, {}]) == [result, HTMLExtractor.empty()]
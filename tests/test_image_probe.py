@@ -0,0 +1,73 @@
+import asyncio
+import struct
+from datetime import datetime, timedelta, UTC
+
+from utilities.image_probe import ImageProbe, ImageProbeCache
+
+
+def png_header(width, height):
+    return b'\x89PNG\r\n\x1a\n' + struct.pack('>I', 13) + b'IHDR' + struct.pack('>II', width, height) + b'\x08\x02\x00\x00\x00'
+
+
+def gif_header(width, height):
+    return b'GIF89a' + struct.pack('<HH', width, height) + b'\x00' * 8
+
+
+def jpeg_header(width, height):
+    app0 = b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00' + b'\x00' * 9
+    sof = b'\xff\xc0' + struct.pack('>HBHHB', 11, 8, height, width, 1) + b'\x00' * 3
+    return b'\xff\xd8' + app0 + sof
+
+
+def probe_of(header):
+    image_format = ImageProbe.image_format(header)
+    size = ImageProbe.dimensions(image_format, header) if image_format else None
+    probe = {'format': image_format, 'width': size and size[0], 'height': size and size[1], 'size': None}
+    probe['rejected'] = ImageProbe.rejection(probe)
+    return probe
+
+
+def test_formats_and_dimensions():
+    assert ImageProbe.image_format(png_header(800, 600)) == 'png'
+    assert ImageProbe.dimensions('png', png_header(800, 600)) == (800, 600)
+    assert ImageProbe.dimensions('gif', gif_header(320, 200)) == (320, 200)
+    assert ImageProbe.image_format(jpeg_header(1200, 630)) == 'jpeg'
+    assert ImageProbe.dimensions('jpeg', jpeg_header(1200, 630)) == (1200, 630)
+    assert ImageProbe.image_format(b'<html><head>') is None
+
+
+def test_truncated_header_needs_more_bytes():
+    assert ImageProbe.dimensions('jpeg', jpeg_header(1200, 630)[:12]) is None
+
+
+def test_rejections():
+    assert probe_of(png_header(800, 600))['rejected'] is None
+    assert probe_of(gif_header(1, 1))['rejected'] == 'tracking_pixel'
+    assert probe_of(png_header(40, 40))['rejected'] == 'too_small'
+    assert probe_of(png_header(3000, 100))['rejected'] == 'bad_aspect'
+    assert probe_of(b'<html>' + b'\x00' * 40)['rejected'] == 'not_image'
+    assert ImageProbe.rejection({'format': 'svg', 'width': None, 'height': None}) is None
+    assert ImageProbe.rejection({'format': 'png', 'width': None, 'height': None}) == 'unknown_size'
+
+
+def test_unknown_probe_is_neither_accepted_nor_rejected():
+    good, bad = probe_of(png_header(800, 600)), probe_of(gif_header(1, 1))
+    assert ImageProbe.accepted(good) and not ImageProbe.rejected(good)
+    assert ImageProbe.rejected(bad) and not ImageProbe.accepted(bad)
+    assert not ImageProbe.accepted(None) and not ImageProbe.rejected(None)
+
+
+def test_probe_cache_ignores_entries_stored_as_og(mongo_client):
+    collection = mongo_client['news']['image_probes']
+    probe = probe_of(png_header(800, 600))
+
+    async def scenario():
+        await collection.insert_one({'_id': 'https://example.com/old.png', 'og': None, 'expires': datetime.now(UTC) + timedelta(days=1)})
+        cache = ImageProbeCache(collection)
+        await cache.put('https://example.com/new.png', probe)
+        await cache.close()
+        found = await ImageProbeCache(collection).get_many(['https://example.com/old.png', 'https://example.com/new.png'])
+        return found, await collection.find_one({'_id': 'https://example.com/new.png'})
+    found, stored = asyncio.run(scenario())
+    assert found == {'https://example.com/new.png': probe}
+    assert stored['probe'] == probe
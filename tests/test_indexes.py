@@ -0,0 +1,53 @@
+import asyncio
+
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from utilities.indexes import IndexManager, INDEXES
+
+
+class FakeCollection:
+    """Records created indexes; refuses the ones named in `failing`."""
+
+    def __init__(self, failing=()):
+        self.created = []
+        self.failing = set(failing)
+
+    async def create_indexes(self, models):
+        for model in models:
+            if model.document['name'] in self.failing:
+                raise OperationFailure('E11000 duplicate key error')
+            self.created.append(model.document['name'])
+
+
+class FakeClient(dict):
+    def __missing__(self, name):
+        self[name] = FakeDatabase()
+        return self[name]
+
+
+class FakeDatabase(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+
+
+def test_stages_flattens_the_plan_tree():
+    plan = {'stage': 'FETCH', 'inputStage': {'stage': 'OR', 'inputStages': [{'stage': 'IXSCAN'}, {'stage': 'COLLSCAN'}]}}
+    assert IndexManager.stages(plan) == ['FETCH', 'OR', 'IXSCAN', 'COLLSCAN']
+    assert 'COLLSCAN' not in IndexManager.stages({'stage': 'PROJECTION', 'inputStage': {'stage': 'IXSCAN'}})
+
+
+def test_scoped_keeps_the_requested_databases():
+    assert set(IndexManager.scoped(INDEXES, ['news'])) == {key for key in INDEXES if key[0] == 'news'}
+    assert IndexManager.scoped(INDEXES, None) is INDEXES
+
+
+def test_ensure_keeps_going_when_an_index_fails():
+    client = FakeClient()
+    client['news']['feeds'] = FakeCollection(failing=['feed_1'])
+    indexes = {('news', 'feeds'): [IndexModel([('feed', ASCENDING)], unique=True), IndexModel([('title', ASCENDING)])],
+               ('news', 'articles'): [IndexModel([('key', ASCENDING)])]}
+    asyncio.run(IndexManager.ensure(client, indexes))
+    assert client['news']['feeds'].created == ['title_1']
+    assert client['news']['articles'].created == ['key_1']
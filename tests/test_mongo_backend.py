@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import AsyncMongoClient
+
+from utilities.mongo_backend import MongoBackend
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        return self.docs
+
+
+class MotorCollection:
+    """aggregate() hands back the cursor directly."""
+
+    def aggregate(self, pipeline):
+        return FakeCursor([{'stage': pipeline[0]}])
+
+
+class NativeCollection:
+    """aggregate() is a coroutine returning the cursor."""
+
+    async def aggregate(self, pipeline):
+        return FakeCursor([{'stage': pipeline[0]}])
+
+
+def test_create_client_picks_the_backend():
+    # Neither client connects until it is used
+    assert isinstance(MongoBackend.create_client('mongodb://localhost:27017/', 'motor'), AsyncIOMotorClient)
+    assert isinstance(MongoBackend.create_client('mongodb://localhost:27017/', 'pymongo'), AsyncMongoClient)
+    with pytest.raises(ValueError):
+        MongoBackend.create_client('mongodb://localhost:27017/', 'redis')
+
+
+def test_aggregate_reads_either_cursor():
+    pipeline = [{'$indexStats': {}}]
+    for collection in (MotorCollection(), NativeCollection()):
+        assert asyncio.run(MongoBackend.aggregate(collection, pipeline)) == [{'stage': {'$indexStats': {}}}]
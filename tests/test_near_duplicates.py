@@ -0,0 +1,64 @@
+import time
+from datetime import datetime, timedelta, UTC
+
+from utilities.near_duplicates import MinHash, DuplicateClusters, MINHASH_PERMUTATIONS
+
+STORY = 'A strong earthquake struck near Sendai in northern Japan on Monday, officials said'
+REWRITE = 'A strong earthquake struck near Sendai in northern Japan on Monday morning, officials said'
+OTHER = 'The central bank left interest rates unchanged and signalled cuts later this year'
+
+
+def test_signature_is_deterministic_and_round_trips():
+    signature = MinHash.compute(STORY)
+    assert signature.shape == (MINHASH_PERMUTATIONS,)
+    assert (MinHash.compute(STORY.upper()) == signature).all()
+    assert (MinHash.from_binary(MinHash.to_binary(signature)) == signature).all()
+
+
+def test_short_texts_have_no_signature():
+    assert MinHash.compute('Breaking news') is None
+    assert MinHash.to_binary(None) is None
+    assert MinHash.from_binary(b'\x00' * 8) is None
+
+
+def test_near_duplicates_share_a_cluster():
+    clusters = DuplicateClusters()
+    now = time.time()
+    assert clusters.assign('a', MinHash.compute(STORY), now) == 'a'
+    assert clusters.assign('b', MinHash.compute(REWRITE), now) == 'a'
+    assert clusters.assign('c', MinHash.compute(OTHER), now) == 'c'
+    assert clusters.assign('d', None, now) == 'd'
+
+
+def test_articles_leave_the_window():
+    clusters = DuplicateClusters(window_hours=1)
+    now = time.time()
+    clusters.assign('a', MinHash.compute(STORY), now - 7200)
+    assert clusters.assign('b', MinHash.compute(REWRITE), now) == 'b'
+    assert 'a' not in clusters.entries
+
+
+def test_warm_clamps_future_dates():
+    clusters = DuplicateClusters(window_hours=1)
+    future = datetime.now(UTC) + timedelta(days=30)
+    clusters.warm([
+        {'key': 'future', 'minhash': MinHash.to_binary(MinHash.compute(OTHER)), 'published': future},
+        {'key': 'a', 'minhash': MinHash.to_binary(MinHash.compute(STORY)), 'cluster_id': 'x', 'published': datetime.now(UTC)},
+    ])
+    assert clusters.assign('b', MinHash.compute(REWRITE)) == 'x'
+    # Two hours on, both warmed articles are evicted despite the future date
+    clusters.assign('c', None, time.time() + 7200)
+    assert not clusters.entries
+
+
+def test_only_stored_articles_join_the_window():
+    clusters = DuplicateClusters()
+    now = time.time()
+    story, rewrite = MinHash.compute(STORY), MinHash.compute(REWRITE)
+    # Articles in one batch cluster together before anything is stored
+    assert clusters.assign_many([('a', story), ('b', rewrite)], now) == ['a', 'a']
+    assert not clusters.entries
+    # 'a' was skipped by the database, so it never represents the cluster
+    clusters.add_many([('b', rewrite, 'a')], now)
+    assert set(clusters.entries) == {'b'}
+    assert clusters.stats['assigned'] == 1
@@ -0,0 +1,47 @@
+import asyncio
+
+from utilities import og_cache
+from utilities.og_cache import OGCache
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_ttl_depends_on_the_outcome(monkeypatch):
+    monkeypatch.setitem(og_cache.OG_CACHE_HOST_NEGATIVE_TTLS, 'slow.example.org', 7200)
+    assert OGCache.ttl_for('https://example.com/a', {'image': 'https://example.com/a.jpg'}) == og_cache.OG_CACHE_TTL
+    assert OGCache.ttl_for('https://example.com/a', {'image': None}) == og_cache.OG_CACHE_NEGATIVE_TTL
+    assert OGCache.ttl_for('https://Slow.Example.org/a', {'image': None}) == 7200
+    assert OGCache.ttl_for('https://example.com/a', None) == og_cache.OG_CACHE_ERROR_TTL
+
+
+def test_misses_and_failures_are_cached():
+    async def scenario():
+        cache = OGCache(lru_size=2)
+        await cache.put('https://a', {'image': 'https://a.jpg'})
+        await cache.put('https://b', None)
+        first = await cache.get_many(['https://a', 'https://b', 'https://c'])
+        await cache.put('https://c', {'image': None})
+        second = await cache.get_many(['https://a', 'https://b', 'https://c'])
+        return first, second, cache.stats
+    first, second, stats = run(scenario())
+    assert first == {'https://a': {'image': 'https://a.jpg'}, 'https://b': None}
+    # The LRU holds two entries; 'a' was the least recently used
+    assert second == {'https://b': None, 'https://c': {'image': None}}
+    assert stats == {'lru_hits': 4, 'store_hits': 0, 'misses': 2}
+
+
+def test_entries_are_read_back_from_the_collection(mongo_client):
+    collection = mongo_client['news']['og_cache']
+
+    async def scenario():
+        writer = OGCache(collection)
+        await writer.put('https://a', {'image': 'https://a.jpg'})
+        await writer.put('https://b', None)
+        await writer.close()
+        reader = OGCache(collection)
+        return await reader.get_many(['https://a', 'https://b', 'https://c']), reader.stats
+    found, stats = run(scenario())
+    assert found == {'https://a': {'image': 'https://a.jpg'}, 'https://b': None}
+    assert stats == {'lru_hits': 0, 'store_hits': 2, 'misses': 1}
@@ -0,0 +1,89 @@
+import asyncio
+
+from utilities.og_extract import OGExtractor
+
+HEAD = (b'<html><head><title>Story</title>'
+        b'<meta property="og:title" content="Quake &amp; aftershocks">'
+        b'<meta name="twitter:image" content="/twitter.jpg">'
+        b'<link rel="canonical" href="/story">')
+BODY = b'</head><body><meta property="og:image" content="/late.jpg"></body></html>'
+
+
+class FakeContent:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.read = 0
+
+    async def iter_chunked(self, size):
+        for chunk in self.chunks:
+            self.read += 1
+            yield chunk
+
+
+class FakeResponse:
+    def __init__(self, chunks, status=200, url='https://example.com/news/1'):
+        self.status = status
+        self.url = url
+        self.content = FakeContent(chunks)
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    def __init__(self, response):
+        self.response = response
+
+    def get(self, url, **kwargs):
+        return self.response
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_tags_after_the_head_are_ignored():
+    found = OGExtractor.extract(HEAD + BODY, 'https://example.com/news/1')
+    assert found['title'] == 'Quake & aftershocks'
+    assert found['canonical'] == 'https://example.com/story'
+    # No og:image in the head, so the twitter image stands in for it
+    assert found['image'] == 'https://example.com/twitter.jpg'
+
+
+def test_head_cut_off_before_its_end():
+    # The fetch stopped mid-tag: complete tags are used, the partial one is not
+    partial = HEAD + b'<meta property="og:image" content="/cut'
+    found = OGExtractor.extract(partial[:partial.rfind(b'>') + 1], 'https://example.com/news/1')
+    assert found['title'] == 'Quake & aftershocks'
+    assert found['image'] == 'https://example.com/twitter.jpg'
+
+
+def test_fetch_joins_tags_split_across_chunks():
+    document = HEAD + b'<meta property="og:image" content="/og.jpg">' + BODY
+    chunks = [document[i:i + 7] for i in range(0, len(document), 7)]
+    response = FakeResponse(chunks)
+    found = run(OGExtractor.fetch('https://example.com/news/1', FakeSession(response)))
+    assert found['image'] == 'https://example.com/og.jpg'
+    assert found['title'] == 'Quake & aftershocks'
+    # Reading stops at </head>; the body is never downloaded
+    assert response.content.read < len(chunks)
+    assert response.closed
+
+
+def test_fetch_stops_at_the_byte_limit_when_the_head_never_ends():
+    chunks = [HEAD] + [b'<meta name="filler" content="x">' * 32] * 100
+    response = FakeResponse(chunks)
+    found = run(OGExtractor.fetch('https://example.com/news/1', FakeSession(response), max_bytes=4096))
+    assert found['title'] == 'Quake & aftershocks'
+    assert response.content.read < len(chunks)
+
+
+def test_fetch_gives_up_on_errors():
+    assert run(OGExtractor.fetch('https://example.com/missing', FakeSession(FakeResponse([], status=404)))) is None
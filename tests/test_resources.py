@@ -0,0 +1,78 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+from utilities.resources import Resources, LazyCollection, LazyInstance
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class FakeClient(dict):
+    closed = False
+
+    def __missing__(self, name):
+        self[name] = {}
+        return self[name]
+
+    def close(self):
+        self.closed = True
+
+
+def test_client_is_created_on_first_use_once_per_loop(monkeypatch):
+    created = []
+
+    def create_client(uri, **options):
+        created.append(FakeClient())
+        created[-1]['news']['articles'] = f'articles of client {len(created)}'
+        return created[-1]
+    monkeypatch.setattr('utilities.resources.MongoBackend.create_client', create_client)
+    monkeypatch.setattr(Resources, 'mongo_clients', {})
+
+    class Database:
+        articles = LazyCollection('news', 'articles')
+
+    async def scenario():
+        first, second = Database.articles, Database.articles
+        await Resources.close()
+        return first, second
+
+    assert created == []
+    assert asyncio.run(scenario()) == ('articles of client 1', 'articles of client 1')
+    assert asyncio.run(scenario()) == ('articles of client 2', 'articles of client 2')
+    assert all(client.closed for client in created)
+    assert Resources.mongo_clients == {}
+
+
+def test_importing_the_pipelines_opens_no_connections():
+    code = (
+        "import news_module, feed_updater\n"
+        "from utilities.resources import Resources\n"
+        "assert Resources.mongo_clients == {} and Resources.sessions == {}\n"
+    )
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_lazy_instance_builds_on_first_use_and_resets():
+    built = []
+
+    def factory():
+        built.append(object())
+        return type('Thing', (), {'value': len(built)})()
+
+    thing = LazyInstance(factory)
+    assert built == []
+    assert thing.value == 1 and thing.value == 1
+    thing.reset()
+    assert thing.value == 2
+
+
+def test_importing_the_pipeline_builds_no_storage():
+    code = (
+        "import utilities.news_pipeline as pipeline\n"
+        "assert pipeline.Database.instance is None\n"
+        "assert pipeline.Tagger.instance is None and pipeline.Summaries.instance is None\n"
+    )
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime, timedelta, UTC
+
+from bson import ObjectId
+
+from utilities.retention import ArticleArchive
+
+NOW = datetime(2025, 6, 1, tzinfo=UTC)
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def article(key, days_old, feed_id='f1', **fields):
+    return dict({'_id': ObjectId(), 'key': key, 'feed_id': feed_id, 'published': NOW - timedelta(days=days_old),
+                 'title': f'Title {key}', 'description': 'body ' * 50}, **fields)
+
+
+def test_archived_article_round_trips(mongo_client):
+    db = mongo_client['news']
+    old, new = article('old', 200, tags=['world']), article('new', 1)
+
+    async def scenario():
+        await db.articles.insert_many([dict(old), dict(new)])
+        archive = ArticleArchive(db.articles, db.articles_archive)
+        moved = await archive.run(NOW)
+        stored = await db.articles_archive.find_one({'key': 'old'})
+        return moved, stored, await archive.find_by_keys(['old', 'new', 'missing'])
+
+    moved, stored, found = run(scenario())
+    assert moved == 1
+    assert 'title' not in stored and stored['published'].replace(tzinfo=UTC) == old['published']
+    found = {doc['key']: doc for doc in found}
+    assert set(found) == {'old', 'new'}
+    assert found['old']['tags'] == ['world'] and found['old']['description'] == old['description']
+
+
+def test_timeline_pages_from_hot_into_the_archive(mongo_client):
+    db = mongo_client['news']
+    # Two articles share a timestamp, so paging has to break the tie on _id
+    docs = [article('a', 1), article('b', 2), article('c', 200), article('d', 300), article('other', 1, feed_id='f2')]
+    docs.insert(2, dict(article('b2', 2), published=docs[1]['published']))
+
+    async def scenario():
+        await db.articles.insert_many([dict(doc) for doc in docs])
+        archive = ArticleArchive(db.articles, db.articles_archive)
+        await archive.run(NOW)
+        pages, before = [], None
+        while True:
+            page = await archive.timeline('f1', before, limit=2)
+            if not page:
+                return pages
+            pages.append([doc['key'] for doc in page])
+            before = (page[-1]['published'], page[-1]['_id'])
+
+    pages = run(scenario())
+    ties = sorted(['b', 'b2'], key=lambda key: next(doc['_id'] for doc in docs if doc['key'] == key), reverse=True)
+    assert pages == [['a', ties[0]], [ties[1], 'c'], ['d']]
+
+
+def test_legacy_string_dates_are_archived(mongo_client):
+    db = mongo_client['news']
+
+    async def scenario():
+        await db.articles.insert_many([
+            article('legacy', 0, published='Mon, 06 Jan 2020 10:30:00 +0000'),
+            article('recent', 0, published=(NOW - timedelta(days=1)).isoformat()),
+            article('broken', 0, published='yesterday'),
+        ])
+        archive = ArticleArchive(db.articles, db.articles_archive)
+        moved = await archive.run(NOW)
+        recent = await db.articles.find_one({'key': 'recent'})
+        return moved, await archive.find_by_keys(['legacy']), recent
+
+    moved, legacy, recent = run(scenario())
+    assert moved == 1
+    assert legacy[0]['published'].replace(tzinfo=UTC) == datetime(2020, 1, 6, 10, 30, tzinfo=UTC)
+    assert isinstance(recent['published'], datetime)
+
+
+def test_database_reads_fall_back_to_the_archive(mongo_client):
+    from utilities.news_pipeline import MongoDatabase
+
+    async def scenario():
+        database = MongoDatabase()
+        await mongo_client['news'].articles.insert_one(article('old', 200))
+        await database.archive.run(NOW)
+        return await database.find_articles(['old']), await database.feed_timeline('f1')
+
+    found, timeline = run(scenario())
+    assert [doc['key'] for doc in found] == ['old'] == [doc['key'] for doc in timeline]
+    assert found[0]['title'] == 'Title old'
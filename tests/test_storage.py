@@ -0,0 +1,127 @@
+import asyncio
+from datetime import datetime, timedelta, UTC
+
+import pytest
+
+from utilities.fingerprints import FingerprintStore
+from utilities.storage import Storage, MemoryStorage, SQLiteStorage
+
+NOW = datetime.now(UTC).replace(microsecond=0)
+
+
+@pytest.fixture(params=['memory', 'sqlite', 'mongo'])
+def storage(request, tmp_path, monkeypatch):
+    """The same NewsStorage contract, run against every backend Storage.select can return."""
+    monkeypatch.setattr('utilities.storage.SQLITE_DIR', str(tmp_path))
+    if request.param != 'mongo':
+        return Storage.select(None, 'news', request.param)
+
+    request.getfixturevalue('mongo_client')
+    from utilities.news_pipeline import MongoDatabase
+    database = Storage.select(MongoDatabase, 'news', 'mongo')
+    database.seen_keys = FingerprintStore(str(tmp_path / 'seen.u64'))
+    return database
+
+
+def run(storage, scenario):
+    async def main():
+        try:
+            return await scenario(storage)
+        finally:
+            await storage.close()
+    return asyncio.run(main())
+
+
+async def settle(storage):
+    """Write out what the Mongo storage buffers; the stand-ins write through."""
+    if hasattr(storage, 'bookkeeping'):
+        await storage.bookkeeping.flush()
+
+
+def article(key, feed_id='f1', hours_old=1, **fields):
+    return dict({'key': key, 'feed_id': feed_id, 'title': f'Title {key}', 'link': f'https://example.com/{key}',
+                 'published': NOW - timedelta(hours=hours_old), 'thumbnail': None}, **fields)
+
+
+def test_select_returns_the_requested_backend(tmp_path, monkeypatch):
+    monkeypatch.setattr('utilities.storage.SQLITE_DIR', str(tmp_path))
+    assert isinstance(Storage.select(None, 'news', 'memory'), MemoryStorage)
+    assert isinstance(Storage.select(None, 'news', 'sqlite'), SQLiteStorage)
+    with pytest.raises(ValueError):
+        Storage.select(None, 'news', 'redis')
+
+
+def test_feeds(storage):
+    async def scenario(storage):
+        feed_id = await storage.create_feed({'feed': 'https://example.com/rss', 'title': 'Example'})
+        await storage.update_feed_type(feed_id, 'news')
+        await storage.update_feed_language(feed_id, 'en')
+        await storage.update_feed_last_updated(feed_id, NOW)
+        await storage.update_feed_last_checked(feed_id, NOW)
+        await storage.update_feed_stats(feed_id, 3)
+        await storage.record_fetch(feed_id, {'url': 'https://example.com/rss', 'status': 200})
+        await settle(storage)
+        return feed_id, await storage.feed_exists('https://example.com/rss'), await storage.feed_exists('https://other'), await storage.get_all_feeds()
+
+    feed_id, found, missing, feeds = run(storage, scenario)
+    assert found['_id'] == feed_id and found['title'] == 'Example'
+    assert missing is None
+    assert [feed['_id'] for feed in feeds] == [feed_id]
+    assert (feeds[0]['type'], feeds[0]['language']) == ('news', 'en')
+    assert feeds[0]['last_checked'].replace(tzinfo=UTC) == NOW
+
+
+def test_insert_returns_only_new_articles(storage):
+    async def scenario(storage):
+        first = await storage.insert_articles([article('a'), article('b'), article('a')])
+        second = await storage.insert_articles([article('b'), article('c')])
+        return first, second, await storage.article_exists(['a', 'b', 'c', 'd'])
+
+    first, second, existing = run(storage, scenario)
+    assert [doc['key'] for doc in first] == ['a', 'b']
+    assert [doc['key'] for doc in second] == ['c']
+    assert existing == {'a', 'b', 'c'}
+
+
+def test_updates_and_reads(storage):
+    async def scenario(storage):
+        await storage.insert_articles([article('a', minhash=b'a'), article('b', hours_old=100, minhash=b'b'),
+                                       article('c', content={'raw': '<p>c</p>'}, minhash=b'c'), article('d')])
+        await storage.update_articles({'a': {'thumbnail': 'https://example.com/a.jpg', 'content': {'text': 'Text of a'}}})
+        return (await storage.find_articles(['a', 'missing']), await storage.articles_with_text(['a', 'b', 'c']),
+                await storage.recent_articles(NOW - timedelta(hours=10)))
+
+    found, with_text, recent = run(storage, scenario)
+    assert [(doc['key'], doc['thumbnail']) for doc in found] == [('a', 'https://example.com/a.jpg')]
+    assert with_text == {'a'}
+    assert sorted(doc['key'] for doc in recent) == ['a', 'c']
+
+
+def test_feed_timeline_pages_newest_first(storage):
+    async def scenario(storage):
+        await storage.insert_articles([article(key, hours_old=n) for n, key in enumerate('abcde')] + [article('x', feed_id='f2')])
+        pages, before = [], None
+        while True:
+            page = await storage.feed_timeline('f1', before, limit=2)
+            if not page:
+                return pages
+            pages.append([doc['key'] for doc in page])
+            before = (page[-1]['published'].replace(tzinfo=UTC), page[-1]['_id'])
+
+    assert run(storage, scenario) == [['a', 'b'], ['c', 'd'], ['e']]
+
+
+def test_bookkeep_updates_last_updated_only_for_new_articles(storage):
+    async def scenario(storage):
+        feed_id = await storage.create_feed({'feed': 'https://example.com/rss', 'last_updated': NOW - timedelta(days=1)})
+        await storage.bookkeep(feed_id, NOW)
+        await settle(storage)
+        quiet = await storage.feed_exists('https://example.com/rss')
+        await storage.bookkeep(feed_id, NOW + timedelta(hours=1), 2, quiet['last_checked'])
+        await settle(storage)
+        return quiet, await storage.feed_exists('https://example.com/rss')
+
+    quiet, updated = run(storage, scenario)
+    assert quiet['last_checked'].replace(tzinfo=UTC) == NOW
+    assert quiet['last_updated'].replace(tzinfo=UTC) == NOW - timedelta(days=1)
+    assert updated['last_checked'].replace(tzinfo=UTC) == updated['last_updated'].replace(tzinfo=UTC) == NOW + timedelta(hours=1)
@@ -0,0 +1,51 @@
+import asyncio
+
+from utilities.summarizer import SummaryCache, split_sentences, summarize
+
+ARTICLE = (
+    "A strong earthquake struck near Sendai in northern Japan early on Monday morning. "
+    "Officials said the earthquake damaged roads and buildings across the Sendai region. "
+    "Dr. Sato of the U.S. Geological Survey said the earthquake was shallow and strong. "
+    "Trains in the region were halted while engineers inspected the tracks for damage. "
+    "A local bakery reopened in the afternoon and sold bread to waiting customers. "
+    "Rescue teams searched damaged buildings in Sendai through the night after the earthquake."
+)
+
+
+def test_abbreviations_do_not_split_sentences():
+    sentences = split_sentences("Dr. Sato spoke to U.S. officials. They agreed. and then left.")
+    assert sentences == ["Dr. Sato spoke to U.S. officials.", "They agreed. and then left."]
+
+
+def test_summary_keeps_article_order():
+    summary, fallback = summarize(ARTICLE, 'en', budget=5.0, sentences=2)
+    assert not fallback
+    chosen = split_sentences(summary)
+    assert len(chosen) == 2
+    positions = [ARTICLE.index(sentence) for sentence in chosen]
+    assert positions == sorted(positions)
+    assert 'bakery' not in summary
+
+
+def test_short_text_is_returned_whole():
+    text = "Only one sentence here with enough words to count as a sentence."
+    assert summarize(text, 'en', sentences=3) == (text, False)
+
+
+def test_exhausted_budget_falls_back_to_the_lead():
+    summary, fallback = summarize(ARTICLE, 'en', budget=-1, sentences=2)
+    assert fallback
+    assert summary == ' '.join(split_sentences(ARTICLE)[:2])
+
+
+def test_summary_cache_stores_summaries_by_digest(mongo_client):
+    collection = mongo_client['news']['summaries']
+
+    async def scenario():
+        cache = SummaryCache(collection)
+        await cache.put('ab' * 32, 'A strong earthquake struck near Sendai.')
+        await cache.close()
+        return await SummaryCache(collection).get_many(['ab' * 32, 'cd' * 32]), await collection.find_one({})
+    found, stored = asyncio.run(scenario())
+    assert found == {'ab' * 32: 'A strong earthquake struck near Sendai.'}
+    assert stored['summary'] == 'A strong earthquake struck near Sendai.'
@@ -0,0 +1,60 @@
+import asyncio
+
+import numpy as np
+
+from utilities.tagging import rank_terms, DocumentFrequencies, TagExtractor
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_rare_terms_rank_first():
+    documents = [['earthquake', 'sendai', 'said', 'said'], ['election', 'said']]
+    vocabulary = ['earthquake', 'sendai', 'said', 'election']
+    frequencies = np.array([1, 0, 900, 5], dtype=np.float32)
+    ranked = rank_terms(documents, vocabulary, frequencies, 1000, 2)
+    assert ranked[0] == ['sendai', 'earthquake']
+    assert ranked[1][0] == 'election'
+
+
+def test_terms_in_most_documents_are_dropped():
+    documents = [['news', 'earthquake'], ['news', 'election']]
+    ranked = rank_terms(documents, ['news', 'earthquake', 'election'], np.array([990, 0, 0], dtype=np.float32), 1000, 3)
+    assert all('news' not in terms for terms in ranked)
+
+
+def test_empty_document_gets_no_terms():
+    ranked = rank_terms([['earthquake'], []], ['earthquake'], np.zeros(1, dtype=np.float32), 0, 3)
+    assert ranked == [['earthquake'], []]
+
+
+def test_categories_are_normalized():
+    entry = {'tags': [{'term': '  World  News '}, {'term': 'world news'}, {'term': 'x'}, {'term': None}]}
+    assert TagExtractor.categories(entry) == ['world news']
+
+
+def test_only_counted_articles_reach_the_frequencies():
+    async def scenario():
+        frequencies = DocumentFrequencies()
+        tagger = TagExtractor(frequencies)
+        articles = [{'title': 'Earthquake hits Sendai', 'language': 'en'}, {'title': 'Earthquake hits Sendai', 'language': 'en'}]
+        await tagger.tag(articles)
+        tagged = await frequencies.get_many('en', ['earthquake'])
+        await tagger.count(articles[:1])
+        return articles, tagged, await frequencies.get_many('en', ['earthquake'])
+    articles, (tagged, tagged_total), (counted, counted_total) = run(scenario())
+    assert 'earthquake' in articles[0]['tags']
+    assert (tagged.tolist(), tagged_total) == ([0.0], 0)
+    assert (counted.tolist(), counted_total) == ([1.0], 1)
+
+
+def test_buffered_counts_are_read_back(mongo_client):
+    async def scenario():
+        frequencies = DocumentFrequencies(mongo_client['news']['term_frequencies'])
+        await frequencies.add_documents('en', [{'earthquake'}, {'earthquake', 'sendai'}])
+        found = await frequencies.get_many('en', ['earthquake', 'sendai'])
+        await frequencies.close()
+        return found
+    frequencies, total = run(scenario())
+    assert (frequencies.tolist(), total) == ([2.0, 1.0], 2)
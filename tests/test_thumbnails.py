@@ -0,0 +1,97 @@
+import io
+import asyncio
+
+import pytest
+from PIL import Image
+
+from utilities.thumbnails import ThumbnailProxy, ThumbnailStore, PublicResolver, is_public_address, render
+
+SECRET = 'test-secret'
+URL = 'https://example.com/photo.jpg'
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def jpeg(width, height):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 40, 40)).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+def test_signed_urls_verify():
+    proxy_url = ThumbnailProxy.proxy_url(URL, 320, base='https://img.example.com/', secret=SECRET)
+    assert proxy_url.startswith('https://img.example.com/thumbnail?url=')
+    signature = ThumbnailProxy.sign(URL, SECRET)
+    assert f'sig={signature}' in proxy_url
+    assert ThumbnailProxy.verify(URL, signature, SECRET)
+    assert not ThumbnailProxy.verify(URL + '?x=1', signature, SECRET)
+    assert not ThumbnailProxy.verify(URL, signature, 'other-secret')
+    assert not ThumbnailProxy.verify(URL, '', SECRET)
+
+
+def test_nothing_is_signed_without_a_secret():
+    assert not ThumbnailProxy.verify(URL, ThumbnailProxy.sign(URL, ''), '')
+    with pytest.raises(RuntimeError):
+        ThumbnailProxy.proxy_url(URL, secret='')
+
+
+def test_private_addresses_are_rejected():
+    for address in ('127.0.0.1', '10.0.0.5', '192.168.1.1', '169.254.169.254', '100.64.0.1', '::1', 'fe80::1%eth0', 'nonsense'):
+        assert not is_public_address(address), address
+    assert is_public_address('93.184.216.34')
+
+    assert ThumbnailProxy.allowed(URL)
+    assert not ThumbnailProxy.allowed('http://127.0.0.1/admin')
+    assert not ThumbnailProxy.allowed('http://[::1]/admin')
+    assert not ThumbnailProxy.allowed('http://169.254.169.254/latest/meta-data/')
+    assert not ThumbnailProxy.allowed('file:///etc/passwd')
+
+
+def test_resolver_refuses_hosts_with_private_addresses():
+    async def scenario():
+        resolver = PublicResolver()
+        try:
+            await resolver.resolve('localhost', 80)
+        finally:
+            await resolver.close()
+    with pytest.raises(OSError):
+        run(scenario())
+
+
+def test_redirects_to_private_addresses_are_not_followed():
+    class Redirect:
+        status = 302
+        headers = {'Location': 'http://127.0.0.1/secret'}
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+    class Session:
+        requested = []
+
+        def get(self, url, **kwargs):
+            Session.requested.append(url)
+            return Redirect()
+
+    assert run(ThumbnailProxy.download(URL, Session())) is None
+    assert Session.requested == [URL]
+
+
+def test_render_and_store(tmp_path):
+    rendered = render(jpeg(800, 400), widths=(160, 1024))
+    assert (rendered['width'], rendered['height']) == (800, 400)
+    assert rendered['placeholder'].startswith('data:image/webp;base64,')
+    # Small originals are never upscaled
+    with Image.open(io.BytesIO(rendered['variants'][1024])) as image:
+        assert image.size == (800, 400)
+
+    store = ThumbnailStore(str(tmp_path))
+    meta = store.save(URL, 'ab' * 32, rendered)
+    assert store.lookup(URL) == meta
+    assert meta['digest'] == 'ab' * 32
+    assert store.lookup('https://example.com/other.jpg') is None
@@ -0,0 +1,43 @@
+import asyncio
+from datetime import datetime, timedelta, UTC
+
+from utilities.ttl_cache import TTLCache
+
+
+class NoteCache(TTLCache):
+    name = 'Note cache'
+    field = 'note'
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_values_are_stored_under_the_class_field(mongo_client):
+    collection = mongo_client['news']['notes']
+
+    async def scenario():
+        cache = NoteCache(collection)
+        await cache.put('a', 'first')
+        await cache.put('b', None)
+        await cache.close()
+        return await collection.find_one({'_id': 'a'}), await NoteCache(collection).get_many(['a', 'b'])
+    stored, found = run(scenario())
+    assert stored['note'] == 'first' and 'value' not in stored
+    assert found == {'a': 'first', 'b': None}
+
+
+def test_documents_under_another_field_are_misses(mongo_client):
+    collection = mongo_client['news']['notes']
+    expires = datetime.now(UTC) + timedelta(days=1)
+
+    async def scenario():
+        await collection.insert_many([
+            {'_id': 'old', 'og': {'image': None}, 'expires': expires},
+            {'_id': 'stale', 'note': 'gone', 'expires': datetime.now(UTC) - timedelta(days=1)},
+        ])
+        cache = NoteCache(collection)
+        return await cache.get_many(['old', 'stale']), cache.stats
+    found, stats = run(scenario())
+    assert found == {}
+    assert stats['misses'] == 2
@@ -0,0 +1,131 @@
+import asyncio
+
+from bson import json_util
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError
+
+from utilities.write_buffer import BulkWriteBuffer
+
+
+class FakeCollection:
+    """Records bulk_write batches; fails the next `failures` calls with `error`."""
+
+    name = 'fake'
+
+    def __init__(self, failures=0, error=None):
+        self.batches = []
+        self.failures = failures
+        self.error = error
+
+    async def bulk_write(self, operations, ordered=True):
+        if self.failures:
+            self.failures -= 1
+            raise self.error
+        self.batches.append(list(operations))
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_flushes_when_full_and_hands_tags_to_on_flush():
+    async def scenario():
+        collection, flushed = FakeCollection(), []
+        buffer = BulkWriteBuffer(collection, on_flush=flushed.extend, max_ops=2)
+        await buffer.add(InsertOne({'n': 1}), {'n': 1}, 'a')
+        assert collection.batches == []
+        await buffer.add(InsertOne({'n': 2}), {'n': 2}, 'b')
+        await buffer.close()
+        return collection, flushed, buffer
+    collection, flushed, buffer = run(scenario())
+    assert [len(batch) for batch in collection.batches] == [2]
+    assert flushed == ['a', 'b']
+    assert buffer.stats()['pending'] == 0
+
+
+def test_close_flushes_the_rest():
+    async def scenario():
+        collection = FakeCollection()
+        buffer = BulkWriteBuffer(collection, max_age=60)
+        await buffer.add(InsertOne({'n': 1}), {'n': 1})
+        await buffer.close()
+        return collection, buffer
+    collection, buffer = run(scenario())
+    assert len(collection.batches) == 1
+    assert buffer.task is None
+
+
+def test_failed_flush_keeps_the_batch():
+    async def scenario():
+        collection = FakeCollection(failures=1, error=RuntimeError('down'))
+        buffer = BulkWriteBuffer(collection, max_age=60)
+        await buffer.add(InsertOne({'n': 1}), {'n': 1}, 'a')
+        first = await buffer.flush()
+        pending = len(buffer.operations)
+        second = await buffer.flush()
+        await buffer.close()
+        return first, pending, second, collection
+    first, pending, second, collection = run(scenario())
+    assert (first, pending, second) == (False, 1, True)
+    assert len(collection.batches) == 1
+
+
+def test_rejected_operations_are_dropped(tmp_path):
+    error = BulkWriteError({'writeErrors': [{'index': 0, 'code': 121, 'errmsg': 'validation'}, {'index': 1, 'code': 11000}]})
+
+    async def scenario():
+        collection, flushed = FakeCollection(failures=1, error=error), []
+        buffer = BulkWriteBuffer(collection, on_flush=flushed.extend, max_age=60, dead_letter_dir=str(tmp_path))
+        results = [await buffer.add(InsertOne({'n': n}), {'n': n}, tag) for n, tag in enumerate('abc')]
+        written = await buffer.flush()
+        await buffer.close()
+        return written, flushed, buffer, [result.result() for result in results]
+    written, flushed, buffer, results = run(scenario())
+    assert written
+    assert flushed == ['b', 'c']
+    assert results == [False, True, True]
+    assert buffer.metrics['rejected'] == 1
+    assert not buffer.operations
+
+
+def test_rejected_operations_go_to_the_dead_letters(tmp_path):
+    error = BulkWriteError({'writeErrors': [{'index': 1, 'code': 121, 'errmsg': 'validation'}]})
+
+    async def scenario():
+        buffer = BulkWriteBuffer(FakeCollection(failures=1, error=error), max_age=60, dead_letter_dir=str(tmp_path))
+        await buffer.add_many([InsertOne({'n': 0}), InsertOne({'n': 1})], [{'n': 0}, {'n': 1}], ['a', 'b'])
+        await buffer.close()
+        return buffer
+    buffer = run(scenario())
+    letters = [json_util.loads(line) for line in (tmp_path / 'fake.jsonl').read_text().splitlines()]
+    assert [(letter['tag'], letter['document'], letter['error']) for letter in letters] == [('b', {'n': 1}, 'validation')]
+    assert buffer.metrics['dead_letters'] == 1
+
+
+def test_batch_failing_at_close_goes_to_the_dead_letters(tmp_path):
+    async def scenario():
+        buffer = BulkWriteBuffer(FakeCollection(failures=99, error=RuntimeError('down')), max_age=60,
+                                 dead_letter_dir=str(tmp_path))
+        result = await buffer.add(InsertOne({'n': 1}), {'n': 1}, 'a')
+        await buffer.close()
+        return buffer, result.result()
+    buffer, written = run(scenario())
+    assert written is False
+    assert not buffer.operations
+    assert len((tmp_path / 'fake.jsonl').read_text().splitlines()) == 1
+
+
+def test_batch_is_retried_until_max_failures(tmp_path, monkeypatch):
+    monkeypatch.setattr('utilities.write_buffer.WRITE_BUFFER_MAX_FAILURES', 2)
+
+    async def scenario():
+        buffer = BulkWriteBuffer(FakeCollection(failures=99, error=RuntimeError('down')), max_age=60,
+                                 dead_letter_dir=str(tmp_path))
+        result = await buffer.add(InsertOne({'n': 1}), {'n': 1}, 'a')
+        await buffer.flush()
+        retried = not result.done() and len(buffer.operations) == 1
+        await buffer.flush()
+        given_up = result.done() and not buffer.operations
+        await buffer.close()
+        return retried, given_up, result.result()
+    assert run(scenario()) == (True, True, False)
@@ -0,0 +1,141 @@
+import os
+import re
+import asyncio
+import logging
+import aiohttp
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional
+from selectolax.parser import HTMLParser, Node
+from utilities.og_extract import OGExtractor
+
+
+# --------------------------
+# Configuration and Constants
+# --------------------------
+
+ARTICLE_EXTRACTION = os.getenv('ARTICLE_EXTRACTION', '1') == '1'
+ARTICLE_MAX_BYTES = int(os.getenv('ARTICLE_MAX_BYTES', str(3 * 1024 * 1024)))
+ARTICLE_WORKERS = int(os.getenv('ARTICLE_WORKERS', str(os.cpu_count() or 2)))
+ARTICLE_TIMEOUT = aiohttp.ClientTimeout(total=int(os.getenv('ARTICLE_TIMEOUT', '15')))
+ARTICLE_MIN_CHARS = 250
+
+STRIP_TAGS = ['script', 'style', 'noscript', 'iframe', 'svg', 'form', 'nav', 'header', 'footer', 'aside', 'button', 'template']
+UNLIKELY = re.compile(r'comment|sidebar|footer|share|social|related|promo|advert|\bads?\b|cookie|newsletter|subscribe|popup|modal|menu|breadcrumb', re.I)
+LIKELY = re.compile(r'article|body|content|entry|main|post|story|text', re.I)
+TEXT_TAGS = frozenset({'p', 'h2', 'h3', 'h4', 'li', 'blockquote', 'pre'})
+
+
+# --------------------------
+# Main-content Extraction (process pool)
+# --------------------------
+
+def class_weight(node: Node) -> int:
+    names = f"{node.attributes.get('class') or ''} {node.attributes.get('id') or ''}"
+    return (25 if LIKELY.search(names) else 0) - (25 if UNLIKELY.search(names) else 0)
+
+
+def link_density(node: Node, text_length: int) -> float:
+    linked = sum(len(link.text(strip=True)) for link in node.css('a'))
+    return linked / text_length if text_length else 1.0
+
+
+def extract_main_text(html: bytes) -> str:
+    """
+    Readability-style main text: score the parents of every paragraph by its
+    length and commas, weight them by class/id hints and link density, and
+    return the text blocks of the best one.
+    """
+    tree = HTMLParser(html)
+    tree.strip_tags(STRIP_TAGS)
+    body = tree.body
+    if body is None:
+        return ''
+
+    for node in body.css('[class], [id]'):
+        if UNLIKELY.search(f"{node.attributes.get('class') or ''} {node.attributes.get('id') or ''}") \
+                and not LIKELY.search(node.attributes.get('class') or '') and node.tag not in ('body', 'article', 'main'):
+            node.decompose()
+
+    scores: Dict[int, float] = {}
+    nodes: Dict[int, Node] = {}
+    for paragraph in body.css('p'):
+        text = paragraph.text(strip=True)
+        if len(text) < 25:
+            continue
+        score = 1 + text.count(',') + min(len(text) / 100, 3)
+        parent = paragraph.parent
+        for share in (1.0, 0.5):
+            if parent is None:
+                break
+            key = parent.mem_id
+            if key not in nodes:
+                nodes[key] = parent
+                scores[key] = class_weight(parent) + (10 if parent.tag in ('article', 'main') else 0)
+            scores[key] += score * share
+            parent = parent.parent
+
+    if not scores:
+        return ''
+
+    def final(key: int) -> float:
+        node_text = nodes[key].text(strip=True)
+        return scores[key] * (1 - link_density(nodes[key], len(node_text)))
+
+    best = nodes[max(scores, key=final)]
+    blocks = []
+    for node in best.traverse():
+        if node.tag in TEXT_TAGS:
+            text = ' '.join(node.text(separator=' ').split())
+            if text and (node.tag != 'li' or link_density(node, len(text)) < 0.5):
+                blocks.append(text)
+    text = '\n\n'.join(blocks)
+    return text if len(text) >= ARTICLE_MIN_CHARS else ''
+
+
+# --------------------------
+# Shared Page Fetch
+# --------------------------
+
+class ArticleExtractor:
+    """
+    Downloads an article page once and gets both its OG metadata and its main
+    text from that download; the text extraction runs in a process pool.
+    """
+
+    pool: Optional[ProcessPoolExecutor] = None
+
+    @staticmethod
+    async def extract_text(html: bytes) -> str:
+        if ArticleExtractor.pool is None:
+            ArticleExtractor.pool = ProcessPoolExecutor(max_workers=ARTICLE_WORKERS)
+        return await asyncio.get_running_loop().run_in_executor(ArticleExtractor.pool, extract_main_text, html)
+
+    @staticmethod
+    async def fetch(url: str, session: aiohttp.ClientSession, headers: Optional[Dict[str, str]] = None) -> Optional[Dict[str, Any]]:
+        """{'og': OG metadata, 'text': main text} of a page; None when it could not be fetched."""
+        async with session.get(url, headers=headers, timeout=ARTICLE_TIMEOUT) as response:
+            if response.status != 200:
+                return None
+            if 'html' not in response.content_type:
+                return {'og': OGExtractor.extract(b''), 'text': ''}
+
+            html = bytearray()
+            async for chunk in response.content.iter_chunked(64 * 1024):
+                html += chunk
+                if len(html) >= ARTICLE_MAX_BYTES:
+                    break
+            base_url = str(response.url)
+
+        html = bytes(html)
+        try:
+            text = await ArticleExtractor.extract_text(html)
+        except Exception as e:
+            logging.warning(f"Main text extraction failed for {url}: {e}")
+            text = ''
+        return {'og': OGExtractor.extract(html, base_url), 'text': text}
+
+    @staticmethod
+    def close() -> None:
+        if ArticleExtractor.pool is not None:
+            ArticleExtractor.pool.shutdown(wait=True)
+            ArticleExtractor.pool = None
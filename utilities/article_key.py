@@ -0,0 +1,67 @@
+import hashlib
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+
+# --------------------------
+# Canonical Article Identity
+# --------------------------
+
+TRACKING_PARAMS = frozenset({
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'igshid', 'mc_cid', 'mc_eid',
+    '_hsenc', '_hsmi', 'mkt_tok', 'ocid', 'ncid', 'cmpid', 'sr_share',
+    'smid', 'ito', 'at_medium', 'at_campaign', 'rssfeed', 'from_rss',
+})
+TRACKING_PREFIXES = ('utm_', 'pk_', 'mtm_')
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+PROXY_HOSTS = ('feedproxy.google.com', 'feeds.feedburner.com')
+
+
+class ArticleKey:
+    @staticmethod
+    def canonical_url(url: str) -> str:
+        """Normalize a link so tracking variants of the same article compare equal."""
+        url = url.strip()
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower() or 'http'
+        host = (parts.hostname or '').lower()
+        if host.startswith('www.'):
+            host = host[4:]
+        if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+            host = f"{host}:{parts.port}"
+
+        query = [
+            (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+        ]
+        query.sort()
+
+        path = parts.path or '/'
+        if len(path) > 1 and path.endswith('/'):
+            path = path.rstrip('/')
+
+        # http/https variants of the same page are the same article
+        return urlunsplit(('https' if scheme in DEFAULT_PORTS else scheme, host, path, urlencode(query), ''))
+
+    @staticmethod
+    def is_proxy_link(url: str) -> bool:
+        """Feedburner `~r` redirect links hide the real article URL."""
+        host = (urlsplit(url).hostname or '').lower()
+        return host in PROXY_HOSTS and '/~r/' in url
+
+    @staticmethod
+    def for_entry(entry: dict) -> Optional[str]:
+        """Hash of the entry's canonical URL, or of its GUID when no usable URL exists."""
+        link = entry.get('feedburner_origlink') or entry.get('link') or ''
+        guid = entry.get('id') or entry.get('guid') or ''
+
+        if link and not ArticleKey.is_proxy_link(link):
+            source = ArticleKey.canonical_url(link)
+        elif guid:
+            source = ArticleKey.canonical_url(guid) if guid.startswith(('http://', 'https://')) else f"guid:{guid}"
+        elif link:
+            source = ArticleKey.canonical_url(link)
+        else:
+            return None
+
+        return hashlib.blake2b(source.encode('utf-8'), digest_size=16).hexdigest()
@@ -0,0 +1,132 @@
+import os
+import logging
+import bson
+import zstandard as zstd
+from typing import Any, Dict, List, Optional
+from pymongo import UpdateOne, DESCENDING
+from utilities.mongo_backend import MongoBackend
+from utilities.write_buffer import BulkWriteBuffer
+
+
+# --------------------------
+# Configuration and Constants
+# --------------------------
+
+CONTENT_ZSTD_LEVEL = int(os.getenv('CONTENT_ZSTD_LEVEL', '9'))
+CONTENT_DICT_SIZE = int(os.getenv('CONTENT_DICT_SIZE', str(112 * 1024)))
+CONTENT_DICT_SAMPLES = int(os.getenv('CONTENT_DICT_SAMPLES', '2000'))
+
+NO_DICTIONARY = 0
+
+
+# --------------------------
+# Compressed Content Storage
+# --------------------------
+
+class ContentStore:
+    """
+    Bulky article fields (raw HTML, full text) kept out of `articles` in a side
+    collection keyed by the article key. Every field is zstd-compressed, with a
+    trained dictionary when one exists. Fields are written at different times
+    (raw HTML at insert, text after enrichment), so each one is stored as
+    {'z': compressed, 'd': dictionary id, 'n': size} and stays readable after
+    the dictionary changes.
+    """
+
+    def __init__(self, collection: Any, dictionaries: Any, level: int = CONTENT_ZSTD_LEVEL):
+        self.collection = collection
+        self.dictionaries = dictionaries
+        self.level = level
+        self.writes = BulkWriteBuffer(collection)
+        self.dict_id = NO_DICTIONARY
+        self.compressor = zstd.ZstdCompressor(level=level)
+        self.decompressors: Dict[int, zstd.ZstdDecompressor] = {NO_DICTIONARY: zstd.ZstdDecompressor()}
+
+    async def load_dictionary(self) -> None:
+        """Use the newest trained dictionary for writes, training the first one once there is enough content."""
+        doc = await self.dictionaries.find_one({}, sort=[('_id', DESCENDING)])
+        if doc:
+            self.use_dictionary(doc['_id'], doc['data'])
+        elif await self.collection.estimated_document_count() >= CONTENT_DICT_SAMPLES:
+            await self.train()
+
+    def use_dictionary(self, dict_id: int, data: bytes) -> None:
+        dictionary = zstd.ZstdCompressionDict(data)
+        self.dict_id = dict_id
+        self.compressor = zstd.ZstdCompressor(level=self.level, dict_data=dictionary)
+        self.decompressors[dict_id] = zstd.ZstdDecompressor(dict_data=dictionary)
+        logging.info(f"Using content dictionary {dict_id} ({len(data)} bytes)")
+
+    async def decompressor(self, dict_id: int) -> zstd.ZstdDecompressor:
+        if dict_id not in self.decompressors:
+            doc = await self.dictionaries.find_one({'_id': dict_id})
+            if not doc:
+                raise KeyError(f"Content dictionary {dict_id} is missing")
+            self.decompressors[dict_id] = zstd.ZstdDecompressor(dict_data=zstd.ZstdCompressionDict(doc['data']))
+        return self.decompressors[dict_id]
+
+    async def put(self, key: str, fields: Dict[str, str]) -> None:
+        """Queue the compressed fields of one article."""
+        fields = {name: value for name, value in fields.items() if value}
+        if not fields:
+            return
+        document = {
+            name: {'z': bson.Binary(self.compressor.compress(value.encode('utf-8'))), 'd': self.dict_id, 'n': len(value)}
+            for name, value in fields.items()
+        }
+        await self.writes.add(UpdateOne({'_id': key}, {'$set': document}, upsert=True), document)
+
+    async def having(self, keys: List[str], field: str) -> set:
+        """The keys whose stored content has `field`, without loading it."""
+        if not keys:
+            return set()
+        cursor = self.collection.find({'_id': {'$in': list(keys)}, field: {'$exists': True}}, {'_id': 1})
+        return {doc['_id'] async for doc in cursor}
+
+    async def get(self, key: str, fields: Optional[List[str]] = None) -> Optional[Dict[str, str]]:
+        """Decompressed content of one article, loaded only when it is opened."""
+        projection = {name: 1 for name in fields} if fields else None
+        if projection:
+            projection['dict_id'] = 1
+        doc = await self.collection.find_one({'_id': key}, projection)
+        if not doc:
+            return None
+
+        content = {}
+        for name, value in doc.items():
+            data = await self.decompress(value, doc.get('dict_id', NO_DICTIONARY))
+            if data is not None:
+                content[name] = data.decode('utf-8')
+        return content
+
+    async def decompress(self, value: Any, legacy_dict_id: int = NO_DICTIONARY) -> Optional[bytes]:
+        """One stored field; None for anything that is not one (the _id)."""
+        if isinstance(value, dict) and 'z' in value:
+            return (await self.decompressor(value.get('d', NO_DICTIONARY))).decompress(value['z'])
+        if isinstance(value, bytes):
+            # Written before fields carried their own dictionary id
+            return (await self.decompressor(legacy_dict_id)).decompress(value)
+        return None
+
+    async def train(self, samples: int = CONTENT_DICT_SAMPLES, dict_size: int = CONTENT_DICT_SIZE) -> Optional[int]:
+        """Train a dictionary on a random sample of stored raw HTML and start using it."""
+        data = []
+        for doc in await MongoBackend.aggregate(self.collection, [{'$sample': {'size': samples}}, {'$project': {'raw': 1, 'dict_id': 1}}]):
+            raw = await self.decompress(doc.get('raw'), doc.get('dict_id', NO_DICTIONARY))
+            if raw:
+                data.append(raw)
+
+        try:
+            dictionary = zstd.train_dictionary(dict_size, data)
+        except zstd.ZstdError as e:
+            logging.warning(f"Not enough content to train a dictionary ({len(data)} samples): {e}")
+            return None
+
+        latest = await self.dictionaries.find_one({}, {'_id': 1}, sort=[('_id', DESCENDING)])
+        dict_id = (latest['_id'] if latest else NO_DICTIONARY) + 1
+        await self.dictionaries.insert_one({'_id': dict_id, 'data': bson.Binary(dictionary.as_bytes())})
+        self.use_dictionary(dict_id, dictionary.as_bytes())
+        return dict_id
+
+    async def close(self) -> None:
+        await self.writes.close()
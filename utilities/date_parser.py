@@ -0,0 +1,259 @@
+import os
+import time
+import logging
+import feedparser
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timedelta, UTC
+from typing import Any, Callable, Dict, Optional
+
+
+# --------------------------
+# Configuration and Constants
+# --------------------------
+
+DATE_FORMAT_CACHE_SIZE = int(os.getenv('DATE_FORMAT_CACHE_SIZE', '10000'))
+
+MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+}
+
+# Offsets in minutes for the zone names that show up in real feeds
+TZ_OFFSETS = {
+    'UT': 0, 'UTC': 0, 'GMT': 0, 'Z': 0, 'WET': 0,
+    'EST': -300, 'EDT': -240, 'CST': -360, 'CDT': -300,
+    'MST': -420, 'MDT': -360, 'PST': -480, 'PDT': -420,
+    'BST': 60, 'CET': 60, 'CEST': 120, 'EET': 120, 'EEST': 180,
+    'MSK': 180, 'IST': 330, 'JST': 540, 'AEST': 600, 'AEDT': 660,
+}
+
+DATE_FIELDS = ('published', 'updated', 'dc_date', 'pubDate')
+
+
+# --------------------------
+# Date Parser
+# --------------------------
+
+class DateParser:
+    # feed key -> name of the parser that last worked for that feed, least recently used first
+    feed_formats: 'OrderedDict[Any, str]' = OrderedDict()
+
+    @staticmethod
+    def parse(value: Optional[str], feed_key: Any = None) -> Optional[datetime]:
+        """
+        Parse an RSS/Atom date string into an aware UTC datetime, trying the
+        feed's last known format first.
+        """
+        if not value:
+            return None
+
+        # RFC 3339 is recognisable by shape, and one fromisoformat call is quicker than any lookup
+        if value[4:5] == '-':
+            try:
+                parsed = datetime.fromisoformat(value)
+                if parsed.tzinfo is UTC:
+                    return parsed
+                if parsed.tzinfo is not None:
+                    return parsed.astimezone(UTC)
+            except ValueError:
+                pass
+
+        value = value.strip()
+        formats = DateParser.feed_formats
+        known = formats.get(feed_key)
+        if known:
+            parsed = PARSERS[known](value)
+            if parsed:
+                formats.move_to_end(feed_key)
+                return parsed
+
+        for name, parser in PARSERS.items():
+            if name == known:
+                continue
+            parsed = parser(value)
+            if parsed:
+                formats[feed_key] = name
+                formats.move_to_end(feed_key)
+                if len(formats) > DATE_FORMAT_CACHE_SIZE:
+                    formats.popitem(last=False)
+                return parsed
+
+        logging.debug(f"Unparseable date '{value}' (feed: {feed_key})")
+        return None
+
+    @staticmethod
+    def parse_entry(entry: dict, feed_key: Any = None) -> Optional[datetime]:
+        """
+        Return an entry's publication date as an aware UTC datetime. The raw
+        strings go through parse() with the feed's key, so its format is
+        remembered; feedparser's *_parsed (UTC, without tzinfo) is the fallback.
+        """
+        for field in DATE_FIELDS:
+            parsed = DateParser.parse(entry.get(field), feed_key)
+            if parsed:
+                return parsed
+
+        for field in ('published_parsed', 'updated_parsed'):
+            parsed = entry.get(field)
+            if parsed:
+                return datetime(*parsed[:6], tzinfo=UTC)
+        return None
+
+    @staticmethod
+    def parse_rfc822(value: str) -> Optional[datetime]:
+        """Hand-written RFC 822/2822 parser that tolerates the usual feed breakage."""
+        parts = value.replace(',', ' ').split()
+        if parts and not parts[0][0].isdigit():
+            # Weekday is optional and frequently wrong, ignore it
+            parts = parts[1:]
+        if len(parts) < 4:
+            return None
+
+        day, month, year, clock = parts[:4]
+        if not day.isdigit():
+            # "Apr 14 2025" ordering
+            day, month = month, day
+        month = MONTHS.get(month[:3].lower())
+        if not month or not day.isdigit() or not year.isdigit():
+            return None
+
+        year = int(year)
+        if year < 100:
+            year += 2000 if year < 70 else 1900
+
+        clock_parts = clock.split(':')
+        try:
+            hour = int(clock_parts[0])
+            minute = int(clock_parts[1]) if len(clock_parts) > 1 else 0
+            second = int(float(clock_parts[2])) if len(clock_parts) > 2 else 0
+        except ValueError:
+            return None
+
+        offset = DateParser.parse_offset(parts[4]) if len(parts) > 4 else 0
+        if offset is None:
+            return None
+
+        try:
+            dt = datetime(year, month, int(day), hour, minute, min(second, 59), tzinfo=UTC)
+        except ValueError:
+            return None
+        return dt - timedelta(minutes=offset)
+
+    @staticmethod
+    def parse_offset(zone: str) -> Optional[int]:
+        """Return a zone's UTC offset in minutes ('+0200', '-05:00', 'EST', ...)."""
+        if zone[0] in '+-':
+            digits = zone[1:].replace(':', '')
+            if not digits.isdigit() or len(digits) not in (2, 4):
+                return None
+            minutes = int(digits[:2]) * 60 + (int(digits[2:]) if len(digits) == 4 else 0)
+            return -minutes if zone[0] == '-' else minutes
+        # An unknown zone name is not UTC; let the caller reject the date
+        return TZ_OFFSETS.get(zone.upper())
+
+    @staticmethod
+    def parse_iso8601(value: str) -> Optional[datetime]:
+        """RFC 3339/ISO 8601 via fromisoformat, with fixes for nanoseconds and trailing zone names."""
+        if len(value) < 10 or value[4] != '-':
+            return None
+        try:
+            dt = datetime.fromisoformat(value)
+        except ValueError:
+            dt = DateParser.parse_broken_iso8601(value)
+            if dt is None:
+                return None
+        if dt.tzinfo is UTC:
+            return dt
+        if dt.tzinfo is None:
+            return dt.replace(tzinfo=UTC)
+        return dt.astimezone(UTC)
+
+    @staticmethod
+    def parse_broken_iso8601(value: str) -> Optional[datetime]:
+        value = value.replace(' UTC', 'Z').replace(' GMT', 'Z')
+        if '.' in value:
+            # Trim fractions longer than microseconds ("...:00.123456789Z")
+            head, _, tail = value.partition('.')
+            digits = len(tail) - len(tail.lstrip('0123456789'))
+            value = f"{head}.{tail[:min(digits, 6)]}{tail[digits:]}" if digits else head + tail
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+
+    @staticmethod
+    def parse_email(value: str) -> Optional[datetime]:
+        """Last resort: the stdlib RFC 2822 parser."""
+        try:
+            dt = parsedate_to_datetime(value)
+        except (TypeError, ValueError, IndexError):
+            return None
+        # Naive here means a zone the parser did not know ('-0000' included), not UTC
+        if dt is None or dt.tzinfo is None:
+            return None
+        return dt.astimezone(UTC)
+
+
+PARSERS: Dict[str, Callable[[str], Optional[datetime]]] = {
+    'rfc822': DateParser.parse_rfc822,
+    'iso8601': DateParser.parse_iso8601,
+    'email': DateParser.parse_email,
+}
+
+
+# --------------------------
+# Benchmark
+# --------------------------
+
+def legacy_parse_date(date_str: Optional[str]) -> Optional[datetime]:
+    """The previous custom_parser.RSSParserUtils.parse_date, kept for comparison."""
+    if not date_str:
+        return None
+    try:
+        return datetime.fromisoformat(date_str.replace("Z", "+00:00"))
+    except ValueError:
+        pass
+    formats = [
+        "%a, %d %b %Y %H:%M:%S %z",
+        "%a, %d %b %Y %H:%M:%S %Z",
+        "%Y-%m-%dT%H:%M:%S%z",
+        "%Y-%m-%d %H:%M:%S",
+    ]
+    for fmt in formats:
+        try:
+            return datetime.strptime(date_str, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def benchmark(rounds: int = 20000) -> None:
+    """Legacy strptime loop and feedparser's own date handlers against DateParser."""
+    samples = {
+        'rfc822': 'Mon, 14 Apr 2025 09:30:00 +0200',
+        'rfc822 zone name': 'Mon, 14 Apr 2025 09:30:00 GMT',
+        'rfc3339': '2025-04-14T09:30:00Z',
+        'rfc3339 offset': '2025-04-14T09:30:00.123+02:00',
+    }
+    parse_date = feedparser.datetimes._parse_date
+
+    def timed(func: Callable[..., Any], *args: Any) -> float:
+        best = float('inf')
+        for _ in range(5):
+            start = time.perf_counter()
+            for _ in range(rounds):
+                func(*args)
+            best = min(best, time.perf_counter() - start)
+        return best / rounds * 1e6
+
+    for label, sample in samples.items():
+        legacy = timed(legacy_parse_date, sample)
+        current = timed(DateParser.parse, sample, label)
+        builtin = timed(parse_date, sample)
+
+        print(f"{label:<18} legacy {legacy:6.2f} us  feedparser {builtin:6.2f} us  new {current:6.2f} us "
+              f"({legacy / current:.1f}x)  -> {DateParser.parse(sample, feed_key=label).isoformat()}")
+
+if __name__ == '__main__':
+    benchmark()
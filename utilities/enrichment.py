@@ -0,0 +1,144 @@
+import os
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+# --------------------------
+# Configuration and Constants
+# --------------------------
+
+ENRICH_CONCURRENCY = int(os.getenv('ENRICH_CONCURRENCY', '20'))
+ENRICH_PER_HOST = int(os.getenv('ENRICH_PER_HOST', '2'))
+# Page fetches one feed may trigger per cycle; the rest wait for the next cycle
+ENRICH_FEED_BUDGET = int(os.getenv('ENRICH_FEED_BUDGET', '20'))
+
+Job = Tuple[str, Callable[[str], Awaitable[Any]], asyncio.Future]
+
+
+# --------------------------
+# Enrichment Fetcher
+# --------------------------
+
+class EnrichmentFetcher:
+    """
+    Runs page fetches for article enrichment (OG metadata, article bodies)
+    with a global concurrency limit, a per-host limit and a per-feed request
+    budget per cycle. Each feed has its own queue and workers take jobs from
+    the feeds round-robin, so one large feed cannot starve the others.
+    """
+
+    def __init__(self, concurrency: int = ENRICH_CONCURRENCY, per_host: int = ENRICH_PER_HOST,
+                 feed_budget: int = ENRICH_FEED_BUDGET):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.feed_budget = feed_budget
+
+        self.queues: OrderedDict[Any, Deque[Job]] = OrderedDict()
+        self.spent: Dict[Any, int] = {}
+        self.in_flight: Dict[str, int] = {}
+        self.changed = asyncio.Condition()
+        self.workers: List[asyncio.Task] = []
+        self.stats = {'fetched': 0, 'failed': 0, 'over_budget': 0}
+
+    @staticmethod
+    def host(url: str) -> str:
+        return (urlsplit(url).hostname or '').lower()
+
+    def new_cycle(self) -> None:
+        """Give every feed its full budget again."""
+        self.spent.clear()
+
+    async def fetch(self, feed_id: Any, urls: List[str], fetch: Callable[[str], Awaitable[Any]],
+                    budgeted: bool = True) -> Dict[str, Any]:
+        """
+        Run `fetch(url)` for the URLs of one feed, within its remaining budget
+        unless `budgeted` is off. URLs over budget are left out of the result;
+        failed fetches are too.
+        """
+        urls = list(dict.fromkeys(urls))
+        if budgeted:
+            allowed = max(0, self.feed_budget - self.spent.get(feed_id, 0))
+            if len(urls) > allowed:
+                self.stats['over_budget'] += len(urls) - allowed
+                logging.info(f"Feed {feed_id} over its enrichment budget, deferring {len(urls) - allowed} pages")
+                urls = urls[:allowed]
+            self.spent[feed_id] = self.spent.get(feed_id, 0) + len(urls)
+        if not urls:
+            return {}
+
+        loop = asyncio.get_running_loop()
+        futures = {url: loop.create_future() for url in urls}
+        async with self.changed:
+            queue = self.queues.setdefault(feed_id, deque())
+            queue.extend((url, fetch, future) for url, future in futures.items())
+            self.start()
+            self.changed.notify_all()
+
+        results = {}
+        for url, future in futures.items():
+            try:
+                results[url] = await future
+            except Exception as e:
+                logging.debug(f"Enrichment fetch failed for {url}: {e}")
+        return results
+
+    def start(self) -> None:
+        self.workers = [worker for worker in self.workers if not worker.done()]
+        while len(self.workers) < self.concurrency:
+            self.workers.append(asyncio.create_task(self.work()))
+
+    def next_job(self) -> Optional[Tuple[str, Job]]:
+        """Head job of the first feed, in round-robin order, whose host has a free slot."""
+        for feed_id in list(self.queues):
+            queue = self.queues[feed_id]
+            for index, job in enumerate(queue):
+                host = EnrichmentFetcher.host(job[0])
+                if self.in_flight.get(host, 0) < self.per_host:
+                    del queue[index]
+                    # Served feeds go to the back of the line
+                    if queue:
+                        self.queues.move_to_end(feed_id)
+                    else:
+                        del self.queues[feed_id]
+                    return host, job
+        return None
+
+    async def work(self) -> None:
+        while True:
+            async with self.changed:
+                picked = self.next_job()
+                while picked is None:
+                    await self.changed.wait()
+                    picked = self.next_job()
+                host, (url, fetch, future) = picked
+                self.in_flight[host] = self.in_flight.get(host, 0) + 1
+
+            try:
+                if not future.cancelled():
+                    result = await fetch(url)
+                    if not future.done():
+                        future.set_result(result)
+                    self.stats['fetched'] += 1
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                self.stats['failed'] += 1
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                async with self.changed:
+                    self.in_flight[host] -= 1
+                    if not self.in_flight[host]:
+                        del self.in_flight[host]
+                    self.changed.notify_all()
+
+    async def close(self) -> None:
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        logging.info(f"Enrichment fetcher: {self.stats}")
@@ -0,0 +1,164 @@
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta, UTC
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from bson import ObjectId
+from pymongo import UpdateOne
+from utilities.write_buffer import BulkWriteBuffer
+
+
+# --------------------------
+# Configuration and Constants
+# --------------------------
+
+ENRICH_WORKERS = int(os.getenv('ENRICH_WORKERS', '4'))
+ENRICH_BATCH_SIZE = int(os.getenv('ENRICH_BATCH_SIZE', '50'))
+# Claimed jobs not finished within the lease are handed out again (crashed worker)
+ENRICH_LEASE = int(os.getenv('ENRICH_LEASE', '300'))
+# Jobs a worker could not finish yet (e.g. the feed is over its budget)
+ENRICH_RETRY_DELAY = int(os.getenv('ENRICH_RETRY_DELAY', '600'))
+ENRICH_POLL_INTERVAL = float(os.getenv('ENRICH_POLL_INTERVAL', '1.0'))
+# How long a run keeps draining the queue after its feeds are done
+ENRICH_DRAIN_TIMEOUT = float(os.getenv('ENRICH_DRAIN_TIMEOUT', '120'))
+
+
+# --------------------------
+# Persistent Job Queue
+# --------------------------
+
+class EnrichmentQueue:
+    """
+    Articles waiting for enrichment, one job per article key. Workers claim
+    batches under a lease, so jobs of a worker that dies are handed out again
+    once the lease runs out. Without a collection the queue is in-process only.
+    """
+
+    def __init__(self, collection: Any = None, lease: int = ENRICH_LEASE):
+        self.collection = collection
+        self.lease = lease
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.writes = BulkWriteBuffer(collection) if collection is not None else None
+
+    async def put_many(self, jobs: List[Dict[str, Any]]) -> None:
+        """Queue jobs ({'_id': article key, 'feed_id', 'link'}); an article already queued keeps its job."""
+        now = datetime.now(UTC)
+        for job in jobs:
+            document = dict(job, available=now)
+            if self.writes is not None:
+                await self.writes.add(UpdateOne({'_id': job['_id']}, {'$setOnInsert': document}, upsert=True), document)
+            else:
+                self.jobs.setdefault(job['_id'], document)
+
+    async def claim(self, limit: int) -> List[Dict[str, Any]]:
+        """Up to `limit` available jobs, leased to the caller."""
+        now = datetime.now(UTC)
+        until = now + timedelta(seconds=self.lease)
+        if self.collection is None:
+            claimed = [job for job in self.jobs.values() if job['available'] <= now][:limit]
+            for job in claimed:
+                job['available'] = until
+            return [dict(job) for job in claimed]
+
+        # Jobs still sitting in the write buffer cannot be claimed yet
+        await self.writes.flush()
+        cursor = self.collection.find({'available': {'$lte': now}}, {'_id': 1}).sort('available', 1).limit(limit)
+        ids = [doc['_id'] async for doc in cursor]
+        if not ids:
+            return []
+        # The lease token tells this worker which of the candidates it actually won
+        token = ObjectId()
+        await self.collection.update_many({'_id': {'$in': ids}, 'available': {'$lte': now}},
+                                          {'$set': {'available': until, 'lease': token}})
+        return await self.collection.find({'lease': token}).to_list(length=None)
+
+    async def complete(self, keys: List[str]) -> None:
+        if not keys:
+            return
+        if self.collection is None:
+            for key in keys:
+                self.jobs.pop(key, None)
+        else:
+            await self.collection.delete_many({'_id': {'$in': keys}})
+
+    async def defer(self, keys: List[str], delay: int = ENRICH_RETRY_DELAY) -> None:
+        """Hand jobs out again after `delay` seconds."""
+        if not keys:
+            return
+        available = datetime.now(UTC) + timedelta(seconds=delay)
+        if self.collection is None:
+            for key in keys:
+                if key in self.jobs:
+                    self.jobs[key]['available'] = available
+        else:
+            await self.collection.update_many({'_id': {'$in': keys}}, {'$set': {'available': available}})
+
+    async def close(self) -> None:
+        if self.writes is not None:
+            await self.writes.close()
+
+
+# --------------------------
+# Worker Pool
+# --------------------------
+
+class EnrichmentWorkers:
+    """
+    Tasks that claim batches from an EnrichmentQueue and pass them to
+    `handle(jobs)`, which applies the results and returns the keys it could
+    not finish yet; those are deferred, everything else is completed.
+    """
+
+    def __init__(self, queue: EnrichmentQueue, handle: Callable[[List[Dict[str, Any]]], Awaitable[List[str]]],
+                 workers: int = ENRICH_WORKERS, batch_size: int = ENRICH_BATCH_SIZE):
+        self.queue = queue
+        self.handle = handle
+        self.workers = workers
+        self.batch_size = batch_size
+        self.tasks: List[asyncio.Task] = []
+        self.stopping: Optional[asyncio.Event] = None
+        self.stats = {'batches': 0, 'completed': 0, 'deferred': 0, 'failed_batches': 0}
+
+    def start(self) -> None:
+        self.stopping = asyncio.Event()
+        self.tasks = [asyncio.create_task(self.work()) for _ in range(self.workers)]
+
+    async def work(self) -> None:
+        while True:
+            jobs = await self.queue.claim(self.batch_size)
+            if jobs:
+                keys = [job['_id'] for job in jobs]
+                try:
+                    deferred = set(await self.handle(jobs))
+                except Exception as e:
+                    logging.error(f"Enrichment batch of {len(jobs)} articles failed: {e}")
+                    self.stats['failed_batches'] += 1
+                    deferred = set(keys)
+
+                await self.queue.complete([key for key in keys if key not in deferred])
+                await self.queue.defer(list(deferred))
+                self.stats['batches'] += 1
+                self.stats['completed'] += len(keys) - len(deferred)
+                self.stats['deferred'] += len(deferred)
+                if len(deferred) < len(keys):
+                    continue
+
+            # Nothing claimable (or no progress): stop if asked to, otherwise poll
+            if self.stopping.is_set():
+                return
+            try:
+                await asyncio.wait_for(self.stopping.wait(), ENRICH_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def stop(self, timeout: float = ENRICH_DRAIN_TIMEOUT) -> None:
+        """Let the workers finish the claimable backlog, then stop; leftovers stay queued for the next run."""
+        if self.stopping is None:
+            return
+        self.stopping.set()
+        try:
+            await asyncio.wait_for(asyncio.gather(*self.tasks), timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"Enrichment queue not drained within {timeout}s; the rest is left for the next run")
+        self.tasks = []
+        logging.info(f"Enrichment workers: {self.stats}")
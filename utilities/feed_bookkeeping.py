@@ -0,0 +1,99 @@
+import os
+import logging
+from datetime import datetime, timedelta, UTC
+from typing import Any, Dict, Optional
+from pymongo import UpdateOne
+from utilities.write_buffer import BulkWriteBuffer
+
+
+# --------------------------
+# Configuration and Constants
+# --------------------------
+
+# last_checked changes on every poll, so only persist it this often (seconds)
+LAST_CHECKED_GRANULARITY = int(os.getenv('LAST_CHECKED_GRANULARITY', '900'))
+BOOKKEEPING_MAX_PENDING = int(os.getenv('BOOKKEEPING_MAX_PENDING', '500'))
+
+
+# --------------------------
+# Coalesced Feed Bookkeeping
+# --------------------------
+
+class FeedBookkeeper:
+    """
+    Collects last_checked/last_updated/language/type changes and feed_stats
+    counters per feed, merging them into one $set/$inc update per document,
+    and writes them as batched bulk_write operations per collection.
+    """
+
+    def __init__(self, feeds: Any, feed_stats: Any,
+                 granularity: int = LAST_CHECKED_GRANULARITY, max_pending: int = BOOKKEEPING_MAX_PENDING):
+        self.granularity = timedelta(seconds=granularity)
+        self.max_pending = max_pending
+        self.feed_writes = BulkWriteBuffer(feeds)
+        self.stats_writes = BulkWriteBuffer(feed_stats)
+        self.feed_updates: Dict[Any, Dict[str, Dict[str, Any]]] = {}
+        self.stats_updates: Dict[Any, Dict[str, Dict[str, Any]]] = {}
+        self.last_checked: Dict[Any, datetime] = {}
+
+    @staticmethod
+    def merge(pending: Dict[Any, Dict[str, Dict[str, Any]]], key: Any,
+              set_fields: Optional[Dict[str, Any]] = None, inc_fields: Optional[Dict[str, int]] = None) -> None:
+        update = pending.setdefault(key, {'$set': {}, '$inc': {}})
+        if set_fields:
+            update['$set'].update(set_fields)
+        for field, amount in (inc_fields or {}).items():
+            update['$inc'][field] = update['$inc'].get(field, 0) + amount
+
+    async def set(self, feed_id: Any, fields: Dict[str, Any]) -> None:
+        FeedBookkeeper.merge(self.feed_updates, feed_id, set_fields=fields)
+        await self.maybe_flush()
+
+    async def checked(self, feed_id: Any, now: datetime, previous: Optional[datetime] = None) -> None:
+        """Record a poll, writing last_checked only when it moved by at least the configured granularity."""
+        written = self.last_checked.get(feed_id) or previous
+        if written is not None and written.tzinfo is None:
+            # Mongo hands back naive UTC datetimes
+            written = written.replace(tzinfo=UTC)
+        if written is not None and now - written < self.granularity:
+            return
+        self.last_checked[feed_id] = now
+        await self.set(feed_id, {'last_checked': now})
+
+    async def add_items(self, feed_id: Any, count: int, now: datetime) -> None:
+        """Bump feed_stats.total_items; repeated calls before a flush are summed into one $inc."""
+        FeedBookkeeper.merge(self.stats_updates, feed_id, set_fields={'last_updated': now}, inc_fields={'total_items': count})
+        await self.maybe_flush()
+
+    async def maybe_flush(self) -> None:
+        if len(self.feed_updates) + len(self.stats_updates) >= self.max_pending:
+            await self.flush()
+
+    @staticmethod
+    def operations(pending: Dict[Any, Dict[str, Dict[str, Any]]], key_field: str, upsert: bool) -> list:
+        operations = []
+        for key, update in pending.items():
+            update = {operator: fields for operator, fields in update.items() if fields}
+            if update:
+                operations.append(UpdateOne({key_field: key}, update, upsert=upsert))
+        return operations
+
+    async def flush(self) -> None:
+        feed_updates, self.feed_updates = self.feed_updates, {}
+        stats_updates, self.stats_updates = self.stats_updates, {}
+
+        feed_ops = FeedBookkeeper.operations(feed_updates, '_id', upsert=False)
+        stats_ops = FeedBookkeeper.operations(stats_updates, 'feed_id', upsert=True)
+
+        for buffer, operations in ((self.feed_writes, feed_ops), (self.stats_writes, stats_ops)):
+            if operations:
+                await buffer.add_many(operations, [None] * len(operations), [None] * len(operations))
+                await buffer.flush()
+
+        if feed_ops or stats_ops:
+            logging.info(f"Flushed bookkeeping for {len(feed_ops)} feeds and {len(stats_ops)} feed stats.")
+
+    async def close(self) -> None:
+        await self.flush()
+        await self.feed_writes.close()
+        await self.stats_writes.close()
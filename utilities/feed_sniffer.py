@@ -0,0 +1,65 @@
+import re
+from typing import Optional, Union
+
+
+# --------------------------
+# Feed Type Sniffing
+# --------------------------
+
+SNIFF_BYTES = 8192
+
+NEWS = 'news'
+VIDEO = 'video'
+PODCAST = 'podcast'
+
+ROOT_RE = re.compile(rb'<(?!\?|!)([A-Za-z][\w.-]*:)?(rss|feed|RDF)\b([^>]*)>', re.IGNORECASE)
+YT_NS_RE = re.compile(rb'xmlns(?::\w+)?=["\']http://www\.youtube\.com/xml/schemas/2015', re.IGNORECASE)
+ITUNES_NS_RE = re.compile(rb'xmlns:itunes=', re.IGNORECASE)
+ITEM_RE = re.compile(rb'<(item|entry)[\s>]', re.IGNORECASE)
+ITEM_END_RE = re.compile(rb'</(item|entry)>', re.IGNORECASE)
+VIDEO_ID_RE = re.compile(rb'<yt:videoId>', re.IGNORECASE)
+MEDIA_GROUP_RE = re.compile(rb'<media:group[\s>]', re.IGNORECASE)
+AUDIO_ENCLOSURE_RE = re.compile(rb'<enclosure[^>]+type=["\']audio/', re.IGNORECASE)
+ITUNES_CHANNEL_RE = re.compile(rb'<itunes:(author|category|owner|type|explicit)\b', re.IGNORECASE)
+ITUNES_ITEM_RE = re.compile(rb'<itunes:(duration|episode|episodeType)\b', re.IGNORECASE)
+
+
+class FeedSniffer:
+    @staticmethod
+    def sniff(data: Union[bytes, str], url: Optional[str] = None) -> str:
+        """Decide news/video/podcast from the root element, namespaces and first item of a feed's first few KB."""
+        if isinstance(data, str):
+            data = data[:SNIFF_BYTES].encode('utf-8', 'ignore')
+        head = data[:SNIFF_BYTES]
+
+        if url and 'youtube.com' in url:
+            return VIDEO
+
+        root = ROOT_RE.search(head)
+        root_attrs = root.group(3) if root else b''
+
+        if YT_NS_RE.search(root_attrs):
+            return VIDEO
+
+        items = [match.start() for match in ITEM_RE.finditer(head)]
+        channel = head[:items[0]] if items else head
+        first_item = b''
+        if items:
+            item_end = ITEM_END_RE.search(head, items[0])
+            first_item = head[items[0]:item_end.end() if item_end else len(head)]
+
+        # YouTube's channel feeds, and the media:group the old lxml check looked for
+        if VIDEO_ID_RE.search(first_item) or MEDIA_GROUP_RE.search(first_item):
+            return VIDEO
+
+        # Audio enclosures on most items; a video clip on a news item is not a podcast
+        bounds = items + [len(head)]
+        audio = sum(1 for start, end in zip(bounds, bounds[1:]) if AUDIO_ENCLOSURE_RE.search(head, start, end))
+        if items and audio * 2 > len(items):
+            return PODCAST
+
+        # The itunes namespace alone is common on blogs; require podcast metadata on the channel or item as well
+        if ITUNES_NS_RE.search(root_attrs) and (ITUNES_CHANNEL_RE.search(channel) or ITUNES_ITEM_RE.search(first_item)):
+            return PODCAST
+
+        return NEWS
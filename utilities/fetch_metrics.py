@@ -0,0 +1,115 @@
+import os
+import time
+import logging
+from datetime import datetime, timedelta, UTC
+from typing import Any, Dict, List, Optional, Sequence
+from urllib.parse import urlsplit
+from pymongo import InsertOne
+from pymongo.errors import CollectionInvalid, OperationFailure
+from utilities.mongo_backend import MongoBackend
+from utilities.write_buffer import BulkWriteBuffer
+
+
+# --------------------------
+# Configuration and Constants
+# --------------------------
+
+FETCH_METRICS_TTL_DAYS = int(os.getenv('FETCH_METRICS_TTL_DAYS', '30'))
+NAMESPACE_EXISTS = 48
+
+METRIC_FIELDS = ('latency_ms', 'bytes', 'items', 'new_items', 'parse_ms')
+
+
+# --------------------------
+# Per-fetch Samples
+# --------------------------
+
+class FetchMetrics:
+    """
+    One compact sample per feed fetch in a MongoDB time-series collection
+    (`ts` time field, `meta` = feed_id + host), inserted through a write
+    buffer and expired by the collection's expireAfterSeconds.
+    """
+
+    def __init__(self, collection: Any, ttl_days: int = FETCH_METRICS_TTL_DAYS):
+        self.collection = collection
+        self.ttl_days = ttl_days
+        self.writes = BulkWriteBuffer(collection)
+
+    async def ensure_collection(self, db: Any) -> None:
+        """Create the time-series collection if it does not exist yet."""
+        try:
+            await db.create_collection(
+                self.collection.name,
+                timeseries={'timeField': 'ts', 'metaField': 'meta', 'granularity': 'seconds'},
+                expireAfterSeconds=self.ttl_days * 86400,
+            )
+            logging.info(f"Created time-series collection {self.collection.name}")
+        except CollectionInvalid:
+            pass
+        except OperationFailure as e:
+            if e.code != NAMESPACE_EXISTS:
+                raise
+
+    @staticmethod
+    def sample(url: str) -> Dict[str, Any]:
+        """Empty sample for one fetch; the pipeline fills in what it measures."""
+        return {
+            'url': url,
+            'status': 0,
+            'latency_ms': 0.0,
+            'bytes': 0,
+            'items': 0,
+            'new_items': 0,
+            'parse_ms': 0.0,
+        }
+
+    @staticmethod
+    def elapsed_ms(start: float) -> float:
+        return round((time.perf_counter() - start) * 1000, 2)
+
+    async def record(self, feed_id: Any, sample: Dict[str, Any]) -> None:
+        url = sample.get('url', '')
+        document = {
+            'ts': datetime.now(UTC),
+            'meta': {'feed_id': feed_id, 'host': (urlsplit(url).hostname or '').lower()},
+            **{name: value for name, value in sample.items() if name != 'url'},
+        }
+        await self.writes.add(InsertOne(document), document)
+
+    async def close(self) -> None:
+        await self.writes.close()
+
+    # --------------------------
+    # Percentile Queries
+    # --------------------------
+
+    async def percentiles(self, group_by: str, window: timedelta = timedelta(hours=24),
+                          match: Optional[Dict[str, Any]] = None, fields: Sequence[str] = METRIC_FIELDS,
+                          pcts: Sequence[float] = (50, 95, 99)) -> List[Dict[str, Any]]:
+        """p50/p95/p99 of each field over `window`, grouped by `meta.<group_by>` (uses $percentile, MongoDB 7.0+)."""
+        query = {'ts': {'$gte': datetime.now(UTC) - window}}
+        query.update(match or {})
+        p = [pct / 100 for pct in pcts]
+
+        group = {'_id': f"$meta.{group_by}", 'fetches': {'$sum': 1}, 'errors': {'$sum': {'$cond': [{'$eq': ['$status', 200]}, 0, 1]}}}
+        for field in fields:
+            group[field] = {'$percentile': {'input': f"${field}", 'p': p, 'method': 'approximate'}}
+
+        rows = await MongoBackend.aggregate(self.collection, [
+            {'$match': query},
+            {'$group': group},
+            {'$sort': {'fetches': -1}},
+        ])
+        for row in rows:
+            for field in fields:
+                row[field] = dict(zip((f"p{pct:g}" for pct in pcts), row[field]))
+        return rows
+
+    async def per_feed(self, window: timedelta = timedelta(hours=24), feed_id: Any = None, **kwargs: Any) -> List[Dict[str, Any]]:
+        match = {'meta.feed_id': feed_id} if feed_id is not None else None
+        return await self.percentiles('feed_id', window, match, **kwargs)
+
+    async def per_host(self, window: timedelta = timedelta(hours=24), host: Optional[str] = None, **kwargs: Any) -> List[Dict[str, Any]]:
+        match = {'meta.host': host} if host else None
+        return await self.percentiles('host', window, match, **kwargs)
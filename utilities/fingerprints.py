@@ -0,0 +1,276 @@
+import os
+import math
+import time
+import fcntl
+import logging
+import hashlib
+import contextlib
+import numpy as np
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+
+# --------------------------
+# Configuration and Constants
+# --------------------------
+
+FINGERPRINT_PATH = os.getenv('FINGERPRINT_PATH', os.path.join('data', 'seen_urls.u64'))
+BLOOM_CAPACITY = int(os.getenv('BLOOM_CAPACITY', '2000000'))
+BLOOM_ERROR_RATE = float(os.getenv('BLOOM_ERROR_RATE', '0.01'))
+COMPACT_THRESHOLD = int(os.getenv('FINGERPRINT_COMPACT_THRESHOLD', '50000'))
+REFRESH_SECONDS = 30
+WARM_BATCH_SIZE = 10000
+# Rescan the collections at startup only when the file misses more than this share of their keys
+FINGERPRINT_WARM_SLACK = float(os.getenv('FINGERPRINT_WARM_SLACK', '0.01'))
+
+MASK_32 = np.uint64(0xFFFFFFFF)
+
+
+def fingerprint(value: str) -> int:
+    """64-bit fingerprint of a link or GUID."""
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def fingerprints(values: Iterable[str]) -> np.ndarray:
+    return np.fromiter((fingerprint(v) for v in values), dtype=np.uint64)
+
+
+def sorted_contains(haystack: np.ndarray, needles: np.ndarray) -> np.ndarray:
+    """Vectorized binary search of `needles` in the sorted `haystack`."""
+    if haystack.size == 0 or needles.size == 0:
+        return np.zeros(needles.shape[0], dtype=bool)
+    idx = np.searchsorted(haystack, needles)
+    idx[idx == haystack.size] = 0
+    return haystack[idx] == needles
+
+
+# --------------------------
+# Bloom Filter
+# --------------------------
+
+class BloomFilter:
+    def __init__(self, bits: np.ndarray, hashes: int):
+        self.bits = bits
+        self.size = bits.shape[0] * 8
+        self.hashes = hashes
+
+    @staticmethod
+    def create(capacity: int, error_rate: float = BLOOM_ERROR_RATE) -> 'BloomFilter':
+        size = max(64, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        return BloomFilter(np.zeros((size + 7) // 8, dtype=np.uint8), BloomFilter.hashes_for(error_rate))
+
+    @staticmethod
+    def hashes_for(error_rate: float = BLOOM_ERROR_RATE) -> int:
+        return max(1, round(-math.log(error_rate) / math.log(2)))
+
+    def positions(self, fps: np.ndarray) -> np.ndarray:
+        """Bit positions for every fingerprint, shape (hashes, len(fps)), via double hashing."""
+        h1 = fps & MASK_32
+        h2 = (fps >> np.uint64(32)) | np.uint64(1)
+        rounds = np.arange(self.hashes, dtype=np.uint64)[:, None]
+        return (h1[None, :] + rounds * h2[None, :]) % np.uint64(self.size)
+
+    def add(self, fps: np.ndarray) -> None:
+        if fps.size == 0:
+            return
+        pos = self.positions(fps).ravel()
+        np.bitwise_or.at(self.bits, (pos >> np.uint64(3)).astype(np.intp), (np.uint8(1) << (pos & np.uint64(7)).astype(np.uint8)))
+
+    def contains(self, fps: np.ndarray) -> np.ndarray:
+        if fps.size == 0:
+            return np.zeros(0, dtype=bool)
+        pos = self.positions(fps)
+        hits = (self.bits[(pos >> np.uint64(3)).astype(np.intp)] >> (pos & np.uint64(7)).astype(np.uint8)) & 1
+        return hits.all(axis=0)
+
+
+# --------------------------
+# Fingerprint Store
+# --------------------------
+
+class FingerprintStore:
+    """
+    Answers "have we seen this link/GUID?" without a database round trip.
+
+    Fingerprints live in a sorted uint64 file that is memory-mapped, so worker
+    processes opened with readonly=True share the same pages. A bloom filter
+    (persisted next to it as `<path>.bloom`) rejects most unseen links before
+    the binary search. New fingerprints are kept in memory until compact()
+    merges them into the file. Several writer processes can share one file:
+    compact() and warm() re-read it under `<path>.lock` and merge before
+    replacing it.
+    """
+
+    def __init__(self, path: str = FINGERPRINT_PATH, readonly: bool = False):
+        self.path = path
+        self.readonly = readonly
+        self.pending: set = set()
+        self.base = np.zeros(0, dtype=np.uint64)
+        self.bloom = BloomFilter.create(BLOOM_CAPACITY)
+        self.loaded_mtime = 0.0
+        self.checked_at = 0.0
+        self.warmed = False
+        self.load()
+
+    @property
+    def bloom_path(self) -> str:
+        return f"{self.path}.bloom"
+
+    @contextlib.contextmanager
+    def locked(self) -> Iterator[None]:
+        """Exclusive lock shared by every process writing this file."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(f"{self.path}.lock", 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def read_disk(self) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """The file's current fingerprints and bloom bits, which another process may have rewritten."""
+        if not os.path.exists(self.path) or not os.path.exists(self.bloom_path):
+            return np.zeros(0, dtype=np.uint64), None
+        return np.fromfile(self.path, dtype=np.uint64), np.fromfile(self.bloom_path, dtype=np.uint8)
+
+    def load(self) -> None:
+        """(Re)map the fingerprint file and bloom filter from disk."""
+        if not os.path.exists(self.path) or not os.path.exists(self.bloom_path):
+            return
+
+        mtime = os.path.getmtime(self.path)
+        if os.path.getsize(self.path):
+            self.base = np.memmap(self.path, dtype=np.uint64, mode='r')
+        else:
+            self.base = np.zeros(0, dtype=np.uint64)
+
+        hashes = BloomFilter.hashes_for()
+        if self.readonly:
+            self.bloom = BloomFilter(np.memmap(self.bloom_path, dtype=np.uint8, mode='r'), hashes)
+        else:
+            self.bloom = BloomFilter(np.fromfile(self.bloom_path, dtype=np.uint8), hashes)
+
+        self.loaded_mtime = mtime
+        self.warmed = True
+        logging.info(f"Loaded {len(self.base)} fingerprints from {self.path}")
+
+    def refresh(self) -> None:
+        """Pick up a file compacted by the writer process (checked at most every REFRESH_SECONDS)."""
+        now = time.monotonic()
+        if now - self.checked_at < REFRESH_SECONDS:
+            return
+        self.checked_at = now
+        if os.path.exists(self.path) and os.path.getmtime(self.path) > self.loaded_mtime:
+            self.load()
+            pending = self.pending_array()
+            self.pending.difference_update(pending[sorted_contains(self.base, pending)].tolist())
+
+    def pending_array(self) -> np.ndarray:
+        return np.fromiter(self.pending, dtype=np.uint64, count=len(self.pending))
+
+    def contains_many(self, values: List[str]) -> np.ndarray:
+        """Vectorized membership test; returns a bool array aligned with `values`."""
+        if self.readonly:
+            self.refresh()
+
+        fps = fingerprints(values)
+        found = np.zeros(fps.shape[0], dtype=bool)
+        if fps.size == 0:
+            return found
+
+        candidates = np.flatnonzero(self.bloom.contains(fps))
+        if candidates.size:
+            found[candidates] = sorted_contains(self.base, fps[candidates])
+
+        if self.pending:
+            found |= np.isin(fps, self.pending_array())
+        return found
+
+    def seen(self, values: List[str]) -> set:
+        """Return the subset of `values` that has been seen before."""
+        return {value for value, hit in zip(values, self.contains_many(values)) if hit}
+
+    def add_many(self, values: List[str]) -> None:
+        fps = fingerprints(v for v in values if v)
+        if fps.size == 0:
+            return
+        self.pending.update(fps.tolist())
+        if not self.readonly:
+            self.bloom.add(fps)
+            if len(self.pending) >= COMPACT_THRESHOLD:
+                self.compact()
+
+    def compact(self) -> None:
+        """Merge pending fingerprints into the sorted file and persist the bloom filter."""
+        if self.readonly:
+            raise RuntimeError("Read-only fingerprint store cannot be compacted")
+
+        with self.locked():
+            disk, bits = self.read_disk()
+            merged = np.union1d(disk, self.pending_array())
+            if bits is not None and bits.shape == self.bloom.bits.shape:
+                # Ours holds our own additions, the file's those of the other writers
+                bloom = BloomFilter(np.bitwise_or(bits, self.bloom.bits), self.bloom.hashes)
+            else:
+                bloom = BloomFilter.create(max(BLOOM_CAPACITY, 2 * merged.size))
+                bloom.add(merged)
+            self.write(merged, bloom)
+            self.pending.clear()
+            self.load()
+
+    def write(self, sorted_fps: np.ndarray, bloom: BloomFilter) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Write the bloom first so a reader never maps a new file with a stale filter
+        np.asarray(bloom.bits).tofile(f"{self.bloom_path}.tmp")
+        os.replace(f"{self.bloom_path}.tmp", self.bloom_path)
+        sorted_fps.astype(np.uint64).tofile(f"{self.path}.tmp")
+        os.replace(f"{self.path}.tmp", self.path)
+
+    async def stale(self, collections: Iterable[Any], fields: List[str]) -> bool:
+        """Whether the file is missing or knows noticeably fewer values than the collections hold."""
+        if not os.path.exists(self.path) or not os.path.exists(self.bloom_path):
+            return True
+        stored = 0
+        for collection in collections:
+            for field in fields:
+                stored += await collection.count_documents({field: {'$type': 'string'}})
+        known = len(self.base) + len(self.pending)
+        return known < stored * (1 - FINGERPRINT_WARM_SLACK)
+
+    async def warm(self, *collections: Any, fields: Optional[List[str]] = None, force: bool = False) -> None:
+        """Rebuild the store from every link (and GUID) in one or more Mongo collections, unless it is up to date."""
+        if self.readonly:
+            raise RuntimeError("Read-only fingerprint store cannot be warmed")
+
+        fields = fields or ['link']
+        if not force and not await self.stale(collections, fields):
+            logging.info(f"Fingerprint store {self.path} is up to date ({len(self.base)} fingerprints), skipping warm-up")
+            return
+        projection = {field: 1 for field in fields}
+        projection['_id'] = 0
+
+        chunks = []
+        batch = []
+        for collection in collections:
+            async for doc in collection.find({}, projection).batch_size(WARM_BATCH_SIZE):
+                batch.extend(doc[field] for field in fields if doc.get(field))
+                if len(batch) >= WARM_BATCH_SIZE:
+                    chunks.append(fingerprints(batch))
+                    batch = []
+        if batch:
+            chunks.append(fingerprints(batch))
+
+        merged = np.unique(np.concatenate(chunks)) if chunks else np.zeros(0, dtype=np.uint64)
+        with self.locked():
+            # Keep anything added while the scan was running, here or by another writer
+            disk, _ = self.read_disk()
+            merged = np.union1d(np.union1d(merged, disk), self.pending_array())
+            bloom = BloomFilter.create(max(BLOOM_CAPACITY, 2 * merged.size))
+            bloom.add(merged)
+            self.write(merged, bloom)
+            self.pending.clear()
+            self.load()
+        logging.info(f"Warmed fingerprint store with {merged.size} links from {', '.join(c.name for c in collections)}")
@@ -0,0 +1,107 @@
+from typing import Any, Dict, List, Optional
+from selectolax.parser import HTMLParser
+
+
+# --------------------------
+# Single-pass HTML extraction
+# --------------------------
+
+# Tags that start a new line of text; mirrors the old `</?p>` -> '\n' substitution
+# but also covers the other block elements feeds put in descriptions.
+BLOCK_TAGS = frozenset({
+    'p', 'br', 'div', 'li', 'ul', 'ol', 'tr', 'td', 'th', 'blockquote',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'figure', 'figcaption', 'hr', 'pre',
+})
+
+
+class HTMLExtractor:
+    @staticmethod
+    def empty() -> Dict[str, Any]:
+        return {'text': '', 'image': '', 'srcset': '', 'links': []}
+
+    @staticmethod
+    def extract(html_text: Optional[str]) -> Dict[str, Any]:
+        """Parse an HTML fragment once and return its clean text, first image, best srcset candidate and links."""
+        result = HTMLExtractor.empty()
+        if not html_text:
+            return result
+
+        tree = HTMLParser(html_text)
+        root = tree.body or tree.root
+        if root is None:
+            return result
+
+        parts = []
+        links = []
+        seen_links = set()
+
+        for node in root.traverse(include_text=True):
+            tag = node.tag
+            if tag == '-text':
+                parts.append(node.text(deep=False))
+            elif tag in BLOCK_TAGS:
+                parts.append(' ')
+            elif tag == 'img':
+                attrs = node.attributes
+                if not result['image'] and attrs.get('src'):
+                    result['image'] = attrs['src']
+                if not result['srcset'] and attrs.get('srcset'):
+                    result['srcset'] = HTMLExtractor.best_srcset_candidate(attrs['srcset'])
+            elif tag == 'source':
+                srcset = node.attributes.get('srcset')
+                if not result['srcset'] and srcset:
+                    result['srcset'] = HTMLExtractor.best_srcset_candidate(srcset)
+            elif tag == 'a':
+                href = (node.attributes.get('href') or '').strip()
+                if href.startswith(('http://', 'https://')) and href not in seen_links:
+                    seen_links.add(href)
+                    links.append(href)
+
+        result['text'] = ' '.join(''.join(parts).split())
+        result['links'] = links
+        return result
+
+    @staticmethod
+    def best_srcset_candidate(srcset: str) -> str:
+        """Return the largest candidate of a srcset attribute (by width or pixel density)."""
+        best_url, best_size = '', -1.0
+        for candidate in srcset.split(','):
+            fields = candidate.split()
+            if not fields:
+                continue
+            size = 0.0
+            if len(fields) > 1:
+                descriptor = fields[1].lower()
+                try:
+                    if descriptor.endswith('w'):
+                        size = float(descriptor[:-1])
+                    elif descriptor.endswith('x'):
+                        # Keep densities comparable with widths of a typical 1x image.
+                        size = float(descriptor[:-1]) * 1000
+                except ValueError:
+                    size = 0.0
+            if size > best_size:
+                best_url, best_size = fields[0], size
+        return best_url
+
+    @staticmethod
+    def extract_entry(entry: dict) -> Dict[str, Any]:
+        """Extract a feed entry's description and content:encoded, parsing each fragment once."""
+        description = entry.get('description', '') or ''
+        content = (entry.get('content') or [{}])[0].get('value', '') or ''
+
+        result = HTMLExtractor.extract(description)
+        if not content or content == description:
+            return result
+
+        from_content = HTMLExtractor.extract(content)
+        # content:encoded images win, matching the old extract_thumbnail order
+        result['image'] = from_content['image'] or result['image']
+        result['srcset'] = result['srcset'] or from_content['srcset']
+        result['links'] = list(dict.fromkeys(result['links'] + from_content['links']))
+        return result
+
+    @staticmethod
+    def extract_batch(entries: List[dict]) -> List[Dict[str, Any]]:
+        """Extract every entry of a feed in one call."""
+        return [HTMLExtractor.extract_entry(entry) for entry in entries]
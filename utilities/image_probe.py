@@ -0,0 +1,199 @@
+import os
+import struct
+import logging
+import aiohttp
+from typing import Any, Dict, Optional, Tuple
+from utilities.og_cache import OG_CACHE_ERROR_TTL
+from utilities.ttl_cache import TTLCache
+
+
+# --------------------------
+# Configuration and Constants
+# --------------------------
+
+# Read in small chunks and stop at the header; JPEGs with large EXIF blocks read on up to the max
+IMAGE_PROBE_CHUNK = 4 * 1024
+IMAGE_PROBE_MAX_BYTES = int(os.getenv('IMAGE_PROBE_MAX_BYTES', str(128 * 1024)))
+IMAGE_PROBE_TIMEOUT = aiohttp.ClientTimeout(total=int(os.getenv('IMAGE_PROBE_TIMEOUT', '10')))
+IMAGE_PROBE_TTL = int(os.getenv('IMAGE_PROBE_TTL', str(30 * 86400)))
+
+IMAGE_MIN_SIDE = int(os.getenv('IMAGE_MIN_SIDE', '50'))
+IMAGE_MAX_PIXELS = int(os.getenv('IMAGE_MAX_PIXELS', str(50_000_000)))
+IMAGE_MAX_BYTES = int(os.getenv('IMAGE_MAX_BYTES', str(20 * 1024 * 1024)))
+IMAGE_MAX_ASPECT = float(os.getenv('IMAGE_MAX_ASPECT', '5'))
+TRACKING_PIXEL_SIDE = 2
+
+# JPEG start-of-frame markers (C4, C8 and CC are DHT, JPG and DAC)
+JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+HEIF_BRANDS = (b'avif', b'avis', b'heic', b'heix', b'mif1')
+
+
+# --------------------------
+# Image Header Probing
+# --------------------------
+
+class ImageProbe:
+    @staticmethod
+    def image_format(header: bytes) -> Optional[str]:
+        if header.startswith(b'\x89PNG\r\n\x1a\n'):
+            return 'png'
+        if header[:2] == b'\xff\xd8':
+            return 'jpeg'
+        if header[:6] in (b'GIF87a', b'GIF89a'):
+            return 'gif'
+        if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+            return 'webp'
+        if header[4:8] == b'ftyp' and header[8:12] in HEIF_BRANDS:
+            return 'avif' if header[8:12] in (b'avif', b'avis') else 'heif'
+        if header[:2] == b'BM':
+            return 'bmp'
+        return None
+
+    @staticmethod
+    def dimensions(image_format: str, header: bytes) -> Optional[Tuple[int, int]]:
+        """Width and height from the header bytes, or None while more bytes are needed."""
+        try:
+            if image_format == 'png' and len(header) >= 24:
+                return struct.unpack('>II', header[16:24])
+            if image_format == 'gif' and len(header) >= 10:
+                return struct.unpack('<HH', header[6:10])
+            if image_format == 'bmp' and len(header) >= 26:
+                width, height = struct.unpack('<ii', header[18:26])
+                return width, abs(height)
+            if image_format == 'webp' and len(header) >= 30:
+                return ImageProbe.webp_dimensions(header)
+            if image_format in ('avif', 'heif'):
+                index = header.find(b'ispe')
+                if index != -1 and len(header) >= index + 16:
+                    return struct.unpack('>II', header[index + 8:index + 16])
+            if image_format == 'jpeg':
+                return ImageProbe.jpeg_dimensions(header)
+        except struct.error:
+            pass
+        return None
+
+    @staticmethod
+    def webp_dimensions(header: bytes) -> Optional[Tuple[int, int]]:
+        chunk = header[12:16]
+        if chunk == b'VP8 ':
+            width, height = struct.unpack('<HH', header[26:30])
+            return width & 0x3FFF, height & 0x3FFF
+        if chunk == b'VP8L':
+            b0, b1, b2, b3 = header[21:25]
+            return 1 + (((b1 & 0x3F) << 8) | b0), 1 + (((b3 & 0x0F) << 10) | (b2 << 2) | ((b1 & 0xC0) >> 6))
+        if chunk == b'VP8X':
+            return 1 + int.from_bytes(header[24:27], 'little'), 1 + int.from_bytes(header[27:30], 'little')
+        return None
+
+    @staticmethod
+    def jpeg_dimensions(header: bytes) -> Optional[Tuple[int, int]]:
+        """Walk the JPEG segments up to the first start-of-frame."""
+        index = 2
+        while index + 9 < len(header):
+            if header[index] != 0xFF:
+                return None
+            marker = header[index + 1]
+            if marker == 0xFF:
+                index += 1
+                continue
+            if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+                index += 2
+                continue
+            if marker in JPEG_SOF:
+                height, width = struct.unpack('>HH', header[index + 5:index + 9])
+                return width, height
+            index += 2 + struct.unpack('>H', header[index + 2:index + 4])[0]
+        return None
+
+    @staticmethod
+    def rejection(probe: Dict[str, Any]) -> Optional[str]:
+        """Why a probed image should not be used as a thumbnail, or None when it is fine."""
+        if not probe.get('format'):
+            return 'not_image'
+        width, height = probe.get('width'), probe.get('height')
+        if probe.get('size') and probe['size'] > IMAGE_MAX_BYTES:
+            return 'too_large'
+        if width is None or height is None:
+            # SVG, or a header we could not read within the probe limit
+            return None if probe['format'] == 'svg' else 'unknown_size'
+        if width <= TRACKING_PIXEL_SIDE and height <= TRACKING_PIXEL_SIDE:
+            return 'tracking_pixel'
+        if min(width, height) < IMAGE_MIN_SIDE:
+            return 'too_small'
+        if width * height > IMAGE_MAX_PIXELS:
+            return 'too_large'
+        if max(width, height) / min(width, height) > IMAGE_MAX_ASPECT:
+            return 'bad_aspect'
+        return None
+
+    @staticmethod
+    def total_size(response: aiohttp.ClientResponse) -> Optional[int]:
+        content_range = response.headers.get('Content-Range', '')
+        if '/' in content_range and content_range.rsplit('/', 1)[1].isdigit():
+            return int(content_range.rsplit('/', 1)[1])
+        if response.status == 200 and response.content_length is not None:
+            return response.content_length
+        return None
+
+    @staticmethod
+    async def probe(url: str, session: aiohttp.ClientSession, headers: Optional[Dict[str, str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Format, size and dimensions of an image from its first bytes: asks for a
+        byte range and stops reading as soon as the header is parsed (servers
+        that ignore Range are cut off the same way). None when unreachable.
+        """
+        headers = dict(headers or {}, Range=f'bytes=0-{IMAGE_PROBE_MAX_BYTES - 1}')
+        try:
+            async with session.get(url, headers=headers, timeout=IMAGE_PROBE_TIMEOUT) as response:
+                if response.status not in (200, 206):
+                    return None
+
+                header = b''
+                image_format = None
+                size = None
+                async for chunk in response.content.iter_chunked(IMAGE_PROBE_CHUNK):
+                    header += chunk
+                    image_format = ImageProbe.image_format(header)
+                    size = image_format and ImageProbe.dimensions(image_format, header)
+                    if size or len(header) >= IMAGE_PROBE_MAX_BYTES or (image_format is None and len(header) >= 32):
+                        break
+                response.close()
+                if image_format is None and response.content_type == 'image/svg+xml':
+                    image_format = 'svg'
+
+                probe = {
+                    'format': image_format,
+                    'width': size[0] if size else None,
+                    'height': size[1] if size else None,
+                    'size': ImageProbe.total_size(response),
+                }
+                probe['rejected'] = ImageProbe.rejection(probe)
+                return probe
+
+        except Exception as e:
+            logging.debug(f"Image probe failed for {url}: {e}")
+            return None
+
+    @staticmethod
+    def accepted(probe: Optional[Dict[str, Any]]) -> bool:
+        return probe is not None and not probe.get('rejected')
+
+    @staticmethod
+    def rejected(probe: Optional[Dict[str, Any]]) -> bool:
+        """Whether the probe ran and turned the image down; None (unreachable for now) is not a rejection."""
+        return probe is not None and bool(probe.get('rejected'))
+
+
+# --------------------------
+# Probe Cache
+# --------------------------
+
+class ImageProbeCache(TTLCache):
+    """Image URL -> probe result, or None when unreachable; those are retried sooner."""
+
+    name = 'Image probe cache'
+    field = 'probe'
+
+    @staticmethod
+    def ttl_for(url: str, probe: Optional[Dict[str, Any]]) -> int:
+        return OG_CACHE_ERROR_TTL if probe is None else IMAGE_PROBE_TTL
@@ -0,0 +1,148 @@
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from utilities.mongo_backend import MongoBackend
+
+
+# --------------------------
+# Declared Indexes
+# --------------------------
+
+# (database, collection) -> indexes every pipeline relies on
+INDEXES: Dict[Tuple[str, str], List[IndexModel]] = {
+    ('news', 'feeds'): [
+        IndexModel([('feed', ASCENDING)], unique=True),
+    ],
+    ('news', 'articles'): [
+        # Legacy documents without a key are kept out of the unique index
+        IndexModel([('key', ASCENDING)], unique=True,
+                   partialFilterExpression={'key': {'$type': 'string'}}),
+        # A feed's timeline, paged on (published, _id)
+        IndexModel([('feed_id', ASCENDING), ('published', DESCENDING), ('_id', DESCENDING)]),
+        IndexModel([('published', DESCENDING)]),
+        # Collapsing near-duplicates: every article of a story
+        IndexModel([('cluster_id', ASCENDING), ('published', DESCENDING)]),
+        # Multikey: filtering by tag is an index lookup instead of a regex scan
+        IndexModel([('tags', ASCENDING), ('published', DESCENDING)]),
+    ],
+    ('news', 'articles_archive'): [
+        IndexModel([('key', ASCENDING)], unique=True,
+                   partialFilterExpression={'key': {'$type': 'string'}}),
+        IndexModel([('feed_id', ASCENDING), ('published', DESCENDING), ('_id', DESCENDING)]),
+    ],
+    ('news', 'og_cache'): [
+        IndexModel([('expires', ASCENDING)], expireAfterSeconds=0),
+    ],
+    ('news', 'image_probes'): [
+        IndexModel([('expires', ASCENDING)], expireAfterSeconds=0),
+    ],
+    ('news', 'summaries'): [
+        IndexModel([('expires', ASCENDING)], expireAfterSeconds=0),
+    ],
+    ('news', 'feed_stats'): [
+        IndexModel([('feed_id', ASCENDING)], unique=True),
+    ],
+    ('news', 'enrichment_queue'): [
+        IndexModel([('available', ASCENDING)]),
+        IndexModel([('lease', ASCENDING)]),
+    ],
+    ('video_database', 'feeds'): [
+        IndexModel([('feed', ASCENDING)], unique=True),
+    ],
+    ('video_database', 'videos'): [
+        IndexModel([('video_id', ASCENDING)], unique=True),
+        IndexModel([('feed_id', ASCENDING), ('published', DESCENDING)]),
+    ],
+}
+
+# Query shapes the pipelines issue; each must be answered by an index
+QUERY_SHAPES: Dict[Tuple[str, str], List[Dict[str, Any]]] = {
+    ('news', 'feeds'): [{'feed': ''}],
+    ('news', 'articles'): [{'key': {'$in': ['']}}, {'feed_id': None}, {'cluster_id': ''}, {'tags': ''}],
+    ('news', 'articles_archive'): [{'key': {'$in': ['']}}, {'feed_id': None}],
+    ('news', 'feed_stats'): [{'feed_id': None}],
+    ('news', 'enrichment_queue'): [{'available': {'$lte': None}}, {'lease': None}],
+    ('video_database', 'feeds'): [{'feed': ''}],
+    ('video_database', 'videos'): [{'video_id': {'$in': ['']}}],
+}
+
+
+# --------------------------
+# Index Manager
+# --------------------------
+
+class IndexManager:
+    @staticmethod
+    async def ensure(client: Any, indexes: Dict[Tuple[str, str], List[IndexModel]] = INDEXES) -> None:
+        """Create every declared index; safe to run on each startup."""
+        for (db_name, collection_name), models in indexes.items():
+            collection = client[db_name][collection_name]
+            for model in models:
+                try:
+                    await collection.create_indexes([model])
+                except OperationFailure as e:
+                    # e.g. duplicates that predate a unique index; keep starting up
+                    logging.error(f"Could not create index {model.document['name']} on {db_name}.{collection_name}: {e}")
+        logging.info(f"Ensured indexes on {len(indexes)} collections.")
+
+    @staticmethod
+    async def usage(client: Any, indexes: Dict[Tuple[str, str], List[IndexModel]] = INDEXES) -> Dict[str, Dict[str, int]]:
+        """Return `$indexStats` operation counts per collection and warn about missing or unused indexes."""
+        report = {}
+        for (db_name, collection_name), models in indexes.items():
+            collection = client[db_name][collection_name]
+            stats = await MongoBackend.aggregate(collection, [{'$indexStats': {}}])
+            ops = {stat['name']: stat['accesses']['ops'] for stat in stats}
+            report[f"{db_name}.{collection_name}"] = ops
+
+            for model in models:
+                name = model.document['name']
+                if name not in ops:
+                    logging.warning(f"Index {name} is missing on {db_name}.{collection_name}")
+                elif ops[name] == 0:
+                    logging.warning(f"Index {name} on {db_name}.{collection_name} has not been used since the last restart")
+        return report
+
+    @staticmethod
+    async def check_query_shapes(client: Any, shapes: Dict[Tuple[str, str], List[Dict[str, Any]]] = QUERY_SHAPES) -> List[str]:
+        """Explain each known query shape and warn about the ones that fall back to a collection scan."""
+        unindexed = []
+        for (db_name, collection_name), filters in shapes.items():
+            collection = client[db_name][collection_name]
+            for query in filters:
+                plan = await collection.find(query).explain()
+                if 'COLLSCAN' in IndexManager.stages(plan.get('queryPlanner', {}).get('winningPlan', {})):
+                    shape = f"{db_name}.{collection_name} {query}"
+                    logging.warning(f"Query runs without an index: {shape}")
+                    unindexed.append(shape)
+        return unindexed
+
+    @staticmethod
+    def stages(plan: Dict[str, Any]) -> List[str]:
+        """Flatten the stage names of an explain() plan tree."""
+        stages = [plan['stage']] if 'stage' in plan else []
+        for child in ('inputStage', 'queryPlan'):
+            if child in plan:
+                stages.extend(IndexManager.stages(plan[child]))
+        for child in plan.get('inputStages', []):
+            stages.extend(IndexManager.stages(child))
+        return stages
+
+    @staticmethod
+    def scoped(declared: Dict[Tuple[str, str], Any], databases: Optional[Iterable[str]]) -> Dict[Tuple[str, str], Any]:
+        if databases is None:
+            return declared
+        databases = set(databases)
+        return {key: value for key, value in declared.items() if key[0] in databases}
+
+    @staticmethod
+    async def bootstrap(client: Any, databases: Optional[Iterable[str]] = None) -> None:
+        """Create indexes, then check them against the query shapes we issue."""
+        indexes = IndexManager.scoped(INDEXES, databases)
+        await IndexManager.ensure(client, indexes)
+        try:
+            await IndexManager.check_query_shapes(client, IndexManager.scoped(QUERY_SHAPES, databases))
+            await IndexManager.usage(client, indexes)
+        except OperationFailure as e:
+            logging.warning(f"Index verification skipped: {e}")
@@ -0,0 +1,105 @@
+import os
+import time
+import asyncio
+import inspect
+import statistics
+from typing import Any, Dict, List
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import AsyncMongoClient, UpdateOne
+
+
+# --------------------------
+# Configuration and Constants
+# --------------------------
+
+# 'motor' (thread-pool bridge) or 'pymongo' (native asyncio client, pymongo >= 4.12)
+MONGO_BACKEND = os.getenv('MONGO_BACKEND', 'motor')
+
+BACKENDS = {
+    'motor': AsyncIOMotorClient,
+    'pymongo': AsyncMongoClient,
+}
+
+
+# --------------------------
+# Backend Selection
+# --------------------------
+
+class MongoBackend:
+    @staticmethod
+    def create_client(uri: str, backend: str = MONGO_BACKEND, **options: Any) -> Any:
+        """Client for `backend`; both expose the same awaitable collection API used by the Database classes."""
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown MONGO_BACKEND {backend!r}, expected one of {sorted(BACKENDS)}")
+        return BACKENDS[backend](uri, **options)
+
+    @staticmethod
+    async def aggregate(collection: Any, pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Run an aggregation on either backend (the native client returns the cursor from a coroutine)."""
+        cursor = collection.aggregate(pipeline)
+        if inspect.isawaitable(cursor):
+            cursor = await cursor
+        return await cursor.to_list(length=None)
+
+
+# --------------------------
+# Benchmark
+# --------------------------
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run_pattern(label: str, operation, calls: int, concurrency: int) -> None:
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(i: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await operation(i)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(timed(i) for i in range(calls)))
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<22} {calls / elapsed:8.0f} ops/s  p50 {statistics.median(latencies):6.2f} ms  "
+          f"p95 {percentile(latencies, 95):6.2f} ms  p99 {percentile(latencies, 99):6.2f} ms")
+
+
+async def benchmark_backend(backend: str, uri: str, calls: int, batch: int, concurrency: int) -> None:
+    client = MongoBackend.create_client(uri, backend)
+    collection = client['rssfeed_benchmark'][f'articles_{backend}']
+    await collection.drop()
+    await collection.create_index('key', unique=True)
+
+    async def upsert_batch(i: int) -> None:
+        # Same shape as Database.insert_articles: unordered $setOnInsert upserts by key
+        await collection.bulk_write([
+            UpdateOne({'key': f"{i}-{n}"}, {'$setOnInsert': {'title': 'x' * 80, 'description': 'y' * 400}}, upsert=True)
+            for n in range(batch)
+        ], ordered=False)
+
+    async def lookup_batch(i: int) -> None:
+        # Same shape as YouTubeParser / existence checks: one $in over a feed's worth of keys
+        keys = [f"{(i * 7) % calls}-{n}" for n in range(batch)]
+        await collection.find({'key': {'$in': keys}}, {'key': 1, '_id': 0}).to_list(length=None)
+
+    print(f"{backend}:")
+    await run_pattern(f"upsert x{batch}", upsert_batch, calls, concurrency)
+    await run_pattern(f"$in lookup x{batch}", lookup_batch, calls, concurrency)
+    await client.drop_database('rssfeed_benchmark')
+    close = client.close()
+    if inspect.isawaitable(close):
+        await close
+
+
+async def benchmark(calls: int = 2000, batch: int = 20, concurrency: int = 50) -> None:
+    uri = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
+    for backend in BACKENDS:
+        await benchmark_backend(backend, uri, calls, batch, concurrency)
+
+
+if __name__ == '__main__':
+    asyncio.run(benchmark())
@@ -0,0 +1,181 @@
+import os
+import re
+import time
+import zlib
+import logging
+import bson
+import numpy as np
+from collections import deque
+from datetime import datetime, timedelta, UTC
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+
+# --------------------------
+# Configuration and Constants
+# --------------------------
+
+CLUSTER_WINDOW_HOURS = int(os.getenv('CLUSTER_WINDOW_HOURS', '48'))
+# Estimated word-set Jaccard similarity above which two articles are the same story
+CLUSTER_MIN_SIMILARITY = float(os.getenv('CLUSTER_MIN_SIMILARITY', '0.6'))
+# Too few words and every headline looks alike
+CLUSTER_MIN_TOKENS = int(os.getenv('CLUSTER_MIN_TOKENS', '6'))
+
+# 16 bands of 4 rows: pairs at 0.6 similarity become candidates ~89% of the time, at 0.8 always
+LSH_BANDS = int(os.getenv('LSH_BANDS', '16'))
+LSH_ROWS = int(os.getenv('LSH_ROWS', '4'))
+MINHASH_PERMUTATIONS = LSH_BANDS * LSH_ROWS
+
+TOKEN = re.compile(r'\w{2,}', re.UNICODE)
+MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+# Fixed seed: signatures are stored with the articles and must stay comparable across runs
+_rng = np.random.default_rng(20240601)
+PERMUTATION_A = _rng.integers(1, (1 << 31) - 1, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+PERMUTATION_B = _rng.integers(0, (1 << 31) - 1, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+
+# --------------------------
+# MinHash Signatures
+# --------------------------
+
+class MinHash:
+    @staticmethod
+    def tokens(text: str) -> Set[str]:
+        return set(TOKEN.findall(text.lower()))
+
+    @staticmethod
+    def compute(text: str) -> Optional[np.ndarray]:
+        """MINHASH_PERMUTATIONS 31-bit minimums over the text's word set, or None when it is too short to compare."""
+        tokens = MinHash.tokens(text)
+        if len(tokens) < CLUSTER_MIN_TOKENS:
+            return None
+        hashes = np.fromiter((zlib.crc32(token.encode('utf-8')) for token in tokens), dtype=np.uint64, count=len(tokens))
+        hashes %= MERSENNE_PRIME
+        permuted = (PERMUTATION_A[:, None] * hashes[None, :] + PERMUTATION_B[:, None]) % MERSENNE_PRIME
+        return permuted.min(axis=1).astype(np.uint32)
+
+    @staticmethod
+    def to_binary(signature: Optional[np.ndarray]) -> Optional[bson.Binary]:
+        return bson.Binary(signature.tobytes()) if signature is not None else None
+
+    @staticmethod
+    def from_binary(value: Any) -> Optional[np.ndarray]:
+        signature = np.frombuffer(bytes(value), dtype=np.uint32) if value is not None else None
+        return signature if signature is not None and len(signature) == MINHASH_PERMUTATIONS else None
+
+
+# --------------------------
+# Sliding-window LSH Clusters
+# --------------------------
+
+class DuplicateClusters:
+    """
+    Assigns every new article a `cluster_id`: the cluster of the most similar
+    article seen within the time window when their estimated similarity
+    reaches CLUSTER_MIN_SIMILARITY, otherwise its own key. Signatures are
+    split into LSH bands, each indexed in a hash table, so a lookup only
+    compares against the few articles sharing a band, however many are stored.
+    """
+
+    def __init__(self, window_hours: int = CLUSTER_WINDOW_HOURS, min_similarity: float = CLUSTER_MIN_SIMILARITY,
+                 bands: int = LSH_BANDS, rows: int = LSH_ROWS):
+        self.window = window_hours * 3600
+        self.min_similarity = min_similarity
+        self.rows = rows
+        self.tables: List[Dict[bytes, Set[str]]] = [{} for _ in range(bands)]
+        self.entries: Dict[str, Tuple[np.ndarray, str]] = {}
+        self.order: Deque[Tuple[float, str]] = deque()
+        self.stats = {'assigned': 0, 'clustered': 0}
+
+    def bands(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(len(self.tables))]
+
+    def since(self, now: Optional[float] = None) -> datetime:
+        return datetime.fromtimestamp(now or time.time(), UTC) - timedelta(seconds=self.window)
+
+    def evict(self, now: float) -> None:
+        cutoff = now - self.window
+        while self.order and self.order[0][0] < cutoff:
+            _, key = self.order.popleft()
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                continue
+            for table, value in zip(self.tables, self.bands(entry[0])):
+                bucket = table.get(value)
+                if bucket is not None:
+                    bucket.discard(key)
+                    if not bucket:
+                        del table[value]
+
+    def add(self, key: str, signature: np.ndarray, cluster_id: str, seen_at: float) -> None:
+        if key in self.entries:
+            return
+        self.entries[key] = (signature, cluster_id)
+        self.order.append((seen_at, key))
+        for table, value in zip(self.tables, self.bands(signature)):
+            table.setdefault(value, set()).add(key)
+
+    def nearest(self, signature: np.ndarray) -> Optional[str]:
+        candidates = list(set().union(*(table.get(value, ()) for table, value in zip(self.tables, self.bands(signature)))))
+        if not candidates:
+            return None
+        signatures = np.stack([self.entries[key][0] for key in candidates])
+        similarity = (signatures == signature).mean(axis=1)
+        best = int(np.argmax(similarity))
+        return self.entries[candidates[best]][1] if similarity[best] >= self.min_similarity else None
+
+    def assign(self, key: str, signature: Optional[np.ndarray], now: Optional[float] = None) -> str:
+        """The cluster of an article, which from then on also represents it within the window."""
+        cluster_id, = self.assign_many([(key, signature)], now)
+        self.add_many([(key, signature, cluster_id)], now)
+        return cluster_id
+
+    def assign_many(self, articles: List[Tuple[str, Optional[np.ndarray]]], now: Optional[float] = None) -> List[str]:
+        """
+        Clusters for a batch of articles, which can also join each other's.
+        The window is left as it is: add_many() adds the articles that were
+        actually stored, so skipped duplicates never represent a cluster.
+        """
+        now = now or time.time()
+        self.evict(now)
+        batch = DuplicateClusters(self.window // 3600, self.min_similarity, len(self.tables), self.rows)
+        cluster_ids = []
+        for key, signature in articles:
+            if signature is None:
+                cluster_ids.append(key)
+                continue
+            cluster_id = self.nearest(signature) or batch.nearest(signature) or key
+            batch.add(key, signature, cluster_id, now)
+            cluster_ids.append(cluster_id)
+        return cluster_ids
+
+    def add_many(self, articles: Iterable[Tuple[str, Optional[np.ndarray], str]], now: Optional[float] = None) -> None:
+        """Add stored articles (key, signature, cluster_id) to the window."""
+        now = now or time.time()
+        for key, signature, cluster_id in articles:
+            self.stats['assigned'] += 1
+            if cluster_id != key:
+                self.stats['clustered'] += 1
+            if signature is not None:
+                self.add(key, signature, cluster_id, now)
+
+    def warm(self, articles: Iterable[Dict[str, Any]]) -> None:
+        """Fill the window from stored articles (`key`, `minhash`, `cluster_id`, `published`)."""
+        now = time.time()
+
+        def published(article: Dict[str, Any]) -> float:
+            value = article.get('published')
+            if not isinstance(value, datetime):
+                return now
+            # A future date would sit at the front of the window and hold back eviction behind it
+            return min((value if value.tzinfo else value.replace(tzinfo=UTC)).timestamp(), now)
+
+        count = 0
+        for article in sorted(articles, key=published):
+            signature = MinHash.from_binary(article.get('minhash'))
+            if signature is not None:
+                self.add(article['key'], signature, article.get('cluster_id') or article['key'], published(article))
+                count += 1
+        logging.info(f"Warmed duplicate clusters with {count} articles from the last {self.window // 3600}h")
+
+    def close(self) -> None:
+        logging.info(f"Duplicate clusters: {self.stats} ({len(self.entries)} articles in the window)")
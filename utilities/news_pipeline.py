@@ -0,0 +1,604 @@
+import os
+import time
+import aiohttp
+import asyncio
+import logging
+import random
+import feedparser
+from datetime import datetime, UTC
+from typing import Optional, Dict, Any, List, Tuple
+from langdetect import detect, LangDetectException
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from utilities.helpers import proxy, retry
+from utilities.html_extract import HTMLExtractor
+from utilities.date_parser import DateParser
+from utilities.feed_sniffer import SNIFF_BYTES
+from utilities.fingerprints import FingerprintStore
+from utilities.article_key import ArticleKey
+from utilities.write_buffer import BulkWriteBuffer
+from utilities.feed_bookkeeping import FeedBookkeeper
+from utilities.indexes import IndexManager
+from utilities.fetch_metrics import FetchMetrics
+from utilities.retention import ArticleArchive
+from utilities.content_store import ContentStore
+from utilities.storage import Storage, NewsStorage
+from utilities.og_extract import OGExtractor
+from utilities.image_probe import ImageProbe
+from utilities.article_extract import ArticleExtractor, ARTICLE_EXTRACTION
+from utilities.near_duplicates import MinHash, DuplicateClusters
+from utilities.tagging import TagExtractor
+from utilities.summarizer import Summarizer
+from utilities.enrichment import EnrichmentFetcher
+from utilities.enrichment_queue import EnrichmentWorkers
+from utilities.resources import Resources, LazyClient, LazyDatabase, LazyCollection, LazyInstance
+
+
+# --------------------------
+# Configuration and Constants
+# --------------------------
+
+USER_AGENTS = [ua.strip() for ua in os.getenv('USER_AGENTS', '').split(',') if ua.strip()] or [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 13_5) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+]
+
+# insert_articles waits for its batch, so article inserts are flushed sooner than other buffered writes
+ARTICLE_WRITE_MAX_AGE = float(os.getenv('ARTICLE_WRITE_MAX_AGE', '0.2'))
+
+# --------------------------
+# HTTP Utilities
+# --------------------------
+
+def get_page_headers() -> dict:
+    """Browser-like headers for article pages and images."""
+    headers = {
+        "User-Agent": random.choice(USER_AGENTS),
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.5",
+        "Accept-Encoding": "gzip, deflate",
+        "Connection": "keep-alive",
+        "Upgrade-Insecure-Requests": "1",
+        "Sec-Fetch-Dest": "document",
+        "Sec-Fetch-Mode": "navigate",
+        "Sec-Fetch-Site": "none",
+        "Sec-Fetch-User": "?1",
+        "Referer": "https://www.google.com/",
+    }
+    return headers
+
+
+# --------------------------
+# Database Operations
+# --------------------------
+
+class MongoDatabase(NewsStorage):
+    """The `news` database shared by news_module and feed_updater."""
+
+    # Resolved against the shared, lazily created client on first access
+    client = LazyClient()
+    db = LazyDatabase('news')
+    feeds = LazyCollection('news', 'feeds')
+    articles = LazyCollection('news', 'articles')
+
+    def __init__(self):
+        super().__init__(lambda name: LazyCollection('news', name))
+        articles = LazyCollection('news', 'articles')
+        self.seen_keys = FingerprintStore()
+        # Keys of articles waiting in article_writes; they only reach seen_keys once written
+        self.queued_keys: set = set()
+        self.article_writes = BulkWriteBuffer(articles, max_age=ARTICLE_WRITE_MAX_AGE)
+        # last_checked/last_updated/language/type and feed_stats, one combined update per feed
+        self.bookkeeping = FeedBookkeeper(LazyCollection('news', 'feeds'), LazyCollection('news', 'feed_stats'))
+        self.fetch_metrics = FetchMetrics(LazyCollection('news', 'fetch_metrics'))
+        # Articles past the hot window live compressed in articles_archive
+        self.archive = ArticleArchive(articles, LazyCollection('news', 'articles_archive'))
+        # Raw HTML and full text, compressed and loaded only when an article is opened
+        self.content = ContentStore(LazyCollection('news', 'article_content'), LazyCollection('news', 'content_dicts'))
+        self.article_updates = BulkWriteBuffer(articles)
+
+    async def feed_exists(self, url: str) -> Optional[Dict[str, Any]]:
+        return await self.feeds.find_one({'feed': url})
+
+    async def get_all_feeds(self) -> List[Dict[str, Any]]:
+        """Get all feeds from the database."""
+        return await self.feeds.find({}).to_list(length=None)
+
+    async def create_feed(self, feed_data: Dict[str, Any]) -> Any:
+        result = await self.feeds.insert_one(feed_data)
+        logging.info(f"New feed inserted: {feed_data.get('title')} ({feed_data.get('feed')})")
+        return result.inserted_id
+
+    async def article_exists(self, keys: List[str]) -> set:
+        """Return the article keys we have already stored, from the local fingerprint store (no database round trip)."""
+        return self.seen_keys.seen(keys)
+
+    async def insert_articles(self, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Queue articles as upserts by canonical key; the shared write buffer
+        sends them in bulk together with other feeds' articles. Returns the
+        articles that were written, once their batch is: only those keys are
+        added to the fingerprint store. A key already queued by another feed
+        is skipped, so the same article is not written (or counted) twice.
+        """
+        seen = self.seen_keys.seen([doc['key'] for doc in docs])
+        fresh: Dict[str, Dict[str, Any]] = {}
+        for doc in docs:
+            if doc['key'] not in seen and doc['key'] not in self.queued_keys:
+                fresh.setdefault(doc['key'], doc)
+        docs = list(fresh.values())
+        if not docs:
+            return []
+        keys = [doc['key'] for doc in docs]
+        self.queued_keys.update(keys)
+
+        try:
+            for doc in docs:
+                content = doc.pop('content', None)
+                if content:
+                    await self.content.put(doc['key'], content)
+                    doc['has_content'] = True
+
+            operations = [
+                UpdateOne({'key': doc['key']}, {'$setOnInsert': {k: v for k, v in doc.items() if k != 'key'}}, upsert=True)
+                for doc in docs
+            ]
+            results = await asyncio.gather(*await self.article_writes.add_many(operations, docs, keys))
+        finally:
+            self.queued_keys.difference_update(keys)
+
+        inserted = [doc for doc, written in zip(docs, results) if written]
+        self.seen_keys.add_many([doc['key'] for doc in inserted])
+        if len(inserted) < len(docs):
+            logging.warning(f"{len(docs) - len(inserted)} of {len(docs)} articles were not written, see {self.article_writes.dead_letter_path}")
+        return inserted
+
+    async def update_articles(self, updates: Dict[str, Dict[str, Any]]) -> None:
+        """
+        `$set` updates by article key, written behind any inserts of those
+        articles still buffered. The enrichment workers complete a job once
+        this returns, so every write is flushed first; a failed flush raises
+        and the jobs are deferred instead.
+        """
+        if not updates:
+            return
+        for key, fields in updates.items():
+            content = fields.pop('content', None)
+            if content:
+                await self.content.put(key, content)
+                fields['has_content'] = True
+        operations = [UpdateOne({'key': key}, {'$set': fields}) for key, fields in updates.items()]
+        inserted = await self.article_writes.flush()
+        await self.article_updates.add_many(operations, list(updates.values()), [None] * len(operations))
+        content_written = await self.content.writes.flush()
+        updated = await self.article_updates.flush()
+        if not (inserted and content_written and updated):
+            raise RuntimeError(f"Writing {len(updates)} enriched articles failed; kept for the next flush")
+
+    async def recent_articles(self, since: datetime) -> List[Dict[str, Any]]:
+        """Key, MinHash signature and cluster of the articles published since `since`."""
+        query = {'published': {'$gte': since}, 'minhash': {'$ne': None}}
+        return await self.articles.find(query, {'key': 1, 'minhash': 1, 'cluster_id': 1, 'published': 1}).to_list(length=None)
+
+    async def articles_with_text(self, keys: List[str]) -> set:
+        """The keys whose main text is in the content store, including writes still buffered."""
+        await self.content.writes.flush()
+        return await self.content.having(keys, 'text')
+
+    async def find_articles(self, keys: List[str]) -> List[Dict[str, Any]]:
+        """Articles by key from the hot collection, or decompressed from the archive."""
+        await self.article_writes.flush()
+        return await self.archive.find_by_keys(keys)
+
+    async def feed_timeline(self, feed_id: Any, before: Optional[Tuple[datetime, Any]] = None,
+                            limit: int = 50) -> List[Dict[str, Any]]:
+        await self.article_writes.flush()
+        return await self.archive.timeline(feed_id, before, limit)
+
+    async def backfill_article_keys(self) -> None:
+        """Give articles stored before canonical keys existed their key."""
+        operations = []
+        async for doc in self.articles.find({'key': {'$exists': False}}, {'link': 1}):
+            key = ArticleKey.for_entry(doc)
+            if key:
+                operations.append(UpdateOne({'_id': doc['_id']}, {'$set': {'key': key}}))
+        if not operations:
+            return
+        try:
+            await self.articles.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # Duplicates of an already keyed article keep no key
+            if any(error.get('code') != 11000 for error in e.details.get('writeErrors', [])):
+                raise
+        logging.info(f"Backfilled keys for {len(operations)} articles.")
+
+    async def update_feed_last_checked(self, feed_id: Any, last_checked: datetime, previous: Optional[datetime] = None) -> None:
+        await self.bookkeeping.checked(feed_id, last_checked, previous)
+
+    async def update_feed_language(self, feed_id: Any, language: str) -> None:
+        await self.bookkeeping.set(feed_id, {'language': language})
+
+    async def update_feed_type(self, feed_id: Any, feed_type: str) -> None:
+        await self.bookkeeping.set(feed_id, {'type': feed_type})
+
+    async def update_feed_last_updated(self, feed_id: Any, last_updated: datetime) -> None:
+        await self.bookkeeping.set(feed_id, {'last_updated': last_updated})
+
+    async def update_feed_stats(self, feed_id: Any, articles_added: int) -> None:
+        """Update or create feed statistics."""
+        await self.bookkeeping.add_items(feed_id, articles_added, datetime.now(UTC))
+
+    async def record_fetch(self, feed_id: Any, sample: Dict[str, Any]) -> None:
+        await self.fetch_metrics.record(feed_id, sample)
+
+    async def startup(self) -> None:
+        await IndexManager.bootstrap(self.client, databases=['news'])
+        await self.backfill_article_keys()
+        await self.archive.run()
+        await self.seen_keys.warm(self.articles, self.archive.cold, fields=['key'])
+        await self.fetch_metrics.ensure_collection(self.db)
+        await self.content.load_dictionary()
+
+    async def close(self) -> None:
+        await self.article_writes.close()
+        await self.article_updates.close()
+        await self.enrichment_queue.close()
+        await self.bookkeeping.close()
+        await self.fetch_metrics.close()
+        await self.content.close()
+        await self.og_cache.close()
+        await self.image_probes.close()
+        await self.term_frequencies.close()
+        await self.summaries.close()
+        self.seen_keys.compact()
+
+
+# MongoDB unless STORAGE_BACKEND selects the in-memory or SQLite stand-in; built on first use,
+# since the Mongo storage loads the fingerprint store
+Database = LazyInstance(lambda: Storage.select(MongoDatabase, 'news'))
+Enrichment = EnrichmentFetcher()
+# Near-duplicate stories across feeds share a cluster_id
+Clusters = DuplicateClusters()
+# Feed categories plus the top TF-IDF terms of each new article
+Tagger = LazyInstance(lambda: TagExtractor(Database.term_frequencies))
+Summaries = LazyInstance(lambda: Summarizer(Database.summaries))
+
+# --------------------------
+# Article Pipeline
+# --------------------------
+
+class ArticlePipeline:
+    """
+    Everything between a fetched feed and stored, enriched articles, shared
+    by news_module and feed_updater: entry parsing, keys, clusters, tags,
+    insertion, and the enrichment workers' thumbnail, text and summary pass.
+    The modules only decide which feeds to poll and how feeds are recorded.
+    """
+
+    workers: Optional[EnrichmentWorkers] = None
+
+    @staticmethod
+    async def start() -> None:
+        await Database.startup()
+        Clusters.warm(await Database.recent_articles(Clusters.since()))
+        # Drains the enrichment queue while feeds are processed, and leftovers from earlier runs
+        ArticlePipeline.workers = EnrichmentWorkers(Database.enrichment_queue, ArticlePipeline.enrich_articles)
+        ArticlePipeline.workers.start()
+
+    @staticmethod
+    async def stop() -> None:
+        if ArticlePipeline.workers is not None:
+            await ArticlePipeline.workers.stop()
+            ArticlePipeline.workers = None
+        ArticleExtractor.close()
+        Clusters.close()
+        Tagger.close()
+        Summaries.close()
+        await Enrichment.close()
+        await Database.close()
+        await Resources.close()
+        # A later start() gets storage bound to its own event loop
+        for singleton in (Database, Tagger, Summaries):
+            singleton.reset()
+
+    @staticmethod
+    def detect_language(text: str) -> str:
+        try:
+            return detect(text)
+        except LangDetectException:
+            return "unknown"
+
+    @staticmethod
+    @retry(retries=3, delay=1, backoff=2, jitter=True)
+    @proxy
+    async def fetch_feed(url: str, session: aiohttp.ClientSession, sample: Optional[Dict[str, Any]] = None,
+                         headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        sample = sample if sample is not None else FetchMetrics.sample(url)
+        start = time.perf_counter()
+        try:
+            async with session.get(url, headers=headers or get_page_headers()) as response:
+                sample['status'] = response.status
+                if response.status != 200:
+                    sample['latency_ms'] = FetchMetrics.elapsed_ms(start)
+                    return {"error": f"HTTP {response.status}"}
+                body = await response.read()
+                sample['latency_ms'] = FetchMetrics.elapsed_ms(start)
+                # Decompressed body size; feedparser detects the encoding from the bytes
+                sample['bytes'] = len(body)
+
+                start = time.perf_counter()
+                data = feedparser.parse(body)
+                sample['parse_ms'] = FetchMetrics.elapsed_ms(start)
+
+                if data.bozo:
+                    return {"error": str(data.bozo_exception)}
+
+                return {"feed": data.feed, "entries": data.entries, "head": body[:SNIFF_BYTES]}
+        except Exception as e:
+            sample['latency_ms'] = FetchMetrics.elapsed_ms(start)
+            return {"error": str(e)}
+
+    @staticmethod
+    async def process_articles(entries: List[dict], feed_id: Any, feed_language: Optional[str] = None,
+                               sample: Optional[Dict[str, Any]] = None) -> int:
+        """Store a feed's new entries; returns how many were inserted."""
+        for entry in entries:
+            entry['article_key'] = ArticleKey.for_entry(entry)
+        all_keys = [entry['article_key'] for entry in entries if entry['article_key']]
+        existing_keys = await Database.article_exists(all_keys)
+        articles, no_thumbnail = await ArticlePipeline.process_entries(entries, feed_id, feed_language, existing_keys)
+
+        # Stored right away; the enrichment workers verify the feed's image or find one
+        signatures = {}
+        for article in articles:
+            article['thumbnail_pending'] = True
+            signatures[article['key']] = MinHash.compute(f"{article['title']} {article['description']}")
+            article['minhash'] = MinHash.to_binary(signatures[article['key']])
+        cluster_ids = Clusters.assign_many([(article['key'], signatures[article['key']]) for article in articles])
+        for article, cluster_id in zip(articles, cluster_ids):
+            article['cluster_id'] = cluster_id
+        await Tagger.tag(articles)
+        articles = await Database.insert_articles(articles)
+        # Only stored articles represent their cluster to later ones
+        Clusters.add_many([(article['key'], signatures[article['key']], article['cluster_id']) for article in articles])
+        await Tagger.count(articles)
+        await Database.enrichment_queue.put_many([
+            {'_id': article['key'], 'feed_id': feed_id, 'link': article['link'], 'thumbnail': article['thumbnail'], 'language': article['language']}
+            for article in articles
+        ])
+        if sample is not None:
+            sample.update(items=len(entries), new_items=len(articles))
+        return len(articles)
+
+    @staticmethod
+    async def process_entries(entries: List[dict], feed_id: Any, feed_language: Optional[str],
+                              existing_keys: set) -> tuple[List[dict], List[str]]:
+        """Process each entry and return valid articles and links with no thumbnail."""
+        articles = []
+        no_thumbnail = []
+
+        entries = [entry for entry in entries if ArticlePipeline.is_valid_entry(entry, existing_keys)]
+        extracted_entries = HTMLExtractor.extract_batch(entries)
+
+        for entry, extracted in zip(entries, extracted_entries):
+            try:
+                article = ArticlePipeline.process_entry(entry, feed_id, feed_language, extracted, no_thumbnail)
+                if article:
+                    articles.append(article)
+            except Exception as e:
+                logging.error(f"Error processing entry from {entry.get('link', 'unknown')}: {e}")
+
+        return articles, no_thumbnail
+
+    @staticmethod
+    def is_valid_entry(entry: dict, existing_keys: set) -> bool:
+        """Check if an entry is valid (has a link and its key is not already stored)."""
+        link = entry.get('link')
+        if not link or not entry.get('article_key') or entry['article_key'] in existing_keys:
+            return False
+        return True
+
+    @staticmethod
+    def process_entry(entry: dict, feed_id: Any, feed_language: Optional[str], extracted: dict,
+                      no_thumbnail: List[str]) -> Optional[dict]:
+        """Process a single entry from the feed and return article data."""
+        link = entry.get('link')
+        if not link:
+            return None
+
+        description = extracted['text']
+        published = ArticlePipeline.get_published_date(entry, feed_id)
+        # Detected from the description; the feed's language when there is none
+        article_language = ArticlePipeline.detect_language(description) if description else feed_language or "unknown"
+        thumbnail = ArticlePipeline.get_thumbnail(entry, extracted, no_thumbnail)
+
+        return {
+            'feed_id': feed_id,
+            'title': entry.get('title', ''),
+            'description': description,
+            'content': ArticlePipeline.entry_content(entry),
+            'summarize': '',
+            'tags': TagExtractor.categories(entry),
+            'language': article_language,
+            'published': published,
+            'link': link,
+            'key': entry['article_key'],
+            'thumbnail': thumbnail,
+        }
+
+    @staticmethod
+    def get_published_date(entry: dict, feed_id: Any = None) -> datetime:
+        return DateParser.parse_entry(entry, feed_key=feed_id) or datetime.now(UTC)
+
+    @staticmethod
+    def entry_content(entry: dict) -> Dict[str, str]:
+        """Full HTML body from <content:encoded>/<content>, kept in the content store rather than the article."""
+        contents = entry.get('content') or []
+        return {'raw': contents[0].get('value', '')} if contents else {}
+
+    @staticmethod
+    def get_thumbnail(entry: dict, extracted: dict, no_thumbnail: List[str]) -> str:
+        thumbnail = ArticlePipeline.extract_thumbnail(entry) or extracted['image'] or extracted['srcset']
+        if not thumbnail:
+            no_thumbnail.append(entry.get('link'))
+        return thumbnail
+
+    @staticmethod
+    def extract_thumbnail(entry: dict) -> str:
+        # Try media_thumbnail
+        if "media_thumbnail" in entry and entry["media_thumbnail"]:
+            return entry["media_thumbnail"][0].get("url", "")
+
+        # Try media_content
+        if "media_content" in entry:
+            for media in entry["media_content"]:
+                if "url" in media:
+                    return media["url"]
+
+        # Try enclosure
+        if "enclosures" in entry:
+            for enclosure in entry["enclosures"]:
+                if enclosure.get("type", "").startswith("image/"):
+                    return enclosure.get("href", "")
+
+        return ""
+
+    # --------------------------
+    # Enrichment
+    # --------------------------
+
+    @staticmethod
+    async def enrich_articles(jobs: List[Dict[str, Any]]) -> List[str]:
+        """Enrichment worker: thumbnail, full text and summary for queued articles; returns the keys left for a later cycle."""
+        session = await Resources.session()
+        by_feed: Dict[Any, List[Dict[str, Any]]] = {}
+        for job in jobs:
+            by_feed.setdefault(job['feed_id'], []).append(job)
+
+        updates = {}
+        deferred = []
+        for feed_updates, feed_deferred in await asyncio.gather(*(
+            ArticlePipeline.enrich_feed(feed_jobs, feed_id, session) for feed_id, feed_jobs in by_feed.items()
+        )):
+            updates.update(feed_updates)
+            deferred.extend(feed_deferred)
+
+        languages = {job['_id']: job.get('language') for job in jobs}
+        texts = {key: (fields['content']['text'], languages.get(key)) for key, fields in updates.items() if 'content' in fields}
+        for key, summary in (await Summaries.summarize_many(texts)).items():
+            updates[key]['summarize'] = summary
+        await Database.update_articles(updates)
+        return deferred
+
+    @staticmethod
+    async def enrich_feed(jobs: List[Dict[str, Any]], feed_id: Any,
+                          session: aiohttp.ClientSession) -> tuple[Dict[str, Dict[str, Any]], List[str]]:
+        """
+        Thumbnail: the feed's own image unless the probe rejected it (an image
+        that could not be probed right now is kept), otherwise the page's OG
+        image when it passes, otherwise none. With ARTICLE_EXTRACTION, pages
+        whose main text is not stored yet are downloaded in full, once, for
+        both their text and OG image; every other OG image comes from the OG
+        cache or a <head>-only fetch.
+        """
+        probes = await ArticlePipeline.probe_images([job['thumbnail'] for job in jobs if job.get('thumbnail')], feed_id, session)
+        needs_og = [job for job in jobs if not ArticlePipeline.keeps_thumbnail(job, probes)]
+        needs_text = []
+        if ARTICLE_EXTRACTION:
+            stored = await Database.articles_with_text([job['_id'] for job in jobs])
+            needs_text = [job for job in jobs if job['_id'] not in stored]
+
+        ogs, texts = await ArticlePipeline.fetch_articles([job['link'] for job in needs_text], feed_id, session) if needs_text else ({}, {})
+        downloading = {job['link'] for job in needs_text}
+        head_only = [job['link'] for job in needs_og if job['link'] not in downloading]
+        if head_only:
+            ogs.update(await ArticlePipeline.fetch_og_images(head_only, feed_id, session))
+        probes.update(await ArticlePipeline.probe_images([ogs[job['link']] for job in needs_og if ogs.get(job['link'])], feed_id, session))
+
+        updates = {}
+        deferred = []
+        waiting = {job['_id'] for job in needs_og + needs_text if job['link'] not in ogs}
+        for job in jobs:
+            if job['_id'] in waiting:
+                # Over the feed's enrichment budget
+                deferred.append(job['_id'])
+                continue
+
+            if ArticlePipeline.keeps_thumbnail(job, probes):
+                thumbnail = job['thumbnail']
+            else:
+                og_image = ogs.get(job['link'])
+                thumbnail = og_image if og_image and ImageProbe.accepted(probes.get(og_image)) else None
+            probe = probes.get(thumbnail) or {}
+            updates[job['_id']] = {
+                'thumbnail': thumbnail,
+                'thumbnail_width': probe.get('width'),
+                'thumbnail_height': probe.get('height'),
+                'thumbnail_pending': False,
+            }
+            if texts.get(job['link']):
+                updates[job['_id']]['content'] = {'text': texts[job['link']]}
+        return updates, deferred
+
+    @staticmethod
+    def keeps_thumbnail(job: Dict[str, Any], probes: Dict[str, Optional[Dict[str, Any]]]) -> bool:
+        """Whether the feed's own image stays: it exists and its probe did not reject it."""
+        return bool(job.get('thumbnail')) and not ImageProbe.rejected(probes.get(job['thumbnail']))
+
+    @staticmethod
+    async def fetch_articles(urls: List[str], feed_id: Any, session: aiohttp.ClientSession) -> tuple[Dict[str, Optional[str]], Dict[str, str]]:
+        """OG images and main texts of article pages, one download each; pages over budget are left out."""
+        pages = await Enrichment.fetch(feed_id, urls, lambda url: ArticlePipeline.get_article(url, session))
+        ogs = {}
+        texts = {}
+        for url, page in pages.items():
+            og = page['og'] if page else None
+            await Database.og_cache.put(url, og)
+            ogs[url] = og.get('image') if og else None
+            if page and page['text']:
+                texts[url] = page['text']
+        return ogs, texts
+
+    @staticmethod
+    async def get_article(url: str, session: aiohttp.ClientSession) -> Optional[Dict[str, Any]]:
+        """OG metadata and main text of a page; None when the page could not be fetched."""
+        try:
+            logging.info(f'Fetching article page {url}')
+            return await ArticleExtractor.fetch(url, session, headers=get_page_headers())
+        except Exception:
+            return None
+
+    @staticmethod
+    async def probe_images(urls: List[str], feed_id: Any, session: aiohttp.ClientSession) -> Dict[str, Optional[Dict[str, Any]]]:
+        probes = await Database.image_probes.get_many(urls)
+        missing = [url for url in dict.fromkeys(urls) if url not in probes]
+        # A few KB per image: limited per host, but not counted against the feed's page budget
+        fetched = await Enrichment.fetch(feed_id, missing, lambda url: ImageProbe.probe(url, session, get_page_headers()),
+                                         budgeted=False)
+        for url, probe in fetched.items():
+            await Database.image_probes.put(url, probe)
+            probes[url] = probe
+        return probes
+
+    @staticmethod
+    async def fetch_og_images(urls: List[str], feed_id: Any, session: aiohttp.ClientSession) -> Dict[str, Optional[str]]:
+        ogs = await Database.og_cache.get_many(urls)
+        missing = [url for url in dict.fromkeys(urls) if url not in ogs]
+        # Pages over the feed's budget are neither fetched nor cached
+        fetched = await Enrichment.fetch(feed_id, missing, lambda url: ArticlePipeline.get_og(url, session))
+        for url, (_, og) in fetched.items():
+            await Database.og_cache.put(url, og)
+            ogs[url] = og
+        return {url: og.get('image') if og else None for url, og in ogs.items()}
+
+    @staticmethod
+    async def get_og(url: str, session: aiohttp.ClientSession) -> tuple[str, Optional[Dict[str, Any]]]:
+        """OG metadata of a page; None when the page could not be fetched."""
+        try:
+            logging.info(f'Fetching OG image for {url}')
+            # Streams only the <head>; image falls back to twitter:image
+            return url, await OGExtractor.fetch(url, session, headers=get_page_headers())
+
+        except Exception:
+            return url, None
@@ -0,0 +1,48 @@
+import os
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+from utilities.ttl_cache import TTLCache
+
+
+# --------------------------
+# Configuration and Constants
+# --------------------------
+
+OG_CACHE_TTL = int(os.getenv('OG_CACHE_TTL', str(30 * 86400)))
+# Page fetched fine but has no og:image
+OG_CACHE_NEGATIVE_TTL = int(os.getenv('OG_CACHE_NEGATIVE_TTL', str(86400)))
+# Fetch failed (timeout, HTTP error); retried sooner
+OG_CACHE_ERROR_TTL = int(os.getenv('OG_CACHE_ERROR_TTL', str(3600)))
+# Per-host negative TTL overrides, e.g. "example.com=600,slow.example.org=7200"
+OG_CACHE_HOST_NEGATIVE_TTLS = {
+    host.strip().lower(): int(ttl)
+    for host, _, ttl in (item.partition('=') for item in os.getenv('OG_CACHE_HOST_NEGATIVE_TTLS', '').split(','))
+    if host.strip() and ttl.strip().isdigit()
+}
+OG_CACHE_LRU_SIZE = int(os.getenv('OG_CACHE_LRU_SIZE', '20000'))
+
+
+# --------------------------
+# OG Metadata Cache
+# --------------------------
+
+class OGCache(TTLCache):
+    """
+    URL -> OG metadata dict, or None for a failed fetch. Failed fetches and
+    pages without an image are cached for a shorter, per-host configurable time.
+    """
+
+    name = 'OG cache'
+    field = 'og'
+
+    def __init__(self, collection: Any = None, lru_size: int = OG_CACHE_LRU_SIZE):
+        super().__init__(collection, lru_size)
+
+    @staticmethod
+    def ttl_for(url: str, og: Optional[Dict[str, Any]]) -> int:
+        if og is None:
+            return OG_CACHE_ERROR_TTL
+        if og.get('image'):
+            return OG_CACHE_TTL
+        host = (urlsplit(url).hostname or '').lower()
+        return OG_CACHE_HOST_NEGATIVE_TTLS.get(host, OG_CACHE_NEGATIVE_TTL)
@@ -0,0 +1,110 @@
+import os
+import re
+import html
+import logging
+import aiohttp
+from typing import Any, Dict, Optional
+from urllib.parse import urljoin
+
+
+# --------------------------
+# Configuration and Constants
+# --------------------------
+
+OG_MAX_BYTES = int(os.getenv('OG_MAX_BYTES', str(256 * 1024)))
+OG_CHUNK_SIZE = 16 * 1024
+OG_TIMEOUT = aiohttp.ClientTimeout(total=int(os.getenv('OG_TIMEOUT', '10')))
+
+HEAD_END = re.compile(rb'</head\s*>|<body[\s>]', re.IGNORECASE)
+TAG = re.compile(rb'<(meta|link)\s([^>]*)>', re.IGNORECASE)
+ATTRIBUTE = re.compile(rb'([a-zA-Z:_-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+))')
+
+# (tag, attribute, value) -> field, in priority order
+META_FIELDS = {
+    (b'meta', b'property', b'og:image'): 'image',
+    (b'meta', b'property', b'og:image:url'): 'image',
+    (b'meta', b'property', b'og:image:secure_url'): 'image',
+    (b'meta', b'property', b'og:title'): 'title',
+    (b'meta', b'name', b'twitter:image'): 'twitter_image',
+    (b'meta', b'name', b'twitter:image:src'): 'twitter_image',
+    (b'meta', b'property', b'twitter:image'): 'twitter_image',
+    (b'link', b'rel', b'canonical'): 'canonical',
+    (b'link', b'rel', b'icon'): 'icon',
+    (b'link', b'rel', b'shortcut icon'): 'icon',
+    (b'link', b'rel', b'apple-touch-icon'): 'icon',
+}
+FIELDS = ('image', 'title', 'twitter_image', 'canonical', 'icon')
+URL_FIELDS = ('image', 'twitter_image', 'canonical', 'icon')
+
+
+# --------------------------
+# Streaming <head> Extractor
+# --------------------------
+
+class OGExtractor:
+    @staticmethod
+    def scan(data: bytes, found: Dict[str, Optional[str]]) -> None:
+        """Fill `found` from the complete <meta>/<link> tags in `data`; first match per field wins."""
+        for match in TAG.finditer(data):
+            tag = match.group(1).lower()
+            attributes = {
+                name.lower(): double or single or bare
+                for name, double, single, bare in ATTRIBUTE.findall(match.group(2))
+            }
+            value = attributes.get(b'href' if tag == b'link' else b'content')
+            if not value:
+                continue
+            for attribute in (b'property', b'name', b'rel'):
+                field = META_FIELDS.get((tag, attribute, attributes.get(attribute, b'').lower().strip()))
+                if field and not found.get(field):
+                    # Attribute values are ASCII/UTF-8 in practice; no charset sniffing needed
+                    found[field] = html.unescape(value.decode('utf-8', 'replace')).strip()
+
+    @staticmethod
+    def extract(data: bytes, base_url: str = '') -> Dict[str, Optional[str]]:
+        """OG metadata from an (optionally partial) HTML document."""
+        found: Dict[str, Optional[str]] = dict.fromkeys(FIELDS)
+        end = HEAD_END.search(data)
+        OGExtractor.scan(data[:end.start()] if end else data, found)
+        return OGExtractor.finish(found, base_url)
+
+    @staticmethod
+    def finish(found: Dict[str, Optional[str]], base_url: str) -> Dict[str, Optional[str]]:
+        for field in URL_FIELDS:
+            if found.get(field) and base_url:
+                found[field] = urljoin(base_url, found[field])
+        found['image'] = found['image'] or found['twitter_image']
+        return found
+
+    @staticmethod
+    async def fetch(url: str, session: aiohttp.ClientSession, headers: Optional[Dict[str, str]] = None,
+                    max_bytes: int = OG_MAX_BYTES) -> Optional[Dict[str, Any]]:
+        """
+        Stream the page until </head> (or <body>) or every field has been seen,
+        then drop the connection. Returns None when the page could not be fetched.
+        """
+        async with session.get(url, headers=headers, timeout=OG_TIMEOUT) as response:
+            if response.status != 200:
+                return None
+
+            found: Dict[str, Optional[str]] = dict.fromkeys(FIELDS)
+            buffer = b''
+            scanned = 0
+            received = 0
+            async for chunk in response.content.iter_chunked(OG_CHUNK_SIZE):
+                buffer += chunk
+                received += len(chunk)
+
+                end = HEAD_END.search(buffer, max(0, scanned - 8))
+                # Only scan up to the last complete tag; the rest waits for the next chunk
+                limit = end.start() if end else buffer.rfind(b'>') + 1
+                if limit > scanned:
+                    OGExtractor.scan(buffer[scanned:limit], found)
+                    scanned = limit
+
+                if end or all(found.values()) or received >= max_bytes:
+                    break
+
+            response.close()
+            logging.debug(f"Read {received} bytes of {url} for OG metadata")
+            return OGExtractor.finish(found, str(response.url))
@@ -0,0 +1,152 @@
+import os
+import asyncio
+import logging
+import inspect
+import aiohttp
+from typing import Any, Callable, Dict, Optional
+from utilities.mongo_backend import MongoBackend
+
+
+# --------------------------
+# Configuration and Constants
+# --------------------------
+
+MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
+MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', '50'))
+MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', '0'))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', '10000'))
+
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '100'))
+HTTP_POOL_SIZE_PER_HOST = int(os.getenv('HTTP_POOL_SIZE_PER_HOST', '10'))
+HTTP_DNS_CACHE_TTL = int(os.getenv('HTTP_DNS_CACHE_TTL', '300'))
+
+
+# --------------------------
+# Shared Resources
+# --------------------------
+
+class Resources:
+    """
+    Process-wide Mongo client and aiohttp session, created on first use and
+    bound to the running event loop so every pipeline shares one pool.
+    """
+
+    mongo_clients: Dict[Any, Any] = {}
+    sessions: Dict[Any, aiohttp.ClientSession] = {}
+
+    @staticmethod
+    def current_loop() -> Optional[asyncio.AbstractEventLoop]:
+        try:
+            return asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+
+    @staticmethod
+    def mongo() -> Any:
+        loop = Resources.current_loop()
+        client = Resources.mongo_clients.get(loop)
+        if client is None:
+            client = MongoBackend.create_client(
+                MONGO_URI,
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
+                minPoolSize=MONGO_MIN_POOL_SIZE,
+                serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            )
+            Resources.mongo_clients[loop] = client
+            logging.info(f"Created Mongo client (maxPoolSize={MONGO_MAX_POOL_SIZE})")
+        return client
+
+    @staticmethod
+    async def session() -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        session = Resources.sessions.get(loop)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=HTTP_POOL_SIZE, limit_per_host=HTTP_POOL_SIZE_PER_HOST, ttl_dns_cache=HTTP_DNS_CACHE_TTL
+            )
+            session = aiohttp.ClientSession(connector=connector)
+            Resources.sessions[loop] = session
+        return session
+
+    @staticmethod
+    async def close() -> None:
+        """Close the client and session bound to the running loop."""
+        loop = asyncio.get_running_loop()
+        session = Resources.sessions.pop(loop, None)
+        if session is not None and not session.closed:
+            await session.close()
+        client = Resources.mongo_clients.pop(loop, None)
+        if client is not None:
+            closed = client.close()
+            if inspect.isawaitable(closed):
+                await closed
+
+
+# --------------------------
+# Lazy Database Attributes
+# --------------------------
+
+class LazyClient:
+    """Class attribute resolving to the shared Mongo client on access."""
+
+    def __get__(self, instance: Any, owner: Any) -> Any:
+        return Resources.mongo()
+
+
+class LazyDatabase:
+    def __init__(self, db_name: str):
+        self.db_name = db_name
+
+    def __get__(self, instance: Any, owner: Any) -> Any:
+        return Resources.mongo()[self.db_name]
+
+
+class LazyCollection:
+    """
+    Class attribute resolving to a collection of the shared client on access.
+    Passed around directly (e.g. to a write buffer) it forwards attribute
+    lookups to the collection, so the client is still only created on use.
+    """
+
+    def __init__(self, db_name: str, collection_name: str):
+        self.db_name = db_name
+        self.collection_name = collection_name
+
+    def resolve(self) -> Any:
+        return Resources.mongo()[self.db_name][self.collection_name]
+
+    def __get__(self, instance: Any, owner: Any) -> Any:
+        return self.resolve()
+
+    def __getattr__(self, attr: str) -> Any:
+        # Dunder probes, e.g. ABCMeta looking for __isabstractmethod__, must not create the client
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+        return getattr(self.resolve(), attr)
+
+
+# --------------------------
+# Lazy Singletons
+# --------------------------
+
+class LazyInstance:
+    """
+    Module-level singleton built by `factory` on first attribute access, so
+    importing a pipeline module opens no files or clients. reset() drops the
+    instance; the next access builds a new one.
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        self.factory = factory
+        self.instance: Optional[Any] = None
+
+    def resolve(self) -> Any:
+        if self.instance is None:
+            self.instance = self.factory()
+        return self.instance
+
+    def reset(self) -> None:
+        self.instance = None
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self.resolve(), attr)
@@ -0,0 +1,128 @@
+import os
+import logging
+import bson
+import zstandard as zstd
+from datetime import datetime, timedelta, UTC
+from typing import Any, Dict, List, Optional, Tuple
+from pymongo import ReplaceOne, UpdateOne, DESCENDING
+from utilities.date_parser import DateParser
+
+
+# --------------------------
+# Configuration and Constants
+# --------------------------
+
+# Articles newer than this stay in the hot collection
+ARTICLE_HOT_DAYS = int(os.getenv('ARTICLE_HOT_DAYS', '90'))
+ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', '1000'))
+ARCHIVE_ZSTD_LEVEL = int(os.getenv('ARCHIVE_ZSTD_LEVEL', '10'))
+
+# Kept uncompressed on archived documents so they can be indexed and filtered
+ARCHIVE_FIELDS = ('key', 'feed_id', 'published')
+
+# Newest first, with _id breaking ties between articles published in the same second
+TIMELINE_SORT = [('published', DESCENDING), ('_id', DESCENDING)]
+
+
+# --------------------------
+# Cold Archive
+# --------------------------
+
+class ArticleArchive:
+    """
+    Moves articles older than ARTICLE_HOT_DAYS from the hot collection into an
+    archive collection in bulk. Each archived document keeps key/feed_id/published
+    in the clear and the rest of the article as one zstd-compressed BSON blob.
+    It runs at startup of both news pipelines. Reads go to the hot collection
+    first and fall back to the archive, decompressing what they find there.
+    """
+
+    def __init__(self, hot: Any, cold: Any, hot_days: int = ARTICLE_HOT_DAYS, batch_size: int = ARCHIVE_BATCH_SIZE):
+        self.hot = hot
+        self.cold = cold
+        self.hot_days = hot_days
+        self.batch_size = batch_size
+        self.compressor = zstd.ZstdCompressor(level=ARCHIVE_ZSTD_LEVEL)
+        self.decompressor = zstd.ZstdDecompressor()
+
+    def compress(self, article: Dict[str, Any]) -> Dict[str, Any]:
+        archived = {field: article[field] for field in ARCHIVE_FIELDS if field in article}
+        archived['_id'] = article['_id']
+        body = {k: v for k, v in article.items() if k not in ARCHIVE_FIELDS and k != '_id'}
+        archived['z'] = bson.Binary(self.compressor.compress(bson.encode(body)))
+        return archived
+
+    def decompress(self, archived: Dict[str, Any]) -> Dict[str, Any]:
+        article = bson.decode(self.decompressor.decompress(archived['z']))
+        article.update({k: v for k, v in archived.items() if k != 'z'})
+        return article
+
+    async def run(self, now: Optional[datetime] = None) -> int:
+        """Archive every article published before the hot window; returns how many were moved."""
+        cutoff = (now or datetime.now(UTC)) - timedelta(days=self.hot_days)
+        await self.fix_legacy_dates()
+        moved = 0
+        while True:
+            batch = await self.hot.find({'published': {'$lt': cutoff}}).sort('published', 1).limit(self.batch_size).to_list(length=None)
+            if not batch:
+                break
+
+            # Copy first, then delete: a crash in between only repeats idempotent upserts
+            await self.cold.bulk_write([ReplaceOne({'_id': doc['_id']}, self.compress(doc), upsert=True) for doc in batch], ordered=False)
+            await self.hot.delete_many({'_id': {'$in': [doc['_id'] for doc in batch]}})
+            moved += len(batch)
+
+        if moved:
+            logging.info(f"Archived {moved} articles published before {cutoff.isoformat()}")
+        return moved
+
+    async def fix_legacy_dates(self) -> int:
+        """
+        Convert `published` strings left by the old pipeline to datetimes, so
+        the range query above (which only matches dates) archives them too.
+        Strings that do not parse are left alone and stay in the hot collection.
+        """
+        operations = []
+        unparsed = 0
+        async for doc in self.hot.find({'published': {'$type': 'string'}}, {'published': 1}):
+            published = DateParser.parse(doc['published'])
+            if published:
+                operations.append(UpdateOne({'_id': doc['_id']}, {'$set': {'published': published}}))
+            else:
+                unparsed += 1
+        for start in range(0, len(operations), self.batch_size):
+            await self.hot.bulk_write(operations[start:start + self.batch_size], ordered=False)
+        if operations or unparsed:
+            logging.info(f"Converted {len(operations)} legacy published dates, {unparsed} could not be parsed")
+        return len(operations)
+
+    async def find_by_keys(self, keys: List[str]) -> List[Dict[str, Any]]:
+        """Articles for the given keys, from the hot collection or the archive."""
+        found = await self.hot.find({'key': {'$in': keys}}).to_list(length=None)
+        missing = set(keys) - {doc['key'] for doc in found}
+        if missing:
+            archived = await self.cold.find({'key': {'$in': list(missing)}}).to_list(length=None)
+            found.extend(self.decompress(doc) for doc in archived)
+        return found
+
+    async def timeline(self, feed_id: Any, before: Optional[Tuple[datetime, Any]] = None,
+                       limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Newest articles of a feed, continuing into the archive when the hot
+        window runs out. `before` is the (published, _id) of the last article
+        of the previous page; pass it back to get the next one.
+        """
+        articles = await self.hot.find(ArticleArchive.page_query(feed_id, before)).sort(TIMELINE_SORT).limit(limit).to_list(length=None)
+        if len(articles) < limit:
+            if articles:
+                before = (articles[-1]['published'], articles[-1]['_id'])
+            archived = await self.cold.find(ArticleArchive.page_query(feed_id, before)).sort(TIMELINE_SORT).limit(limit - len(articles)).to_list(length=None)
+            articles.extend(self.decompress(doc) for doc in archived)
+        return articles
+
+    @staticmethod
+    def page_query(feed_id: Any, before: Optional[Tuple[datetime, Any]]) -> Dict[str, Any]:
+        if before is None:
+            return {'feed_id': feed_id}
+        published, _id = before
+        return {'feed_id': feed_id, '$or': [{'published': {'$lt': published}}, {'published': published, '_id': {'$lt': _id}}]}
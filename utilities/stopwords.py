@@ -0,0 +1,33 @@
+# --------------------------
+# Stopwords by Language
+# --------------------------
+
+# Keyed by langdetect codes; languages without a list rely on document frequency alone
+STOPWORDS = {
+    'en': frozenset('''
+        about above after again against all also although among and another any are around aren because been before
+        being below between both but can cannot could couldn did didn does doesn doing don down during each either else
+        even ever every few for from further get gets got had hadn has hasn have haven having her here hers herself him
+        himself his how however into isn its itself just last least less let like made make makes many may might more
+        most much must mustn never new next nor not now off often once one only other others our ours ourselves out over
+        own per quite rather really said same say says see seen shall shan she should shouldn since some still such than
+        that the their theirs them themselves then there these they this those though three through thus too two under
+        until upon very via was wasn way well were weren what when where whether which while who whom whose why will
+        with within without won would wouldn yet you your yours yourself yourselves year years day days week time times
+        first back just according told news new today yesterday tomorrow monday tuesday wednesday thursday friday
+        saturday sunday read more video photo photos watch live update updates near amid across toward towards onto
+        including
+    '''.split()),
+    'hr': frozenset('''
+        ali ako bez bi bih bila bile bili bilo bio bismo biste biti bude budu će ćemo ćete ćeš ću da dakle do dok dosta
+        dva evo gdje godine godina ga ih ili ima imaju iz ispod između iznad jedan jedna jedno jer jesam jesi jest jesu
+        joj još ju kad kada kako kao koja koje koji kojima kojoj kojom koju kroz lako li među mene meni mi mnogo može
+        mogu moj moja moje na nad nakon nam nama nas naš naša naše ne nego neka neke neki nekog nema netko nešto nije
+        nikada ništa niti njega njegov njegova njegovo njemu njen njena njeno njih njihov njihova njihove njoj nju no
+        ova ovaj ovdje ove ovi ovo ovog ovom ovu od oko ona one oni ono onda opet osim pa pak po pod pored poslije
+        postoji prema pri prije prvi put radi sam sama samo se sebe sebi sada sad sve svi svih svoj svoja svoje svoju
+        ta tada taj tako također te tek ti to toga tom toj tu tijekom već vam vama vas vaš vi više vrlo za zato zbog
+        što kojeg kojem danas jučer sutra rekao rekla kazao kazala prema godine dana foto video pročitajte
+    '''.split()),
+}
+STOPWORDS['bs'] = STOPWORDS['sr'] = STOPWORDS['hr']
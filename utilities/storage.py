@@ -0,0 +1,536 @@
+import os
+import asyncio
+import logging
+import sqlite3
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, UTC
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from bson import ObjectId, json_util
+from utilities.og_cache import OGCache
+from utilities.enrichment_queue import EnrichmentQueue
+from utilities.image_probe import ImageProbeCache
+from utilities.tagging import DocumentFrequencies
+from utilities.summarizer import SummaryCache
+
+
+# --------------------------
+# Configuration and Constants
+# --------------------------
+
+# 'mongo' (default), 'memory' (no persistence, pure pipeline cost) or 'sqlite' (local load tests)
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'mongo')
+SQLITE_DIR = os.getenv('SQLITE_DIR', 'data')
+SQLITE_MAX_VARIABLES = 900
+MEMORY_MAX_FETCHES = 100000
+
+
+# --------------------------
+# Storage Interface
+# --------------------------
+
+class Storage(ABC):
+    """
+    Base of the news and YouTube storages. Each pipeline module builds one
+    instance with select(): its Mongo implementation, or MemoryStorage or
+    SQLiteStorage as drop-in stand-ins chosen with STORAGE_BACKEND.
+    """
+
+    @staticmethod
+    def select(mongo: Callable[[], 'Storage'], namespace: str, backend: str = STORAGE_BACKEND) -> 'Storage':
+        """The storage a module should use: an instance of its Mongo class or a local stand-in."""
+        if backend == 'mongo':
+            return mongo()
+        if backend == 'memory':
+            return MemoryStorage()
+        if backend == 'sqlite':
+            return SQLiteStorage(os.path.join(SQLITE_DIR, f"{namespace}.sqlite3"))
+        raise ValueError(f"Unknown STORAGE_BACKEND {backend!r}, expected 'mongo', 'memory' or 'sqlite'")
+
+    async def startup(self) -> None:
+        """Prepare indexes, caches and tables before the first poll."""
+
+    async def close(self) -> None:
+        """Flush pending writes."""
+
+    @abstractmethod
+    async def feed_exists(self, url: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def create_feed(self, feed_data: Dict[str, Any]) -> Any:
+        ...
+
+
+class NewsStorage(Storage):
+    """Every operation news_module and feed_updater perform on the `news` database."""
+
+    def __init__(self, collection: Callable[[str], Any] = lambda name: None):
+        """`collection` maps a collection name to the collection backing it; without one they are in-process only."""
+        self.og_cache = OGCache(collection('og_cache'))
+        self.image_probes = ImageProbeCache(collection('image_probes'))
+        # Articles inserted without a thumbnail, waiting for the enrichment workers
+        self.enrichment_queue = EnrichmentQueue(collection('enrichment_queue'))
+        # Per-language document frequencies behind the TF-IDF tags
+        self.term_frequencies = DocumentFrequencies(collection('term_frequencies'))
+        # Summaries by hash of the article text
+        self.summaries = SummaryCache(collection('summaries'))
+
+    # Feeds
+    @abstractmethod
+    async def get_all_feeds(self) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def update_feed_last_checked(self, feed_id: Any, last_checked: datetime, previous: Optional[datetime] = None) -> None:
+        ...
+
+    @abstractmethod
+    async def update_feed_language(self, feed_id: Any, language: str) -> None:
+        ...
+
+    @abstractmethod
+    async def update_feed_type(self, feed_id: Any, feed_type: str) -> None:
+        ...
+
+    @abstractmethod
+    async def update_feed_last_updated(self, feed_id: Any, last_updated: datetime) -> None:
+        ...
+
+    @abstractmethod
+    async def update_feed_stats(self, feed_id: Any, articles_added: int) -> None:
+        ...
+
+    @abstractmethod
+    async def record_fetch(self, feed_id: Any, sample: Dict[str, Any]) -> None:
+        ...
+
+    async def bookkeep(self, feed_id: Any, now: datetime, articles_added: int = 0,
+                       previous_checked: Optional[datetime] = None) -> None:
+        """Everything a poll of `feed_id` updates: last_checked, plus last_updated and feed_stats when it added articles."""
+        await self.update_feed_last_checked(feed_id, now, previous_checked)
+        if articles_added:
+            await self.update_feed_last_updated(feed_id, now)
+            await self.update_feed_stats(feed_id, articles_added)
+
+    # Articles
+    @abstractmethod
+    async def article_exists(self, keys: List[str]) -> set:
+        ...
+
+    @abstractmethod
+    async def insert_articles(self, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Store articles by key; returns the ones that were written, i.e. not stored before."""
+
+    @abstractmethod
+    async def update_articles(self, updates: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Set fields on stored articles, by article key; a `content` dict is
+        merged into the stored content. Written by the time it returns.
+        """
+
+    @abstractmethod
+    async def recent_articles(self, since: datetime) -> List[Dict[str, Any]]:
+        """Key, MinHash signature and cluster of the articles published since `since`."""
+
+    @abstractmethod
+    async def articles_with_text(self, keys: List[str]) -> set:
+        """The keys of articles whose main text is already stored."""
+
+    @abstractmethod
+    async def find_articles(self, keys: List[str]) -> List[Dict[str, Any]]:
+        """Stored articles by key, archived ones included."""
+
+    @abstractmethod
+    async def feed_timeline(self, feed_id: Any, before: Optional[Tuple[datetime, Any]] = None,
+                            limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        A feed's articles, newest first, archived ones included. `before` is
+        the (published, _id) of the previous page's last article.
+        """
+
+    @staticmethod
+    def timeline_page(docs: List[Dict[str, Any]], before: Optional[Tuple[datetime, Any]], limit: int) -> List[Dict[str, Any]]:
+        """The stand-ins' timeline: sort and page in Python the way the Mongo query does."""
+        docs = [doc for doc in docs if isinstance(doc.get('published'), datetime)]
+        if before is not None:
+            docs = [doc for doc in docs if (doc['published'], doc['_id']) < before]
+        return sorted(docs, key=lambda doc: (doc['published'], doc['_id']), reverse=True)[:limit]
+
+    @staticmethod
+    def merge_update(doc: Dict[str, Any], fields: Dict[str, Any]) -> None:
+        for name, value in fields.items():
+            if name == 'content':
+                doc['content'] = dict(doc.get('content') or {}, **value)
+                doc['has_content'] = True
+            else:
+                doc[name] = value
+
+
+class VideoStorage(Storage):
+    """Every operation yt_module performs on the `video_database` database."""
+
+    @abstractmethod
+    async def existing_videos(self, video_ids: List[str]) -> set:
+        ...
+
+    @abstractmethod
+    async def bulk_insert_videos(self, video_data_list: List[Dict[str, Any]]) -> List[Any]:
+        ...
+
+    @abstractmethod
+    async def update_feed_high_water(self, feed_id: Any, published: str) -> None:
+        ...
+
+
+# --------------------------
+# In-memory Storage
+# --------------------------
+
+class MemoryStorage(NewsStorage, VideoStorage):
+    """Dict-backed storage; lets a run measure parsing and enrichment without any database cost."""
+
+    def __init__(self):
+        super().__init__()
+        self.feeds: Dict[Any, Dict[str, Any]] = {}
+        self.feed_urls: Dict[str, Any] = {}
+        self.feed_stats: Dict[Any, Dict[str, Any]] = {}
+        self.articles: Dict[str, Dict[str, Any]] = {}
+        self.videos: Dict[str, Dict[str, Any]] = {}
+        self.fetches: deque = deque(maxlen=MEMORY_MAX_FETCHES)
+
+    async def close(self) -> None:
+        logging.info(f"Memory storage: {len(self.feeds)} feeds, {len(self.articles)} articles, "
+                     f"{len(self.videos)} videos, {len(self.fetches)} fetch samples")
+
+    def set_feed(self, feed_id: Any, **fields: Any) -> None:
+        if feed_id in self.feeds:
+            self.feeds[feed_id].update(fields)
+
+    async def feed_exists(self, url: str) -> Optional[Dict[str, Any]]:
+        feed_id = self.feed_urls.get(url)
+        return dict(self.feeds[feed_id]) if feed_id is not None else None
+
+    async def get_all_feeds(self) -> List[Dict[str, Any]]:
+        return [dict(feed) for feed in self.feeds.values()]
+
+    async def create_feed(self, feed_data: Dict[str, Any]) -> Any:
+        feed = dict(feed_data)
+        feed.setdefault('_id', ObjectId())
+        self.feeds[feed['_id']] = feed
+        self.feed_urls[feed['feed']] = feed['_id']
+        return feed['_id']
+
+    async def update_feed_last_checked(self, feed_id: Any, last_checked: datetime, previous: Optional[datetime] = None) -> None:
+        self.set_feed(feed_id, last_checked=last_checked)
+
+    async def update_feed_language(self, feed_id: Any, language: str) -> None:
+        self.set_feed(feed_id, language=language)
+
+    async def update_feed_type(self, feed_id: Any, feed_type: str) -> None:
+        self.set_feed(feed_id, type=feed_type)
+
+    async def update_feed_last_updated(self, feed_id: Any, last_updated: datetime) -> None:
+        self.set_feed(feed_id, last_updated=last_updated)
+
+    async def update_feed_stats(self, feed_id: Any, articles_added: int) -> None:
+        stats = self.feed_stats.setdefault(feed_id, {'feed_id': feed_id, 'total_items': 0})
+        stats['total_items'] += articles_added
+        stats['last_updated'] = datetime.now(UTC)
+
+    async def update_feed_high_water(self, feed_id: Any, published: str) -> None:
+        self.set_feed(feed_id, latest_published=published)
+
+    async def record_fetch(self, feed_id: Any, sample: Dict[str, Any]) -> None:
+        self.fetches.append(dict(sample, feed_id=feed_id, ts=datetime.now(UTC)))
+
+    async def article_exists(self, keys: List[str]) -> set:
+        return {key for key in keys if key in self.articles}
+
+    async def insert_articles(self, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        inserted = []
+        for doc in docs:
+            if doc['key'] not in self.articles:
+                doc.setdefault('_id', ObjectId())
+                self.articles[doc['key']] = doc
+                inserted.append(doc)
+        return inserted
+
+    async def update_articles(self, updates: Dict[str, Dict[str, Any]]) -> None:
+        for key, fields in updates.items():
+            if key in self.articles:
+                NewsStorage.merge_update(self.articles[key], fields)
+
+    async def recent_articles(self, since: datetime) -> List[Dict[str, Any]]:
+        return [doc for doc in self.articles.values()
+                if isinstance(doc.get('published'), datetime) and doc['published'] >= since and doc.get('minhash') is not None]
+
+    async def articles_with_text(self, keys: List[str]) -> set:
+        return {key for key in keys if key in self.articles and (self.articles[key].get('content') or {}).get('text')}
+
+    async def find_articles(self, keys: List[str]) -> List[Dict[str, Any]]:
+        return [self.articles[key] for key in keys if key in self.articles]
+
+    async def feed_timeline(self, feed_id: Any, before: Optional[Tuple[datetime, Any]] = None,
+                            limit: int = 50) -> List[Dict[str, Any]]:
+        return NewsStorage.timeline_page([doc for doc in self.articles.values() if doc.get('feed_id') == feed_id], before, limit)
+
+    async def existing_videos(self, video_ids: List[str]) -> set:
+        return {video_id for video_id in video_ids if video_id in self.videos}
+
+    async def bulk_insert_videos(self, video_data_list: List[Dict[str, Any]]) -> List[Any]:
+        inserted = []
+        for doc in video_data_list:
+            if doc['video_id'] not in self.videos:
+                doc.setdefault('_id', ObjectId())
+                self.videos[doc['video_id']] = doc
+                inserted.append(doc['_id'])
+        return inserted
+
+
+# --------------------------
+# SQLite Storage
+# --------------------------
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS feeds (id TEXT PRIMARY KEY, url TEXT UNIQUE, doc TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS feed_stats (feed_id TEXT PRIMARY KEY, total_items INTEGER NOT NULL, last_updated TEXT);
+CREATE TABLE IF NOT EXISTS articles (key TEXT PRIMARY KEY, feed_id TEXT, published TEXT, doc TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS articles_feed_published ON articles (feed_id, published);
+CREATE TABLE IF NOT EXISTS videos (video_id TEXT PRIMARY KEY, feed_id TEXT, doc TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS fetch_metrics (ts TEXT NOT NULL, feed_id TEXT, doc TEXT NOT NULL);
+"""
+
+
+class SQLiteStorage(NewsStorage, VideoStorage):
+    """
+    Single-file storage for offline runs and local load tests. Documents are
+    kept as extended JSON (ObjectIds and datetimes round-trip); the connection
+    lives on one worker thread so the event loop never blocks on disk.
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self.connection: Optional[sqlite3.Connection] = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite')
+
+    async def run(self, func, *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    def connect(self) -> sqlite3.Connection:
+        if self.connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.connection = sqlite3.connect(self.path)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            self.connection.executescript(SCHEMA)
+        return self.connection
+
+    @staticmethod
+    def dumps(doc: Dict[str, Any]) -> str:
+        return json_util.dumps(doc)
+
+    @staticmethod
+    def loads(data: str) -> Dict[str, Any]:
+        return json_util.loads(data, json_options=json_util.JSONOptions(tz_aware=True, tzinfo=UTC))
+
+    async def startup(self) -> None:
+        await self.run(self.connect)
+
+    async def close(self) -> None:
+        def close() -> None:
+            if self.connection is not None:
+                self.connection.commit()
+                self.connection.close()
+                self.connection = None
+        await self.run(close)
+        self.executor.shutdown(wait=True)
+
+    # Feeds
+    def select_feed(self, url: str) -> Optional[Dict[str, Any]]:
+        row = self.connect().execute('SELECT doc FROM feeds WHERE url = ?', (url,)).fetchone()
+        return SQLiteStorage.loads(row[0]) if row else None
+
+    async def feed_exists(self, url: str) -> Optional[Dict[str, Any]]:
+        return await self.run(self.select_feed, url)
+
+    async def get_all_feeds(self) -> List[Dict[str, Any]]:
+        def select_all() -> List[Dict[str, Any]]:
+            return [SQLiteStorage.loads(row[0]) for row in self.connect().execute('SELECT doc FROM feeds')]
+        return await self.run(select_all)
+
+    async def create_feed(self, feed_data: Dict[str, Any]) -> Any:
+        feed = dict(feed_data)
+        feed.setdefault('_id', ObjectId())
+
+        def insert() -> None:
+            with self.connect() as connection:
+                connection.execute('INSERT INTO feeds (id, url, doc) VALUES (?, ?, ?)',
+                                   (str(feed['_id']), feed['feed'], SQLiteStorage.dumps(feed)))
+        await self.run(insert)
+        return feed['_id']
+
+    async def set_feed(self, feed_id: Any, fields: Dict[str, Any]) -> None:
+        def update() -> None:
+            with self.connect() as connection:
+                row = connection.execute('SELECT doc FROM feeds WHERE id = ?', (str(feed_id),)).fetchone()
+                if row:
+                    feed = SQLiteStorage.loads(row[0])
+                    feed.update(fields)
+                    connection.execute('UPDATE feeds SET doc = ? WHERE id = ?', (SQLiteStorage.dumps(feed), str(feed_id)))
+        await self.run(update)
+
+    async def update_feed_last_checked(self, feed_id: Any, last_checked: datetime, previous: Optional[datetime] = None) -> None:
+        await self.set_feed(feed_id, {'last_checked': last_checked})
+
+    async def update_feed_language(self, feed_id: Any, language: str) -> None:
+        await self.set_feed(feed_id, {'language': language})
+
+    async def update_feed_type(self, feed_id: Any, feed_type: str) -> None:
+        await self.set_feed(feed_id, {'type': feed_type})
+
+    async def update_feed_last_updated(self, feed_id: Any, last_updated: datetime) -> None:
+        await self.set_feed(feed_id, {'last_updated': last_updated})
+
+    async def update_feed_high_water(self, feed_id: Any, published: str) -> None:
+        await self.set_feed(feed_id, {'latest_published': published})
+
+    async def update_feed_stats(self, feed_id: Any, articles_added: int) -> None:
+        def upsert() -> None:
+            with self.connect() as connection:
+                connection.execute(
+                    'INSERT INTO feed_stats (feed_id, total_items, last_updated) VALUES (?, ?, ?) '
+                    'ON CONFLICT(feed_id) DO UPDATE SET total_items = total_items + excluded.total_items, '
+                    'last_updated = excluded.last_updated',
+                    (str(feed_id), articles_added, datetime.now(UTC).isoformat()),
+                )
+        await self.run(upsert)
+
+    async def record_fetch(self, feed_id: Any, sample: Dict[str, Any]) -> None:
+        def insert() -> None:
+            with self.connect() as connection:
+                connection.execute('INSERT INTO fetch_metrics (ts, feed_id, doc) VALUES (?, ?, ?)',
+                                   (datetime.now(UTC).isoformat(), str(feed_id), SQLiteStorage.dumps(sample)))
+        await self.run(insert)
+
+    # Articles and videos
+    def select_existing(self, table: str, column: str, values: List[str]) -> set:
+        found = set()
+        connection = self.connect()
+        for start in range(0, len(values), SQLITE_MAX_VARIABLES):
+            chunk = values[start:start + SQLITE_MAX_VARIABLES]
+            placeholders = ','.join('?' * len(chunk))
+            found.update(row[0] for row in connection.execute(
+                f'SELECT {column} FROM {table} WHERE {column} IN ({placeholders})', chunk))
+        return found
+
+    async def article_exists(self, keys: List[str]) -> set:
+        return await self.run(self.select_existing, 'articles', 'key', list(keys))
+
+    async def insert_articles(self, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if not docs:
+            return []
+        for doc in docs:
+            doc.setdefault('_id', ObjectId())
+        rows = [
+            (doc['key'], str(doc.get('feed_id')), doc['published'].isoformat() if isinstance(doc.get('published'), datetime) else None,
+             SQLiteStorage.dumps(doc))
+            for doc in docs
+        ]
+
+        def insert() -> List[Dict[str, Any]]:
+            inserted = []
+            with self.connect() as connection:
+                for doc, row in zip(docs, rows):
+                    cursor = connection.execute('INSERT OR IGNORE INTO articles (key, feed_id, published, doc) VALUES (?, ?, ?, ?)', row)
+                    if cursor.rowcount:
+                        inserted.append(doc)
+            return inserted
+        return await self.run(insert)
+
+    async def update_articles(self, updates: Dict[str, Dict[str, Any]]) -> None:
+        if not updates:
+            return
+
+        def update() -> None:
+            with self.connect() as connection:
+                for key, fields in updates.items():
+                    row = connection.execute('SELECT doc FROM articles WHERE key = ?', (key,)).fetchone()
+                    if row:
+                        doc = SQLiteStorage.loads(row[0])
+                        NewsStorage.merge_update(doc, fields)
+                        connection.execute('UPDATE articles SET doc = ? WHERE key = ?', (SQLiteStorage.dumps(doc), key))
+        await self.run(update)
+
+    async def recent_articles(self, since: datetime) -> List[Dict[str, Any]]:
+        def select_recent() -> List[Dict[str, Any]]:
+            rows = self.connect().execute('SELECT doc FROM articles WHERE published >= ?', (since.isoformat(),))
+            docs = (SQLiteStorage.loads(row[0]) for row in rows)
+            return [doc for doc in docs if doc.get('minhash') is not None]
+        return await self.run(select_recent)
+
+    async def articles_with_text(self, keys: List[str]) -> set:
+        def select_with_text() -> set:
+            found = set()
+            connection = self.connect()
+            for start in range(0, len(keys), SQLITE_MAX_VARIABLES):
+                chunk = list(keys[start:start + SQLITE_MAX_VARIABLES])
+                placeholders = ','.join('?' * len(chunk))
+                for key, data in connection.execute(f'SELECT key, doc FROM articles WHERE key IN ({placeholders})', chunk):
+                    if (SQLiteStorage.loads(data).get('content') or {}).get('text'):
+                        found.add(key)
+            return found
+        return await self.run(select_with_text)
+
+    async def find_articles(self, keys: List[str]) -> List[Dict[str, Any]]:
+        def select_articles() -> List[Dict[str, Any]]:
+            found = []
+            connection = self.connect()
+            for start in range(0, len(keys), SQLITE_MAX_VARIABLES):
+                chunk = list(keys[start:start + SQLITE_MAX_VARIABLES])
+                placeholders = ','.join('?' * len(chunk))
+                found.extend(SQLiteStorage.loads(row[0]) for row in connection.execute(
+                    f'SELECT doc FROM articles WHERE key IN ({placeholders})', chunk))
+            return found
+        return await self.run(select_articles)
+
+    async def feed_timeline(self, feed_id: Any, before: Optional[Tuple[datetime, Any]] = None,
+                            limit: int = 50) -> List[Dict[str, Any]]:
+        def select_page() -> List[Dict[str, Any]]:
+            query = 'SELECT published, doc FROM articles WHERE feed_id = ?'
+            params: List[Any] = [str(feed_id)]
+            if before is not None:
+                query += ' AND published <= ?'
+                params.append(before[0].isoformat())
+            docs = []
+            for published, data in self.connect().execute(f'{query} ORDER BY published DESC', params):
+                # Read on past `limit` only for articles published in the same instant, which _id orders
+                if len(docs) >= limit and published != docs[-1][0]:
+                    break
+                doc = SQLiteStorage.loads(data)
+                if before is None or (doc['published'], doc['_id']) < before:
+                    docs.append((published, doc))
+            return NewsStorage.timeline_page([doc for _, doc in docs], None, limit)
+        return await self.run(select_page)
+
+    async def existing_videos(self, video_ids: List[str]) -> set:
+        return await self.run(self.select_existing, 'videos', 'video_id', list(video_ids))
+
+    async def bulk_insert_videos(self, video_data_list: List[Dict[str, Any]]) -> List[Any]:
+        for doc in video_data_list:
+            doc.setdefault('_id', ObjectId())
+
+        def insert() -> List[Any]:
+            inserted = []
+            with self.connect() as connection:
+                for doc in video_data_list:
+                    cursor = connection.execute('INSERT OR IGNORE INTO videos (video_id, feed_id, doc) VALUES (?, ?, ?)',
+                                                (doc['video_id'], str(doc.get('feed_id')), SQLiteStorage.dumps(doc)))
+                    if cursor.rowcount:
+                        inserted.append(doc['_id'])
+            return inserted
+        return await self.run(insert)
@@ -0,0 +1,200 @@
+import os
+import re
+import time
+import asyncio
+import hashlib
+import logging
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from utilities.ttl_cache import TTLCache
+from utilities.stopwords import STOPWORDS
+
+
+# --------------------------
+# Configuration and Constants
+# --------------------------
+
+SUMMARY_SENTENCES = int(os.getenv('SUMMARY_SENTENCES', '3'))
+# Only the opening sentences of long articles are ranked; the similarity matrix grows with the square
+SUMMARY_MAX_SENTENCES = int(os.getenv('SUMMARY_MAX_SENTENCES', '80'))
+# Seconds of CPU per article before falling back to the lead sentences
+SUMMARY_TIME_BUDGET = float(os.getenv('SUMMARY_TIME_BUDGET', '0.25'))
+SUMMARY_WORKERS = int(os.getenv('SUMMARY_WORKERS', str(os.cpu_count() or 2)))
+SUMMARY_BATCH_SIZE = int(os.getenv('SUMMARY_BATCH_SIZE', '20'))
+SUMMARY_CACHE_TTL = int(os.getenv('SUMMARY_CACHE_TTL', str(30 * 86400)))
+# News puts the essentials first; sentence i's score is scaled by 1 + LEAD_WEIGHT / (i + 1)
+SUMMARY_LEAD_WEIGHT = float(os.getenv('SUMMARY_LEAD_WEIGHT', '0.5'))
+SENTENCE_MIN_WORDS = 6
+
+DAMPING = 0.85
+TEXTRANK_ITERATIONS = 50
+TEXTRANK_TOLERANCE = 1e-5
+
+TERM = re.compile(r'[^\W\d_]{2,}', re.UNICODE)
+SENTENCE_BREAK = re.compile(r'(?<=[.!?…])["”»’)\]]*\s+')
+ABBREVIATION = re.compile(r'(?:\b[A-Z]|\b(?:Mr|Mrs|Ms|Dr|St|Jr|Sr|Prof|Gen|Gov|Sen|Rep|Inc|Ltd|Co|No|vs|etc|tj|npr|dr|sv|br))\.$')
+
+
+# --------------------------
+# TextRank (process pool)
+# --------------------------
+
+def split_sentences(text: str) -> List[str]:
+    sentences = []
+    for paragraph in text.split('\n'):
+        pieces = [piece.strip() for piece in SENTENCE_BREAK.split(paragraph.strip()) if piece.strip()]
+        for index, piece in enumerate(pieces):
+            # "Dr. Smith", "U.S. officials", "... said. and then": not a sentence break
+            if index and (piece[0].islower() or ABBREVIATION.search(sentences[-1])):
+                sentences[-1] = f"{sentences[-1]} {piece}"
+            else:
+                sentences.append(piece)
+    return sentences
+
+
+def textrank(sentences: List[str], language: Optional[str], deadline: float) -> Optional[np.ndarray]:
+    """
+    Sentence scores from PageRank over the cosine similarities of the
+    sentences' TF-IDF vectors; None when the deadline passes first. The
+    deadline is only checked between PageRank iterations, not while the
+    similarity matrix is built; SUMMARY_MAX_SENTENCES keeps that step small.
+    """
+    stopwords = STOPWORDS.get(language or '', frozenset())
+    bags = [[term for term in TERM.findall(sentence.lower()) if term not in stopwords] for sentence in sentences]
+    vocabulary: Dict[str, int] = {}
+    columns = np.fromiter((vocabulary.setdefault(term, len(vocabulary)) for bag in bags for term in bag), dtype=np.int64)
+    rows = np.repeat(np.arange(len(bags)), [len(bag) for bag in bags])
+    count = len(sentences)
+    if not vocabulary:
+        return np.ones(count)
+
+    matrix = np.zeros((count, len(vocabulary)), dtype=np.float32)
+    np.add.at(matrix, (rows, columns), 1)
+    # Terms in every sentence say nothing about which one matters
+    idf = np.log((1 + count) / (1 + (matrix > 0).sum(axis=0))) + 1
+    matrix = np.log1p(matrix) * idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix /= np.where(norms > 0, norms, 1)
+    similarity = matrix @ matrix.T
+    np.fill_diagonal(similarity, 0)
+
+    totals = similarity.sum(axis=1, keepdims=True)
+    # Sentences sharing nothing with the rest spread their rank evenly
+    transition = np.where(totals > 0, similarity / np.where(totals > 0, totals, 1), 1 / count).T
+    scores = np.full(count, 1 / count, dtype=np.float32)
+    for _ in range(TEXTRANK_ITERATIONS):
+        if time.perf_counter() > deadline:
+            return None
+        updated = (1 - DAMPING) / count + DAMPING * (transition @ scores)
+        converged = np.abs(updated - scores).sum() < TEXTRANK_TOLERANCE
+        scores = updated
+        if converged:
+            break
+    return scores
+
+
+def summarize(text: str, language: Optional[str], budget: float = SUMMARY_TIME_BUDGET,
+              sentences: int = SUMMARY_SENTENCES) -> Tuple[str, bool]:
+    """The top sentences in article order, and whether the budget ran out and the lead was used instead."""
+    deadline = time.perf_counter() + budget
+    candidates = [sentence for sentence in split_sentences(text) if len(sentence.split()) >= SENTENCE_MIN_WORDS]
+    candidates = candidates[:SUMMARY_MAX_SENTENCES]
+    if len(candidates) <= sentences:
+        return ' '.join(candidates), False
+
+    scores = textrank(candidates, language, deadline)
+    if scores is None:
+        return ' '.join(candidates[:sentences]), True
+    scores = scores * (1 + SUMMARY_LEAD_WEIGHT / np.arange(1, len(candidates) + 1))
+    chosen = np.sort(np.argsort(-scores, kind='stable')[:sentences])
+    return ' '.join(candidates[index] for index in chosen), False
+
+
+def summarize_batch(items: List[Tuple[str, Optional[str]]], budget: float = SUMMARY_TIME_BUDGET) -> List[Tuple[str, bool]]:
+    return [summarize(text, language, budget) for text, language in items]
+
+
+# --------------------------
+# Summary Cache
+# --------------------------
+
+class SummaryCache(TTLCache):
+    """SHA-256 of the article text -> summary, so republished copies reuse them."""
+
+    name = 'Summary cache'
+    field = 'summary'
+
+    @staticmethod
+    def ttl_for(digest: str, summary: str) -> int:
+        return SUMMARY_CACHE_TTL
+
+
+# --------------------------
+# Summarizer
+# --------------------------
+
+class Summarizer:
+    """
+    Extractive summaries of article texts: TextRank over sentence
+    similarities, computed in batches in a process pool, each article
+    within SUMMARY_TIME_BUDGET. Texts seen before are answered from the cache.
+    """
+
+    def __init__(self, cache: SummaryCache, workers: int = SUMMARY_WORKERS, batch_size: int = SUMMARY_BATCH_SIZE):
+        self.cache = cache
+        self.workers = workers
+        self.batch_size = batch_size
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.stats = {'summarized': 0, 'cached': 0, 'lead_fallbacks': 0, 'failed': 0}
+
+    @staticmethod
+    def digest(text: str) -> str:
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    async def summarize_many(self, texts: Dict[str, Tuple[str, Optional[str]]]) -> Dict[str, str]:
+        """Key -> summary for key -> (text, language); texts that could not be summarized are left out."""
+        digests = {key: Summarizer.digest(text) for key, (text, _) in texts.items()}
+        cached = await self.cache.get_many(list(set(digests.values())))
+        summaries = {key: cached[digest] for key, digest in digests.items() if cached.get(digest)}
+        self.stats['cached'] += len(summaries)
+
+        # Copies of one text within the batch are summarized once
+        pending: Dict[str, Tuple[str, Optional[str]]] = {}
+        for key, digest in digests.items():
+            if key not in summaries:
+                pending.setdefault(digest, texts[key])
+        if pending:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(max_workers=self.workers)
+            loop = asyncio.get_running_loop()
+            items = list(pending.items())
+            batches = [items[start:start + self.batch_size] for start in range(0, len(items), self.batch_size)]
+            results = await asyncio.gather(*(
+                loop.run_in_executor(self.pool, summarize_batch, [item for _, item in batch]) for batch in batches
+            ), return_exceptions=True)
+
+            computed = {}
+            for batch, result in zip(batches, results):
+                if isinstance(result, Exception):
+                    logging.warning(f"Summarizing {len(batch)} articles failed: {result}")
+                    self.stats['failed'] += len(batch)
+                    continue
+                for (digest, _), (summary, fallback) in zip(batch, result):
+                    self.stats['lead_fallbacks'] += fallback
+                    if summary:
+                        computed[digest] = summary
+                        # A lead fallback may do better another time
+                        if not fallback:
+                            await self.cache.put(digest, summary)
+            for key, digest in digests.items():
+                if key not in summaries and digest in computed:
+                    summaries[key] = computed[digest]
+                    self.stats['summarized'] += 1
+        return summaries
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None
+        logging.info(f"Summarizer: {self.stats}")
@@ -0,0 +1,191 @@
+import os
+import re
+import logging
+import numpy as np
+from collections import Counter
+from typing import Any, Dict, List, Set, Tuple
+from pymongo import UpdateOne
+from utilities.stopwords import STOPWORDS
+from utilities.write_buffer import BulkWriteBuffer
+
+
+# --------------------------
+# Configuration and Constants
+# --------------------------
+
+TAGS_TOP_K = int(os.getenv('TAGS_TOP_K', '5'))
+# Title words count this many times over description words
+TAGS_TITLE_WEIGHT = int(os.getenv('TAGS_TITLE_WEIGHT', '2'))
+# Below this many documents per language the frequencies say little, so no term is ruled out as too common
+TAGS_MIN_DOCUMENTS = int(os.getenv('TAGS_MIN_DOCUMENTS', '200'))
+# Terms in more than this share of documents are the corpus' own stopwords
+TAGS_MAX_DF = float(os.getenv('TAGS_MAX_DF', '0.2'))
+TAGS_DF_CACHE_SIZE = int(os.getenv('TAGS_DF_CACHE_SIZE', '500000'))
+CATEGORY_MAX_LENGTH = 50
+
+TERM = re.compile(r'[^\W\d_]{3,}', re.UNICODE)
+DOCUMENTS = '#documents'
+
+
+# --------------------------
+# TF-IDF Ranking
+# --------------------------
+
+def rank_terms(documents: List[List[str]], vocabulary: List[str], frequencies: np.ndarray, total: int, top_k: int) -> List[List[str]]:
+    """
+    The top_k terms of every document by sublinear TF times IDF, scored for
+    the whole batch at once as a documents x vocabulary matrix. `frequencies`
+    are the stored document frequencies of `vocabulary` over `total` documents.
+    """
+    index = {term: column for column, term in enumerate(vocabulary)}
+    lengths = [len(document) for document in documents]
+    rows = np.repeat(np.arange(len(documents)), lengths)
+    columns = np.fromiter((index[term] for document in documents for term in document), dtype=np.int64, count=sum(lengths))
+    counts = np.zeros((len(documents), len(vocabulary)), dtype=np.float32)
+    np.add.at(counts, (rows, columns), 1)
+
+    # The batch counts too, so a term first seen here is not infinitely rare
+    df = frequencies + (counts > 0).sum(axis=0)
+    n = total + len(documents)
+    idf = np.log((1 + n) / (1 + df)) + 1
+    if n >= TAGS_MIN_DOCUMENTS:
+        idf[df > TAGS_MAX_DF * n] = 0
+    scores = np.log1p(counts) * idf
+
+    k = min(top_k, len(vocabulary))
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top = np.take_along_axis(top, np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind='stable'), axis=1)
+    return [[vocabulary[column] for column in row if scores[line, column] > 0] for line, row in enumerate(top)]
+
+
+# --------------------------
+# Document Frequencies
+# --------------------------
+
+class DocumentFrequencies:
+    """
+    Per-language document frequencies, one `{_id: "<lang>:<term>", df}`
+    document per term plus a `#documents` total, incremented with `$inc`
+    after every batch. Counts are read once per term and kept in process.
+    Without a collection the counts live in process only.
+    """
+
+    def __init__(self, collection: Any = None, cache_size: int = TAGS_DF_CACHE_SIZE):
+        self.collection = collection
+        self.counts: Dict[str, int] = {}
+        self.cache_size = cache_size
+        self.writes = BulkWriteBuffer(collection) if collection is not None else None
+
+    @staticmethod
+    def key(language: str, term: str) -> str:
+        return f"{language}:{term}"
+
+    async def get_many(self, language: str, terms: List[str]) -> Tuple[np.ndarray, int]:
+        """Document frequencies of `terms` and the number of documents seen in `language`."""
+        keys = [DocumentFrequencies.key(language, term) for term in terms + [DOCUMENTS]]
+        missing = [key for key in keys if key not in self.counts]
+        if missing and len(self.counts) + len(missing) > self.cache_size:
+            self.counts.clear()
+            missing = keys
+        if missing:
+            loaded = dict.fromkeys(missing, 0)
+            if self.collection is not None:
+                # Buffered $inc of uncached terms would otherwise be missing from what is read back
+                await self.writes.flush()
+                async for doc in self.collection.find({'_id': {'$in': missing}}, {'df': 1}):
+                    loaded[doc['_id']] = doc['df']
+            self.counts.update(loaded)
+        frequencies = np.array([self.counts.get(key, 0) for key in keys[:-1]], dtype=np.float32)
+        return frequencies, self.counts.get(keys[-1], 0)
+
+    async def add_documents(self, language: str, documents: List[Set[str]]) -> None:
+        """Count a batch of documents, each given as its set of terms."""
+        increments = Counter(term for terms in documents for term in terms)
+        increments[DOCUMENTS] = len(documents)
+        operations, updates = [], []
+        for term, count in increments.items():
+            key = DocumentFrequencies.key(language, term)
+            if key in self.counts:
+                self.counts[key] += count
+            update = {'$inc': {'df': count}, '$setOnInsert': {'language': language, 'term': term}}
+            operations.append(UpdateOne({'_id': key}, update, upsert=True))
+            updates.append(update)
+        if self.writes is not None:
+            await self.writes.add_many(operations, updates, [None] * len(operations))
+
+    async def close(self) -> None:
+        if self.writes is not None:
+            await self.writes.close()
+
+
+# --------------------------
+# Tag Extraction
+# --------------------------
+
+class TagExtractor:
+    """
+    Sets `tags` on batches of new articles: the feed's own categories first,
+    then the article's highest TF-IDF title and description terms, up to
+    TAGS_TOP_K. Each language is scored against its own frequencies, which
+    count() updates once the articles are known to be stored.
+    """
+
+    def __init__(self, frequencies: DocumentFrequencies, top_k: int = TAGS_TOP_K):
+        self.frequencies = frequencies
+        self.top_k = top_k
+        self.stats = {'articles': 0, 'from_categories': 0, 'from_text': 0}
+
+    @staticmethod
+    def terms(text: str, language: str) -> List[str]:
+        stopwords = STOPWORDS.get(language, frozenset())
+        return [term for term in TERM.findall((text or '').lower()) if term not in stopwords]
+
+    @staticmethod
+    def categories(entry: Dict[str, Any]) -> List[str]:
+        """Normalized <category> terms of a feedparser entry."""
+        terms = (tag.get('term') or '' for tag in entry.get('tags') or [])
+        cleaned = (' '.join(term.lower().split()) for term in terms)
+        return list(dict.fromkeys(term for term in cleaned if 1 < len(term) <= CATEGORY_MAX_LENGTH))
+
+    def merge(self, categories: List[str], ranked: List[str]) -> List[str]:
+        tags = list(dict.fromkeys(categories))[:self.top_k]
+        self.stats['from_categories'] += len(tags)
+        for term in ranked:
+            if len(tags) >= self.top_k:
+                break
+            if term not in tags:
+                tags.append(term)
+                self.stats['from_text'] += 1
+        return tags
+
+    @staticmethod
+    def by_language(articles: List[Dict[str, Any]]) -> Dict[str, Tuple[List[Dict[str, Any]], List[List[str]]]]:
+        """Language -> its articles and their terms, title terms repeated TAGS_TITLE_WEIGHT times."""
+        groups: Dict[str, Tuple[List[Dict[str, Any]], List[List[str]]]] = {}
+        for article in articles:
+            language = article.get('language') or ''
+            group, documents = groups.setdefault(language, ([], []))
+            group.append(article)
+            documents.append(TagExtractor.terms(article.get('title'), language) * TAGS_TITLE_WEIGHT
+                             + TagExtractor.terms(article.get('description'), language))
+        return groups
+
+    async def tag(self, articles: List[Dict[str, Any]]) -> None:
+        for language, (group, documents) in TagExtractor.by_language(articles).items():
+            vocabulary = list(dict.fromkeys(term for document in documents for term in document))
+            ranked: List[List[str]] = [[] for _ in group]
+            if vocabulary:
+                frequencies, total = await self.frequencies.get_many(language, vocabulary)
+                ranked = rank_terms(documents, vocabulary, frequencies, total, self.top_k)
+
+            for article, terms in zip(group, ranked):
+                article['tags'] = self.merge(article.get('tags') or [], terms)
+            self.stats['articles'] += len(group)
+
+    async def count(self, articles: List[Dict[str, Any]]) -> None:
+        """Add stored articles to the document frequencies; duplicates that were not inserted must not be passed."""
+        for language, (_, documents) in TagExtractor.by_language(articles).items():
+            await self.frequencies.add_documents(language, [set(document) for document in documents])
+
+    def close(self) -> None:
+        logging.info(f"Tag extraction: {self.stats}")
@@ -0,0 +1,307 @@
+import io
+import os
+import json
+import base64
+import asyncio
+import hashlib
+import hmac
+import socket
+import logging
+import ipaddress
+import threading
+import aiohttp
+from aiohttp.abc import AbstractResolver, ResolveResult
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urljoin, urlsplit
+from PIL import Image, ImageOps
+from utilities.image_probe import IMAGE_MAX_BYTES, IMAGE_MAX_PIXELS
+
+
+# --------------------------
+# Configuration and Constants
+# --------------------------
+
+THUMBNAIL_DIR = os.getenv('THUMBNAIL_DIR', os.path.join('data', 'thumbnails'))
+# Widths served; requests are rounded up to the next one
+THUMBNAIL_WIDTHS = tuple(sorted(int(width) for width in os.getenv('THUMBNAIL_WIDTHS', '160,320,640').split(',')))
+THUMBNAIL_QUALITY = int(os.getenv('THUMBNAIL_QUALITY', '75'))
+THUMBNAIL_WORKERS = int(os.getenv('THUMBNAIL_WORKERS', str(os.cpu_count() or 2)))
+THUMBNAIL_FETCH_TIMEOUT = aiohttp.ClientTimeout(total=int(os.getenv('THUMBNAIL_FETCH_TIMEOUT', '20')))
+# Shared with whoever builds proxy URLs; required, the proxy only fetches signed URLs
+THUMBNAIL_PROXY_SECRET = os.getenv('THUMBNAIL_PROXY_SECRET', '')
+THUMBNAIL_PROXY_URL = os.getenv('THUMBNAIL_PROXY_URL', 'http://127.0.0.1:8080')
+THUMBNAIL_MAX_REDIRECTS = 3
+
+REDIRECTS = (301, 302, 303, 307, 308)
+
+PLACEHOLDER_WIDTH = 16
+PLACEHOLDER_QUALITY = 30
+
+# Decompression bombs raise instead of eating the worker's memory
+Image.MAX_IMAGE_PIXELS = IMAGE_MAX_PIXELS
+
+
+# --------------------------
+# Rendering (process pool)
+# --------------------------
+
+def encode_webp(image: Image.Image, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, 'WEBP', quality=quality, method=4)
+    return buffer.getvalue()
+
+
+def render(data: bytes, widths: Tuple[int, ...] = THUMBNAIL_WIDTHS, quality: int = THUMBNAIL_QUALITY) -> Dict[str, Any]:
+    """Decode an image once and encode every width as WebP, plus a tiny blurred placeholder as a data URI."""
+    with Image.open(io.BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original)
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+    variants = {}
+    for width in widths:
+        # Never upscale; small originals are served as-is at every larger width
+        target = min(width, image.width)
+        resized = image.resize((target, max(1, round(image.height * target / image.width))), Image.Resampling.LANCZOS)
+        variants[width] = encode_webp(resized, quality)
+
+    tiny = image.resize((PLACEHOLDER_WIDTH, max(1, round(image.height * PLACEHOLDER_WIDTH / image.width))), Image.Resampling.BOX)
+    placeholder = 'data:image/webp;base64,' + base64.b64encode(encode_webp(tiny, PLACEHOLDER_QUALITY)).decode('ascii')
+    return {'variants': variants, 'placeholder': placeholder, 'width': image.width, 'height': image.height}
+
+
+# --------------------------
+# Content-addressed Disk Cache
+# --------------------------
+
+class ThumbnailStore:
+    """
+    Rendered thumbnails on disk, addressed by the SHA-256 of the original
+    image, so the same picture hotlinked under different URLs is stored once:
+    `<dir>/<hh>/<digest>/<width>.webp` plus `meta.json`. Source URLs map to
+    digests through small files under `<dir>/urls/`.
+    """
+
+    def __init__(self, directory: str = THUMBNAIL_DIR):
+        self.directory = directory
+
+    def image_dir(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def variant_path(self, digest: str, width: int) -> str:
+        return os.path.join(self.image_dir(digest), f"{width}.webp")
+
+    def url_path(self, url: str) -> str:
+        name = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, 'urls', name[:2], f"{name}.json")
+
+    @staticmethod
+    def write_atomic(path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, 'wb') as file:
+            file.write(data)
+        os.replace(temporary, path)
+
+    @staticmethod
+    def read_json(path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, 'rb') as file:
+                return json.loads(file.read())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        """Metadata of the rendered image for a source URL, if it was processed before."""
+        entry = ThumbnailStore.read_json(self.url_path(url))
+        return ThumbnailStore.read_json(os.path.join(self.image_dir(entry['digest']), 'meta.json')) if entry else None
+
+    def meta(self, digest: str) -> Optional[Dict[str, Any]]:
+        return ThumbnailStore.read_json(os.path.join(self.image_dir(digest), 'meta.json'))
+
+    def save(self, url: str, digest: str, rendered: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if rendered is not None:
+            for width, data in rendered['variants'].items():
+                ThumbnailStore.write_atomic(self.variant_path(digest, width), data)
+            meta = {key: rendered[key] for key in ('placeholder', 'width', 'height')}
+            meta['digest'] = digest
+            # meta.json last: its presence means every variant is on disk
+            ThumbnailStore.write_atomic(os.path.join(self.image_dir(digest), 'meta.json'), json.dumps(meta).encode('utf-8'))
+        ThumbnailStore.write_atomic(self.url_path(url), json.dumps({'digest': digest}).encode('utf-8'))
+        return self.meta(digest)
+
+
+# --------------------------
+# Public-address Resolver
+# --------------------------
+
+def is_public_address(address: str) -> bool:
+    """False for loopback, private, link-local (cloud metadata), shared and reserved addresses."""
+    try:
+        ip = ipaddress.ip_address(address.split('%', 1)[0])
+    except ValueError:
+        return False
+    return ip.is_global and not ip.is_multicast
+
+
+class PublicResolver(AbstractResolver):
+    """
+    Resolves like aiohttp's default resolver but refuses hosts with any
+    non-public address, so the proxy cannot be pointed at the machine it runs
+    on or its network. Checked on every connection, redirects included.
+    """
+
+    def __init__(self) -> None:
+        self.resolver = aiohttp.DefaultResolver()
+
+    async def resolve(self, host: str, port: int = 0, family: socket.AddressFamily = socket.AF_INET) -> List[ResolveResult]:
+        hosts = await self.resolver.resolve(host, port, family)
+        blocked = [entry['host'] for entry in hosts if not is_public_address(entry['host'])]
+        if blocked:
+            raise OSError(f"{host} resolves to non-public address {blocked[0]}")
+        return hosts
+
+    async def close(self) -> None:
+        await self.resolver.close()
+
+
+# --------------------------
+# Thumbnail Proxy
+# --------------------------
+
+class ThumbnailProxy:
+    """
+    Fetches each source image once, renders it in a process pool and keeps
+    the result in a ThumbnailStore. Concurrent requests for the same URL
+    share one fetch. Downloads go through a session of their own that only
+    connects to public addresses.
+    """
+
+    def __init__(self, store: Optional[ThumbnailStore] = None, workers: int = THUMBNAIL_WORKERS):
+        self.store = store or ThumbnailStore()
+        self.workers = workers
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.client: Optional[aiohttp.ClientSession] = None
+        self.pending: Dict[str, asyncio.Future] = {}
+        self.stats = {'hits': 0, 'rendered': 0, 'failed': 0}
+
+    @staticmethod
+    def sign(url: str, secret: str = THUMBNAIL_PROXY_SECRET) -> str:
+        return hmac.new(secret.encode('utf-8'), url.encode('utf-8'), hashlib.sha256).hexdigest()[:32]
+
+    @staticmethod
+    def verify(url: str, signature: str, secret: str = THUMBNAIL_PROXY_SECRET) -> bool:
+        # Without a secret nothing is signed, so nothing is accepted
+        return bool(secret) and hmac.compare_digest(ThumbnailProxy.sign(url, secret), signature or '')
+
+    @staticmethod
+    def proxy_url(url: str, width: Optional[int] = None, base: str = THUMBNAIL_PROXY_URL,
+                  secret: str = THUMBNAIL_PROXY_SECRET) -> str:
+        """
+        What clients should load instead of hotlinking `url`. Articles keep the
+        source URL in `thumbnail`; whatever serves them to clients builds this
+        when it reads them, so the proxy's address and secret can change
+        without rewriting stored documents.
+        """
+        if not secret:
+            raise RuntimeError('THUMBNAIL_PROXY_SECRET is not set')
+        query = {'url': url}
+        if width:
+            query['w'] = width
+        query['sig'] = ThumbnailProxy.sign(url, secret)
+        return f"{base.rstrip('/')}/thumbnail?{urlencode(query)}"
+
+    @staticmethod
+    def allowed(url: str) -> bool:
+        """http(s) with a host; literal IPs must be public, host names are checked when resolved."""
+        parts = urlsplit(url)
+        host = parts.hostname or ''
+        if parts.scheme not in ('http', 'https') or not host:
+            return False
+        try:
+            ipaddress.ip_address(host.split('%', 1)[0])
+        except ValueError:
+            return True
+        return is_public_address(host)
+
+    def session(self) -> aiohttp.ClientSession:
+        if self.client is None or self.client.closed:
+            self.client = aiohttp.ClientSession(connector=aiohttp.TCPConnector(resolver=PublicResolver()))
+        return self.client
+
+    @staticmethod
+    def width_for(requested: Optional[int]) -> int:
+        """The smallest served width at least as large as the requested one."""
+        if not requested:
+            return THUMBNAIL_WIDTHS[-1]
+        return next((width for width in THUMBNAIL_WIDTHS if width >= requested), THUMBNAIL_WIDTHS[-1])
+
+    async def thumbnail(self, url: str, session: aiohttp.ClientSession) -> Optional[Dict[str, Any]]:
+        """Metadata (digest, placeholder, dimensions) of the rendered image; None when it cannot be used."""
+        meta = await asyncio.to_thread(self.store.lookup, url)
+        if meta:
+            self.stats['hits'] += 1
+            return meta
+
+        if url not in self.pending:
+            self.pending[url] = asyncio.ensure_future(self.process(url, session))
+            self.pending[url].add_done_callback(lambda _: self.pending.pop(url, None))
+        return await asyncio.shield(self.pending[url])
+
+    async def process(self, url: str, session: aiohttp.ClientSession) -> Optional[Dict[str, Any]]:
+        data = await ThumbnailProxy.download(url, session)
+        if data is None:
+            self.stats['failed'] += 1
+            return None
+
+        digest = hashlib.sha256(data).hexdigest()
+        meta = await asyncio.to_thread(self.store.meta, digest)
+        if meta is None:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(max_workers=self.workers)
+            try:
+                rendered = await asyncio.get_running_loop().run_in_executor(self.pool, render, data)
+            except Exception as e:
+                logging.warning(f"Could not render thumbnail for {url}: {e}")
+                self.stats['failed'] += 1
+                return None
+            self.stats['rendered'] += 1
+            return await asyncio.to_thread(self.store.save, url, digest, rendered)
+
+        await asyncio.to_thread(self.store.save, url, digest, None)
+        return meta
+
+    @staticmethod
+    async def download(url: str, session: aiohttp.ClientSession) -> Optional[bytes]:
+        source = url
+        try:
+            # Redirects are followed by hand so every hop is checked, literal IPs included
+            for _ in range(THUMBNAIL_MAX_REDIRECTS + 1):
+                if not ThumbnailProxy.allowed(url):
+                    logging.warning(f"Refused thumbnail fetch of {url} (from {source})")
+                    return None
+                async with session.get(url, timeout=THUMBNAIL_FETCH_TIMEOUT, allow_redirects=False) as response:
+                    if response.status in REDIRECTS and response.headers.get('Location'):
+                        url = urljoin(url, response.headers['Location'])
+                        continue
+                    if response.status != 200 or (response.content_length or 0) > IMAGE_MAX_BYTES:
+                        return None
+                    data = bytearray()
+                    async for chunk in response.content.iter_chunked(64 * 1024):
+                        data += chunk
+                        if len(data) > IMAGE_MAX_BYTES:
+                            return None
+                    return bytes(data)
+            return None
+        except Exception as e:
+            logging.debug(f"Thumbnail download failed for {source}: {e}")
+            return None
+
+    async def close(self) -> None:
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None
+        logging.info(f"Thumbnail proxy: {self.stats}")
@@ -0,0 +1,90 @@
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta, UTC
+from typing import Any, Dict, List, Tuple
+from pymongo import UpdateOne
+from utilities.write_buffer import BulkWriteBuffer
+
+
+# --------------------------
+# Configuration and Constants
+# --------------------------
+
+TTL_CACHE_LRU_SIZE = 20000
+TTL_CACHE_TTL = 86400
+
+
+# --------------------------
+# Expiring Key-Value Cache
+# --------------------------
+
+class TTLCache:
+    """
+    String key -> value with a per-entry lifetime, an in-process LRU in front
+    of a Mongo collection (`expires` is covered by a TTL index). Values are
+    stored under `field`; None is a valid value, e.g. a cached failure.
+    Subclasses pick the lifetime per entry in ttl_for. Without a collection
+    the cache is LRU-only.
+    """
+
+    name = 'Cache'
+    field = 'value'
+
+    def __init__(self, collection: Any = None, lru_size: int = TTL_CACHE_LRU_SIZE):
+        self.collection = collection
+        self.lru: OrderedDict[str, Tuple[Any, datetime]] = OrderedDict()
+        self.lru_size = lru_size
+        self.writes = BulkWriteBuffer(collection) if collection is not None else None
+        self.stats = {'lru_hits': 0, 'store_hits': 0, 'misses': 0}
+
+    @staticmethod
+    def ttl_for(key: str, value: Any) -> int:
+        return TTL_CACHE_TTL
+
+    def remember(self, key: str, value: Any, expires: datetime) -> None:
+        self.lru[key] = (value, expires)
+        self.lru.move_to_end(key)
+        while len(self.lru) > self.lru_size:
+            self.lru.popitem(last=False)
+
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """The value of every key that has a live entry."""
+        now = datetime.now(UTC)
+        found: Dict[str, Any] = {}
+        missing = []
+        for key in keys:
+            cached = self.lru.get(key)
+            if cached and cached[1] > now:
+                self.lru.move_to_end(key)
+                found[key] = cached[0]
+                self.stats['lru_hits'] += 1
+            else:
+                missing.append(key)
+
+        if missing and self.collection is not None:
+            # Documents written under another field name are misses, not cached Nones
+            query = {'_id': {'$in': missing}, 'expires': {'$gt': now}, self.field: {'$exists': True}}
+            async for doc in self.collection.find(query):
+                expires = doc['expires'] if doc['expires'].tzinfo else doc['expires'].replace(tzinfo=UTC)
+                found[doc['_id']] = doc[self.field]
+                self.remember(doc['_id'], doc[self.field], expires)
+                self.stats['store_hits'] += 1
+
+        self.stats['misses'] += sum(1 for key in missing if key not in found)
+        return found
+
+    async def put(self, key: str, value: Any) -> None:
+        expires = datetime.now(UTC) + timedelta(seconds=self.ttl_for(key, value))
+        self.remember(key, value, expires)
+        if self.writes is not None:
+            document = {self.field: value, 'expires': expires}
+            await self.writes.add(UpdateOne({'_id': key}, {'$set': document}, upsert=True), document)
+
+    def hit_ratio(self) -> float:
+        lookups = self.stats['lru_hits'] + self.stats['store_hits'] + self.stats['misses']
+        return (self.stats['lru_hits'] + self.stats['store_hits']) / lookups if lookups else 0.0
+
+    async def close(self) -> None:
+        if self.writes is not None:
+            await self.writes.close()
+        logging.info(f"{self.name}: {self.stats}, hit ratio {self.hit_ratio():.1%}")
@@ -0,0 +1,220 @@
+import os
+import time
+import asyncio
+import logging
+import bson
+import contextlib
+from datetime import datetime, UTC
+from typing import Any, Callable, Dict, List, Optional
+from bson import json_util
+from pymongo.errors import AutoReconnect, BulkWriteError, ConnectionFailure, NetworkTimeout
+from utilities.helpers import retry
+
+
+# --------------------------
+# Configuration and Constants
+# --------------------------
+
+WRITE_BUFFER_MAX_OPS = int(os.getenv('WRITE_BUFFER_MAX_OPS', '1000'))
+# Well under the 48 MB message limit; single documents are already capped at 16 MB by BSON
+WRITE_BUFFER_MAX_BYTES = int(os.getenv('WRITE_BUFFER_MAX_BYTES', str(16 * 1024 * 1024)))
+WRITE_BUFFER_MAX_AGE = float(os.getenv('WRITE_BUFFER_MAX_AGE', '2.0'))
+# Consecutive failed flushes after which a batch is moved to the dead letters instead of retried again
+WRITE_BUFFER_MAX_FAILURES = int(os.getenv('WRITE_BUFFER_MAX_FAILURES', '5'))
+# One JSON lines file per collection: rejected writes and writes still failing at shutdown
+WRITE_BUFFER_DEAD_LETTER_DIR = os.getenv('WRITE_BUFFER_DEAD_LETTER_DIR', os.path.join('data', 'dead_letters'))
+
+TRANSIENT_ERRORS = (AutoReconnect, NetworkTimeout, ConnectionFailure)
+DUPLICATE_KEY = 11000
+
+
+# --------------------------
+# Write-behind Buffer
+# --------------------------
+
+class BulkWriteBuffer:
+    """
+    Collects write operations from every feed and sends them as unordered
+    bulk_write batches, flushing on operation count, byte size or age.
+    Every add() returns a future that resolves to True once its operation is
+    written and to False when it never will be: a batch that cannot be
+    written stays buffered for the next flush, up to WRITE_BUFFER_MAX_FAILURES
+    attempts; operations the server rejects, and batches that still fail
+    after that or at close(), go to the dead-letter file with their document.
+    """
+
+    def __init__(self, collection: Any, on_flush: Optional[Callable[[List[Any]], None]] = None,
+                 max_ops: int = WRITE_BUFFER_MAX_OPS, max_bytes: int = WRITE_BUFFER_MAX_BYTES,
+                 max_age: float = WRITE_BUFFER_MAX_AGE, dead_letter_dir: str = WRITE_BUFFER_DEAD_LETTER_DIR):
+        self.collection = collection
+        self.on_flush = on_flush
+        self.max_ops = max_ops
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.dead_letter_dir = dead_letter_dir
+
+        self.operations: List[Any] = []
+        self.documents: List[Optional[Dict[str, Any]]] = []
+        self.tags: List[Any] = []
+        self.results: List[asyncio.Future] = []
+        self.size = 0
+        self.oldest: Optional[float] = None
+        self.failures = 0
+        self.lock = asyncio.Lock()
+        self.stopping = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.metrics = {
+            'flushes': 0,
+            'operations': 0,
+            'bytes': 0,
+            'failed_flushes': 0,
+            'rejected': 0,
+            'dead_letters': 0,
+            'total_latency_ms': 0.0,
+            'max_latency_ms': 0.0,
+            'max_batch': 0,
+        }
+
+    @property
+    def dead_letter_path(self) -> str:
+        return os.path.join(self.dead_letter_dir, f"{self.collection.name}.jsonl")
+
+    async def add(self, operation: Any, document: Optional[Dict[str, Any]] = None, tag: Any = None) -> asyncio.Future:
+        """
+        Queue one write; `document` is used to estimate its BSON size and is
+        what a dead letter records, `tag` is handed to on_flush. The returned
+        future tells whether the write made it.
+        """
+        if self.task is None:
+            self.stopping.clear()
+            self.task = asyncio.create_task(self.run())
+
+        result = asyncio.get_running_loop().create_future()
+        self.operations.append(operation)
+        self.documents.append(document)
+        self.tags.append(tag)
+        self.results.append(result)
+        self.size += len(bson.encode(document)) if document else 0
+        if self.oldest is None:
+            self.oldest = time.monotonic()
+
+        if len(self.operations) >= self.max_ops or self.size >= self.max_bytes:
+            await self.flush()
+        return result
+
+    async def add_many(self, operations: List[Any], documents: List[Dict[str, Any]], tags: List[Any]) -> List[asyncio.Future]:
+        return [await self.add(operation, document, tag) for operation, document, tag in zip(operations, documents, tags)]
+
+    async def run(self) -> None:
+        """Background task flushing batches that are older than max_age."""
+        while not self.stopping.is_set():
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self.stopping.wait(), timeout=self.max_age / 2)
+            if self.oldest is not None and time.monotonic() - self.oldest >= self.max_age:
+                await self.flush()
+
+    async def flush(self, final: bool = False) -> bool:
+        """
+        Write the buffered batch; False when it failed. A failed batch is kept
+        for the next flush unless this was its last attempt (or `final`), in
+        which case it goes to the dead letters.
+        """
+        async with self.lock:
+            if not self.operations:
+                return True
+            operations, documents, tags, results = self.operations, self.documents, self.tags, self.results
+            size, oldest = self.size, self.oldest
+            self.operations, self.documents, self.tags, self.results, self.size, self.oldest = [], [], [], [], 0, None
+
+            start = time.perf_counter()
+            rejected: Dict[int, str] = {}
+            try:
+                await self.write(operations)
+            except BulkWriteError as e:
+                # The rest of an unordered batch was applied; writing it again would repeat $inc and the like
+                rejected = {error['index']: error.get('errmsg', '') for error in e.details.get('writeErrors', [])
+                            if error.get('code') != DUPLICATE_KEY}
+                self.metrics['rejected'] += len(rejected)
+                self.dead_letter([documents[index] for index in rejected], [tags[index] for index in rejected],
+                                 [results[index] for index in rejected], [rejected[index] for index in rejected])
+            except Exception as e:
+                self.metrics['failed_flushes'] += 1
+                self.failures += 1
+                if final or self.failures >= WRITE_BUFFER_MAX_FAILURES:
+                    self.failures = 0
+                    self.dead_letter(documents, tags, results, [str(e)] * len(operations))
+                    return False
+                logging.warning(f"Bulk write of {len(operations)} operations to {self.collection.name} failed "
+                                f"({self.failures}/{WRITE_BUFFER_MAX_FAILURES}), keeping them for the next flush: {e}")
+                self.operations, self.documents = operations + self.operations, documents + self.documents
+                self.tags, self.results = tags + self.tags, results + self.results
+                self.size += size
+                self.oldest = oldest if self.oldest is None else min(oldest, self.oldest)
+                return False
+
+            self.failures = 0
+            latency = (time.perf_counter() - start) * 1000
+            self.record(len(operations), size, latency)
+            written = [index for index in range(len(operations)) if index not in rejected]
+            for index in written:
+                if not results[index].done():
+                    results[index].set_result(True)
+            if self.on_flush:
+                self.on_flush([tags[index] for index in written if tags[index] is not None])
+            return True
+
+    def dead_letter(self, documents: List[Optional[Dict[str, Any]]], tags: List[Any],
+                    results: List[asyncio.Future], errors: List[str]) -> None:
+        """Record writes that will not be retried, so they can be inspected or replayed, and fail their futures."""
+        for result in results:
+            if not result.done():
+                result.set_result(False)
+        if not documents:
+            return
+        self.metrics['dead_letters'] += len(documents)
+        os.makedirs(self.dead_letter_dir, exist_ok=True)
+        now = datetime.now(UTC)
+        with open(self.dead_letter_path, 'a') as f:
+            for document, tag, error in zip(documents, tags, errors):
+                f.write(json_util.dumps({'ts': now, 'tag': tag, 'error': error, 'document': document}) + '\n')
+        logging.error(f"{len(documents)} operations for {self.collection.name} moved to {self.dead_letter_path}")
+
+    @retry(retries=3, delay=1, backoff=2, jitter=True, exceptions=TRANSIENT_ERRORS)
+    async def write(self, operations: List[Any]) -> None:
+        try:
+            await self.collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # Duplicate keys mean another worker wrote the same document first
+            errors = [error for error in e.details.get('writeErrors', []) if error.get('code') != DUPLICATE_KEY]
+            if errors:
+                raise
+            logging.debug(f"Ignored {len(e.details.get('writeErrors', []))} duplicate keys in {self.collection.name}")
+
+    def record(self, count: int, size: int, latency: float) -> None:
+        metrics = self.metrics
+        metrics['flushes'] += 1
+        metrics['operations'] += count
+        metrics['bytes'] += size
+        metrics['total_latency_ms'] += latency
+        metrics['max_latency_ms'] = max(metrics['max_latency_ms'], latency)
+        metrics['max_batch'] = max(metrics['max_batch'], count)
+        logging.info(f"Flushed {count} operations ({size} bytes) to {self.collection.name} in {latency:.1f} ms")
+
+    def stats(self) -> Dict[str, Any]:
+        metrics = dict(self.metrics)
+        flushes = metrics['flushes'] or 1
+        metrics['avg_batch'] = metrics['operations'] / flushes
+        metrics['avg_latency_ms'] = metrics['total_latency_ms'] / flushes
+        metrics['pending'] = len(self.operations)
+        return metrics
+
+    async def close(self) -> None:
+        """Stop the age flusher and write out whatever is still buffered."""
+        if self.task:
+            # Let a flush in progress finish instead of cancelling it with its batch detached
+            self.stopping.set()
+            await self.task
+            self.task = None
+        # Whatever still cannot be written goes to the dead letters rather than being lost with the process
+        await self.flush(final=True)
+        logging.info(f"Write buffer for {self.collection.name} closed: {self.stats()}")
@@ -13,48 +13,70 @@ from bson.objectid import ObjectId
 from utilities.helpers import retry, proxy
 from selectolax.parser import HTMLParser
 from typing import Optional, Tuple, Dict, Any
-from motor.motor_asyncio import AsyncIOMotorClient
-
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from utilities.resources import Resources, LazyClient, LazyDatabase, LazyCollection
+from pymongo.errors import BulkWriteError
+from utilities.indexes import IndexManager
+from utilities.storage import Storage, VideoStorage
 
 # Load configuration from environment variables (default values provided)
-MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
-
 USER_AGENTS = [ua for ua in os.getenv('USER_AGENTS', "").split(",") if ua.strip()] or [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 13_5) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
     "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
 ]
 
-# Global headers with a random user-agent
+# Headers with a random user-agent, sent per request since the HTTP session is shared
 headers = {"User-Agent": random.choice(USER_AGENTS)}
 
 YOUTUBE_BASE_URL = 'https://www.youtube.com'
 
-class Database:
-    client = AsyncIOMotorClient(MONGO_URI)
-    db = client['video_database']
-    collection_feeds = db['feeds']
-    collection_videos = db['videos']
+class MongoDatabase(VideoStorage):
+    client = LazyClient()
+    db = LazyDatabase('video_database')
+    collection_feeds = LazyCollection('video_database', 'feeds')
+    collection_videos = LazyCollection('video_database', 'videos')
 
-    @staticmethod
-    async def feed_exists(feed_url):
-        doc = await Database.collection_feeds.find_one({'feed': feed_url})
-        return doc is not None
+    async def feed_exists(self, feed_url):
+        return await self.collection_feeds.find_one({'feed': feed_url})
 
-    @staticmethod
-    async def video_exists(video_id):
-        doc = await Database.collection_videos.find_one({'video_id': video_id})
-        return doc is not None
+    async def create_feed(self, feed_data):
+        result = await self.collection_feeds.insert_one(feed_data)
+        return result.inserted_id
 
-    @staticmethod
-    async def bulk_insert_videos(video_data_list):
-        if video_data_list:
-            result = await Database.collection_videos.insert_many(video_data_list)
-            logging.info(f"Inserted {len(result.inserted_ids)} videos.")
-            return result.inserted_ids
-        return []
+    async def existing_videos(self, video_ids):
+        """Return the subset of `video_ids` already stored, in a single $in query."""
+        if not video_ids:
+            return set()
+        cursor = self.collection_videos.find({'video_id': {'$in': list(video_ids)}}, {'video_id': 1, '_id': 0})
+        return {doc['video_id'] async for doc in cursor}
+
+    async def bulk_insert_videos(self, video_data_list):
+        if not video_data_list:
+            return []
+        try:
+            result = await self.collection_videos.insert_many(video_data_list, ordered=False)
+            inserted = result.inserted_ids
+        except BulkWriteError as e:
+            # The unique video_id index rejects videos a concurrent poll inserted first
+            if any(error.get('code') != 11000 for error in e.details.get('writeErrors', [])):
+                raise
+            failed = {error['index'] for error in e.details['writeErrors']}
+            inserted = [doc['_id'] for i, doc in enumerate(video_data_list) if i not in failed]
+            logging.info(f"Skipped {len(failed)} videos that were already stored.")
+        logging.info(f"Inserted {len(inserted)} videos.")
+        return inserted
+
+    async def update_feed_high_water(self, feed_id, published):
+        await self.collection_feeds.update_one({'_id': feed_id}, {'$set': {'latest_published': published}})
+
+    async def startup(self):
+        await IndexManager.bootstrap(self.client, databases=['video_database'])
+
+    async def close(self):
+        pass
+
+# MongoDB unless STORAGE_BACKEND selects the in-memory or SQLite stand-in
+Database = Storage.select(MongoDatabase, 'video')
 
 class YouTubeChannel:
     @staticmethod
@@ -138,7 +160,7 @@ class YouTubeChannel:
     async def fetch_page(url: str, session: ClientSession) -> str:
         """Fetch page content, handling consent form if needed."""
         try:
-            async with session.get(url) as response:
+            async with session.get(url, headers=headers) as response:
                 if response.status != 200:
                     return None
 
@@ -176,7 +198,7 @@ class YouTubeChannel:
                     form_data[name] = input_tag.attributes.get('value', '')
             
             # Submit consent form
-            async with session.post(post_url, data=form_data) as response:
+            async with session.post(post_url, data=form_data, headers=headers) as response:
                 if response.status == 200:
                     return await response.text()
                 return None
@@ -354,6 +376,10 @@ class ImageExtractor:
         return ImageExtractor.extract_avatar_url(initial_data, preferred_size)
 
 class YouTubeParser:
+    # feed URL -> feed _id, and feed _id -> newest `published` already stored (high-water mark)
+    feed_ids: Dict[str, Any] = {}
+    high_water: Dict[Any, str] = {}
+
     @staticmethod
     @retry(retries=3, delay=1, backoff=2, jitter=True)
     @proxy
@@ -368,12 +394,21 @@ class YouTubeParser:
 
     @staticmethod
     async def get_or_create_feed(feed_url: str, feed, session: ClientSession):
-        if await Database.feed_exists(feed_url):
+        if feed_url in YouTubeParser.feed_ids:
+            return YouTubeParser.feed_ids[feed_url]
+
+        existing_feed = await Database.feed_exists(feed_url)
+        if existing_feed:
             logging.info(f"Feed {feed_url} already exists. Skipping feed save.")
-            existing_feed = await Database.collection_feeds.find_one({'feed': feed_url})
-            return existing_feed['_id'] if existing_feed else None
+            feed_object_id = existing_feed['_id']
+            if existing_feed.get('latest_published'):
+                YouTubeParser.high_water[feed_object_id] = existing_feed['latest_published']
         else:
-            return await YouTubeParser.create_new_feed(feed_url, feed, session)
+            feed_object_id = await YouTubeParser.create_new_feed(feed_url, feed, session)
+
+        if feed_object_id:
+            YouTubeParser.feed_ids[feed_url] = feed_object_id
+        return feed_object_id
 
     @staticmethod
     async def create_new_feed(feed_url: str, feed, session: ClientSession):
@@ -402,32 +437,45 @@ class YouTubeParser:
             'image': avatar_url,
         }
 
-        result = await Database.collection_feeds.insert_one(feed_data)
-        logging.info(f"Inserted feed with id: {result.inserted_id}")
-        return result.inserted_id
+        feed_object_id = await Database.create_feed(feed_data)
+        logging.info(f"Inserted feed with id: {feed_object_id}")
+        return feed_object_id
 
     @staticmethod
     @retry(retries=3, delay=1, backoff=2, jitter=True)
     @proxy
     async def video_items(feed, session: ClientSession, feed_object_id):
-        tasks = []
-        
-        for entry in feed.entries:
-            tasks.append(YouTubeParser.process_video_entry(entry, feed_object_id))
-
-        results = await asyncio.gather(*tasks)
-
-        video_data_list = [res for res in results if res]
+        entries = [entry for entry in feed.entries if YouTubeParser.video_id(entry)]
+        if not entries:
+            return
+
+        # YouTube publishes RFC 3339 UTC timestamps, so they compare as strings
+        mark = YouTubeParser.high_water.get(feed_object_id, '')
+        fresh = [entry for entry in entries if entry.get('published', '') > mark]
+        if not fresh:
+            logging.info(f"No new videos for feed {feed_object_id}.")
+            return
+
+        existing = await Database.existing_videos([YouTubeParser.video_id(entry) for entry in fresh])
+        video_data_list = [
+            YouTubeParser.process_video_entry(entry, feed_object_id)
+            for entry in fresh if YouTubeParser.video_id(entry) not in existing
+        ]
         if video_data_list:
             await Database.bulk_insert_videos(video_data_list)
 
+        newest = max(entry.get('published', '') for entry in entries)
+        if newest > mark:
+            await Database.update_feed_high_water(feed_object_id, newest)
+            YouTubeParser.high_water[feed_object_id] = newest
+
     @staticmethod
-    async def process_video_entry(entry, feed_object_id):
-        video_id = entry.get('yt_videoid') or entry.get('yt:videoId')
-        if await Database.video_exists(video_id):
-            logging.info(f"Video {video_id} already exists. Skipping.")
-            return None
+    def video_id(entry) -> Optional[str]:
+        return entry.get('yt_videoid') or entry.get('yt:videoId')
 
+    @staticmethod
+    def process_video_entry(entry, feed_object_id):
+        video_id = YouTubeParser.video_id(entry)
         return {
             'feed_id': feed_object_id,
             'video_id': video_id,
@@ -443,17 +491,23 @@ class YouTubeParser:
         }
 
 async def main():
-    async with aiohttp.ClientSession(headers=headers) as session:
-        entry = 'https://www.youtube.com/@LinusTechTips'
-        result = await YouTubeChannel.get_channel_info(entry, session)
-
-        if 'error' in result:
-            logging.error(f"❌ Error: {result['error']}")
-        else:
-            logging.info("✅ Success!")
-            logging.info(f"Channel ID : {result['channel_id']}")
-            logging.info(f"Feed URL   : {result['feed_url']}")
-            logging.info(f"Source     : {result['source']}")
-
-# Run the asyncio loop
-asyncio.run(main())
\ No newline at end of file
+    await Database.startup()
+
+    session = await Resources.session()
+    entry = 'https://www.youtube.com/@LinusTechTips'
+    result = await YouTubeChannel.get_channel_info(entry, session)
+
+    if 'error' in result:
+        logging.error(f"❌ Error: {result['error']}")
+    else:
+        logging.info("✅ Success!")
+        logging.info(f"Channel ID : {result['channel_id']}")
+        logging.info(f"Feed URL   : {result['feed_url']}")
+        logging.info(f"Source     : {result['source']}")
+
+    await Database.close()
+    await Resources.close()
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    asyncio.run(main())